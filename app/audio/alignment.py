@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from app import profiling
+from app.cache import file_digest
+
+# Word-level timestamps for a narration mp3, from faster-whisper on CPU.
+# Transcribing is slow, so results are stored as JSON keyed by the mp3's
+# content hash and the model; a re-render or a regen of another scene never
+# transcribes the same audio twice. faster-whisper is optional: without it
+# callers fall back to spreading captions over the voiceover.
+
+ALIGN_DIRNAME = ".align"
+DEFAULT_MODEL = "base"
+
+Word = Tuple[str, float, float]  # (text, start sec, end sec) from the start of the mp3
+
+_models: Dict[str, object] = {}
+_models_lock = threading.Lock()
+
+
+def alignment_available() -> bool:
+    try:
+        import faster_whisper  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _model(name: str):
+    with _models_lock:
+        if name not in _models:
+            from faster_whisper import WhisperModel
+
+            _models[name] = WhisperModel(name, device="cpu", compute_type="int8")
+        return _models[name]
+
+
+def alignment_path(cache_dir: str, mp3_path: str, model: str) -> str:
+    return os.path.join(cache_dir, f"{file_digest(mp3_path)}_{model}.json")
+
+
+def word_timings(mp3_path: str, cache_dir: str, model: str = DEFAULT_MODEL) -> Optional[List[Word]]:
+    # None when faster-whisper isn't installed and nothing is cached
+    path = alignment_path(cache_dir, mp3_path, model)
+    if os.path.exists(path):
+        profiling.count("align.hits")
+        with open(path, "r", encoding="utf-8") as f:
+            return [(w, s, e) for w, s, e in json.load(f)]
+    if not alignment_available():
+        return None
+    profiling.count("align.misses")
+    with profiling.span("align.transcribe", "provider", model=model):
+        segments, _ = _model(model).transcribe(mp3_path, word_timestamps=True, vad_filter=False)
+        words = [(w.word.strip(), round(w.start, 3), round(w.end, 3)) for seg in segments for w in (seg.words or []) if w.word.strip()]
+    os.makedirs(cache_dir, exist_ok=True)
+    # Unique temp name: a batch run and the job server may align the same voiceover at once
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(words, f)
+    os.replace(tmp, path)
+    return words
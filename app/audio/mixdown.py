@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import imageio_ffmpeg
+
+from app.config import CONFIG
+from app import profiling
+from app.schema import VideoProject
+from app.renderer.timeline import SceneSpan
+
+# The whole soundtrack is mixed once, up front, into a PCM wav that the video
+# encoder muxes as-is. Every mp3 is decoded a single time and placed at a
+# sample offset, but the mix is built and written MIX_BLOCK_SEC at a time:
+# fades and ducking only look at nearby samples, so memory stays flat however
+# long the video is. A clip is decoded just before its first block and
+# dropped after its last.
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+DECLICK_SEC = 0.005
+DUCK_BLOCK_SEC = 0.02
+MIX_BLOCK_SEC = 10.0  # rounded to whole duck blocks
+DUCK_THRESHOLD = 0.01
+DUCK_RELEASE_SEC = 0.3
+
+
+def decode_audio(path: str, sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS) -> np.ndarray:
+    cmd = [
+        imageio_ffmpeg.get_ffmpeg_exe(), "-v", "error", "-i", path,
+        "-f", "f32le", "-acodec", "pcm_f32le", "-ac", str(channels), "-ar", str(sample_rate), "-",
+    ]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode {path}: {proc.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(proc.stdout, dtype=np.float32).reshape(-1, channels)
+
+
+def _ramp_gain(lo: int, hi: int, n: int, sample_rate: int, fade_in: float, fade_out: float) -> np.ndarray:
+    # Samples lo..hi of an n-sample gain with linear ramps at both ends,
+    # multiplied where they overlap (same shape as SceneSpan.alpha_at)
+    t = np.arange(lo, hi, dtype=np.float32) / sample_rate
+    gain = np.ones(hi - lo, dtype=np.float32)
+    if fade_in > 0:
+        gain *= np.clip(t / fade_in, 0.0, 1.0)
+    if fade_out > 0:
+        gain *= np.clip((n / sample_rate - t) / fade_out, 0.0, 1.0)
+    return gain
+
+
+@dataclass
+class _Placement:
+    # A clip added into track[start:stop]; each ramp is (origin, length, fade_in, fade_out)
+    path: str
+    start: int
+    stop: int
+    ramps: List[Tuple[int, int, float, float]] = field(default_factory=list)
+
+
+class _Clips:
+    # Decoded clips, fetched ahead of the block that first needs them and
+    # dropped once the mix has moved past the last placement using them
+    def __init__(self, placements: List[_Placement], sample_rate: int, channels: int):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.last_stop: Dict[str, int] = {}
+        for p in placements:
+            self.last_stop[p.path] = max(self.last_stop.get(p.path, 0), p.stop)
+        self.pool = ThreadPoolExecutor(max_workers=min(8, max(1, len(self.last_stop))))
+        self.pending: Dict[str, object] = {}
+
+    def prefetch(self, paths: Iterable[str]) -> None:
+        # ffmpeg does the work in its own process, so threads decode in parallel
+        for path in paths:
+            if path not in self.pending:
+                self.pending[path] = self.pool.submit(decode_audio, path, self.sample_rate, self.channels)
+
+    def get(self, path: str) -> np.ndarray:
+        self.prefetch([path])
+        return self.pending[path].result()
+
+    def release(self, before: int) -> None:
+        for path in [p for p in self.pending if self.last_stop[p] <= before]:
+            del self.pending[path]
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.pending.clear()
+
+
+def _render(placements: List[_Placement], clips: _Clips, lo: int, hi: int) -> np.ndarray:
+    # Sum of every placement overlapping track[lo:hi]
+    out = np.zeros((hi - lo, clips.channels), dtype=np.float32)
+    for p in placements:
+        if p.start >= hi or p.stop <= lo:
+            continue
+        clip = clips.get(p.path)
+        a, b = max(lo, p.start), min(hi, p.stop, p.start + len(clip))
+        if a >= b:
+            continue
+        gain = None
+        for origin, length, fade_in, fade_out in p.ramps:
+            ramp = _ramp_gain(a - origin, b - origin, length, clips.sample_rate, fade_in, fade_out)
+            gain = ramp if gain is None else gain * ramp
+        seg = clip[a - p.start:b - p.start]
+        out[a - lo:b - lo] += seg if gain is None else seg * gain[:, None]
+    return out
+
+
+def _duck_blocks(narration: np.ndarray, sample_rate: int, duck_gain: float, threshold: float, release_sec: float) -> np.ndarray:
+    # Block RMS of the narration decides where music is ducked; the hard
+    # on/off mask is held for `release_sec` and smoothed into a ramp.
+    block = max(1, int(DUCK_BLOCK_SEC * sample_rate))
+    n_blocks = -(-len(narration) // block)
+    channels = narration.shape[1]
+    padded = np.zeros((n_blocks * block, channels), dtype=np.float32)
+    padded[:len(narration)] = narration
+    rms = np.sqrt(np.mean(padded.reshape(n_blocks, block * channels) ** 2, axis=1))
+    active = (rms > threshold).astype(np.float32)
+    hold = _hold_blocks(release_sec)
+    active = np.minimum(1.0, np.convolve(active, np.ones(2 * hold + 1, dtype=np.float32), mode="same"))
+    kernel = np.ones(hold, dtype=np.float32) / hold
+    active = np.convolve(active, kernel, mode="same")
+    return 1.0 - (1.0 - duck_gain) * active
+
+
+def _hold_blocks(release_sec: float) -> int:
+    return max(1, int(release_sec / DUCK_BLOCK_SEC))
+
+
+def duck_envelope(narration: np.ndarray, sample_rate: int, duck_gain: float, threshold: float = DUCK_THRESHOLD, release_sec: float = DUCK_RELEASE_SEC) -> np.ndarray:
+    block = max(1, int(DUCK_BLOCK_SEC * sample_rate))
+    gain = _duck_blocks(narration, sample_rate, duck_gain, threshold, release_sec)
+    return np.repeat(gain, block)[:len(narration)].astype(np.float32)
+
+
+def _placements(project: VideoProject, spans: List[SceneSpan], sample_rate: int) -> Tuple[List[_Placement], List[_Placement]]:
+    sfx = project.sfx or {}
+    voices: List[_Placement] = []
+    effects: List[_Placement] = []
+    for span in spans:
+        scene_start = int(round(span.start * sample_rate))
+        scene_stop = int(round(span.end * sample_rate))
+        # Narration and scene effects fade with the picture across transitions
+        scene_ramp = (scene_start, scene_stop - scene_start, span.fade_in, span.fade_out)
+        path = span.scene.voiceover_path
+        if path and os.path.exists(path):
+            start = max(0, int(round((span.start + span.scene.voiceover_offset_sec) * sample_rate)))
+            if start < scene_stop:
+                declick = (start, -1, DECLICK_SEC, DECLICK_SEC)  # length filled in once the clip is decoded
+                voices.append(_Placement(path, start, scene_stop, [declick, scene_ramp]))
+        sfx_path = sfx.get(str(span.scene.scene_id))
+        if sfx_path and not os.path.exists(sfx_path):
+            # A stale sfx entry shouldn't cost the whole render
+            print(f"Scene {span.scene.scene_id:02d}: sound effect {sfx_path} not found, skipped")
+        elif sfx_path:
+            effects.append(_Placement(sfx_path, scene_start, scene_stop, [scene_ramp]))
+    return voices, effects
+
+
+def mix_blocks(project: VideoProject, spans: List[SceneSpan], sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS) -> Optional[Iterator[np.ndarray]]:
+    # -> consecutive float32 blocks of the mix, clipped to [-1, 1], or None when there is nothing to mix
+    voices, effects = _placements(project, spans, sample_rate) if spans else ([], [])
+    music_path = project.bg_music_path if project.bg_music_path and os.path.exists(project.bg_music_path) else None
+    if not spans or not (voices or effects or music_path):
+        return None
+    return _mix(voices, effects, music_path, spans, sample_rate, channels)
+
+
+def _mix(voices: List[_Placement], effects: List[_Placement], music_path: Optional[str], spans: List[SceneSpan], sample_rate: int, channels: int) -> Iterator[np.ndarray]:
+    total = int(round(spans[-1].end * sample_rate))
+    duck = max(1, int(DUCK_BLOCK_SEC * sample_rate))
+    step = duck * max(1, int(round(MIX_BLOCK_SEC / DUCK_BLOCK_SEC)))
+    # Duck blocks on either side of a mix block that can still change its
+    # envelope (hold, then smoothing); 3*hold+1 is comfortably past both
+    margin = duck * (3 * _hold_blocks(DUCK_RELEASE_SEC) + 1)
+    clips = _Clips(voices + effects, sample_rate, channels)
+    try:
+        # The music bed is looped, so only the source file is ever held
+        music = decode_audio(music_path, sample_rate, channels) if music_path else None
+        for lo in range(0, total, step):
+            hi = min(total, lo + step)
+            clips.prefetch(p.path for p in voices + effects if p.start < hi + step + margin and p.stop > lo)
+            for p in voices:
+                if p.ramps[0][1] < 0 and p.start < hi + margin:
+                    clip = clips.get(p.path)
+                    p.ramps[0] = (p.start, max(0, min(len(clip), p.stop - p.start)), DECLICK_SEC, DECLICK_SEC)
+            ext_lo, ext_hi = max(0, lo - margin), min(total, hi + margin)
+            narration = _render(voices, clips, ext_lo, ext_hi)
+            mix = narration[lo - ext_lo:hi - ext_lo] + _render(effects, clips, lo, hi)
+            if music is not None and len(music):
+                bed = music[np.arange(lo, hi) % len(music)] * CONFIG.music_volume
+                gain = _duck_blocks(narration, sample_rate, CONFIG.music_duck_gain, DUCK_THRESHOLD, DUCK_RELEASE_SEC)
+                gain = np.repeat(gain[(lo - ext_lo) // duck:], duck)[:hi - lo].astype(np.float32)
+                bed = bed * gain[:, None]
+                bed *= _ramp_gain(lo, hi, total, sample_rate, spans[0].fade_in, spans[-1].fade_out)[:, None]
+                mix += bed
+            np.clip(mix, -1.0, 1.0, out=mix)
+            clips.release(lo)
+            yield mix
+    finally:
+        clips.close()
+
+
+def write_wav(path: str, blocks: Iterable[np.ndarray], sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS) -> str:
+    with wave.open(path, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        for samples in blocks:
+            w.writeframes((samples * 32767.0).astype("<i2").tobytes())
+    return path
+
+
+def build_audio_track(project: VideoProject, spans: List[SceneSpan], out_path: str, sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS) -> Optional[str]:
+    with profiling.span("audio.mixdown", "render"):
+        blocks = mix_blocks(project, spans, sample_rate, channels)
+        if blocks is None:
+            return None
+        return write_wav(out_path, blocks, sample_rate, channels)
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from typing import BinaryIO, Optional, Tuple
+
+# Reads MPEG audio frame headers (and the Xing/Info or VBRI header when the
+# encoder wrote one) to get a duration without decoding any audio.
+
+_BITRATES = {
+    # (version_is_mpeg1, layer) -> kbps by index
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+class MP3ProbeError(ValueError):
+    pass
+
+
+def _parse_header(b: bytes) -> Optional[Tuple[int, int, int, int, int]]:
+    # -> (frame_length, samples_per_frame, sample_rate, version_bits, channel_mode)
+    if len(b) < 4 or b[0] != 0xFF or (b[1] & 0xE0) != 0xE0:
+        return None
+    version = (b[1] >> 3) & 0x3
+    layer_bits = (b[1] >> 1) & 0x3
+    bitrate_idx = (b[2] >> 4) & 0xF
+    sr_idx = (b[2] >> 2) & 0x3
+    if version == 1 or layer_bits == 0 or bitrate_idx in (0, 15) or sr_idx == 3:
+        return None
+    layer = 4 - layer_bits
+    mpeg1 = version == 3
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_idx] * 1000
+    sample_rate = _SAMPLE_RATES[version][sr_idx]
+    padding = (b[2] >> 1) & 0x1
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or mpeg1) else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+    return length, samples, sample_rate, version, (b[3] >> 6) & 0x3
+
+
+def _skip_id3v2(f: BinaryIO) -> int:
+    head = f.read(10)
+    if len(head) == 10 and head[:3] == b"ID3":
+        size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        footer = 10 if head[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def _find_first_frame(f: BinaryIO, start: int, limit: int = 64 * 1024) -> Tuple[int, Tuple[int, int, int, int, int]]:
+    f.seek(start)
+    buf = f.read(limit)
+    for i in range(len(buf) - 4):
+        if buf[i] != 0xFF:
+            continue
+        hdr = _parse_header(buf[i:i + 4])
+        if hdr is None:
+            continue
+        # Require the next frame to line up too, so stray 0xFF bytes don't match
+        nxt = buf[i + hdr[0]:i + hdr[0] + 4]
+        if len(nxt) < 4 or _parse_header(nxt) is not None:
+            return start + i, hdr
+    raise MP3ProbeError("no MPEG audio frame found")
+
+
+def _vbr_frame_count(frame: bytes, version: int, channel_mode: int) -> Optional[int]:
+    mono = channel_mode == 3
+    if version == 3:
+        side_info = 17 if mono else 32
+    else:
+        side_info = 9 if mono else 17
+    xing = frame[4 + side_info:4 + side_info + 12]
+    if xing[:4] in (b"Xing", b"Info"):
+        flags = int.from_bytes(xing[4:8], "big")
+        if flags & 0x1:
+            return int.from_bytes(xing[8:12], "big")
+    vbri = frame[36:36 + 18]
+    if vbri[:4] == b"VBRI":
+        return int.from_bytes(vbri[14:18], "big")
+    return None
+
+
+def probe_mp3_duration(path: str) -> float:
+    with open(path, "rb") as f:
+        offset, (length, samples, sample_rate, version, channel_mode) = _find_first_frame(f, _skip_id3v2(f))
+        f.seek(offset)
+        first = f.read(max(length, 64))
+        frames = _vbr_frame_count(first, version, channel_mode)
+        if frames is not None:
+            return frames * samples / sample_rate
+
+        # No VBR header: walk the frame headers, seeking past each payload
+        total_samples = 0
+        pos = offset
+        while True:
+            f.seek(pos)
+            hdr = _parse_header(f.read(4))
+            if hdr is None:
+                break
+            total_samples += hdr[1]
+            pos += hdr[0]
+        return total_samples / sample_rate
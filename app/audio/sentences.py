@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import contextlib
+import os
+import re
+import subprocess
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+import imageio_ffmpeg
+
+from app.cache import canonical_key
+from app.schema import VoiceSpec
+from app.audio.mixdown import decode_audio
+
+# Sentence-level narration. A paragraph is voiced one sentence at a time;
+# each sentence's mp3 is kept in assets/.sentences/ under a hash of the
+# provider, voice and text, so editing one sentence re-synthesizes just that
+# sentence. The clips are decoded to PCM, trimmed of the provider's edge
+# silence, joined with a fixed pause counted in samples and encoded once.
+# Where each sentence starts is kept on the scene for caption timing, and
+# clips that no scene's sentences use any more are pruned after each run.
+
+SENTENCE_DIRNAME = ".sentences"
+SENTENCE_VERSION = 1
+STITCH_SAMPLE_RATE = 24000  # native rate of every TTS format we request
+SILENCE_THRESHOLD = 0.003  # about -50 dBFS
+EDGE_KEEP_SEC = 0.02  # kept on each side of the trimmed speech so consonants aren't clipped
+
+_SENTENCE = re.compile(r"(?<=[.!?…])[\"')\]]*\s+")
+
+
+def split_sentences(text: str) -> List[str]:
+    # Splits after terminal punctuation (and any closing quote); keeps the punctuation
+    parts = []
+    start = 0
+    for match in _SENTENCE.finditer(text):
+        parts.append(text[start:match.end()].strip())
+        start = match.end()
+    parts.append(text[start:].strip())
+    return [p for p in parts if p]
+
+
+def scene_sentences(paragraph: str) -> List[str]:
+    # What a scene is voiced as in sentence mode; text without a break is one sentence
+    return split_sentences(paragraph) or [paragraph]
+
+
+def sentence_path(assets_dir: str, provider: str, voice: Optional[VoiceSpec], text: str) -> str:
+    params = {"v": SENTENCE_VERSION, "voice": voice.model_dump() if voice else None, "text": text}
+    return os.path.join(assets_dir, SENTENCE_DIRNAME, f"{canonical_key(provider, 'sentence', params)}.mp3")
+
+
+def trim_silence(samples: np.ndarray, sample_rate: int = STITCH_SAMPLE_RATE, threshold: float = SILENCE_THRESHOLD) -> np.ndarray:
+    loud = np.flatnonzero(np.abs(samples).max(axis=1) > threshold)
+    if not len(loud):
+        return samples[:0]
+    keep = int(EDGE_KEEP_SEC * sample_rate)
+    return samples[max(0, loud[0] - keep):min(len(samples), loud[-1] + 1 + keep)]
+
+
+def stitch_sentences(paths: Sequence[str], out_path: str, gap_sec: float, sample_rate: int = STITCH_SAMPLE_RATE) -> List[int]:
+    # -> sample offset where each sentence starts in the stitched mp3's PCM
+    gap = np.zeros((int(round(gap_sec * sample_rate)), 1), dtype=np.float32)
+    pieces: List[np.ndarray] = []
+    offsets: List[int] = []
+    position = 0
+    for idx, path in enumerate(paths):
+        if idx:
+            pieces.append(gap)
+            position += len(gap)
+        clip = trim_silence(decode_audio(path, sample_rate, 1), sample_rate)
+        offsets.append(position)
+        pieces.append(clip)
+        position += len(clip)
+    pcm = np.concatenate(pieces) if pieces else np.zeros((0, 1), dtype=np.float32)
+    tmp = f"{out_path}.stitch.mp3"
+    cmd = [
+        imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-v", "error",
+        "-f", "f32le", "-ar", str(sample_rate), "-ac", "1", "-i", "-",
+        "-c:a", "libmp3lame", "-b:a", "96k", tmp,
+    ]
+    proc = subprocess.run(cmd, input=pcm.tobytes(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=False)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not encode {out_path}: {proc.stderr.decode(errors='replace').strip()}")
+    os.replace(tmp, out_path)
+    return offsets
+
+
+def prune_sentences(assets_dir: str, keep: Iterable[str]) -> int:
+    # Deletes clips no scene maps to any more: edited sentences, or another voice or provider
+    root = os.path.join(assets_dir, SENTENCE_DIRNAME)
+    if not os.path.isdir(root):
+        return 0
+    live = {os.path.basename(path) for path in keep}
+    removed = 0
+    for entry in os.scandir(root):
+        # ".tmp." marks a clip still being synthesized
+        if not entry.name.endswith(".mp3") or ".tmp." in entry.name or entry.name in live:
+            continue
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(entry.path)
+            removed += 1
+    return removed
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+from app.config import CONFIG
+from app.cache import ResponseCache
+from app.providers import ProviderRegistry
+from app.schema import slugify
+from app.orchestrator import generate_project, parse_size, resolve_providers
+from app.persistence import load_project, project_file
+
+
+def _worker_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def read_specs(path: str) -> Iterator[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            spec = json.loads(line)
+            spec.setdefault("job_id", spec.get("request_id") or f"job-{lineno}")
+            yield spec
+
+
+def _generate_job(spec: Dict, cache: Optional[ResponseCache], registry: Optional[ProviderRegistry] = None) -> str:
+    if spec.get("project_json"):
+        return spec["project_json"]
+    if not spec.get("title"):
+        raise ValueError("spec needs either 'title' or 'project_json'")
+    img_provider, voice_provider = resolve_providers(spec.get("image_provider"), spec.get("voice_provider"))
+    width, height = parse_size(spec.get("image_size") or CONFIG.default_image_size)
+    out_dir = spec.get("output_dir") or os.path.join("./outputs", slugify(spec["title"]))
+    generate_project(
+        title=spec["title"],
+        num_paragraphs=int(spec.get("num_paragraphs", 6)),
+        style_prompt=spec.get("style_prompt"),
+        reference_image=spec.get("reference_image"),
+        image_provider=img_provider,
+        voice_provider=voice_provider,
+        azure_voice=spec.get("azure_voice") or CONFIG.default_azure_voice,
+        elevenlabs_voice_id=spec.get("elevenlabs_voice_id"),
+        width=width,
+        height=height,
+        out_dir=out_dir,
+        source_url=spec.get("source_url"),
+        cache=cache,
+        resume=bool(spec.get("resume", False)),
+        head_pad=spec.get("head_pad"),
+        tail_pad=spec.get("tail_pad"),
+        tts_mode=spec.get("tts_mode"),
+        registry=registry,
+    )
+    return project_file(out_dir)
+
+
+def _render_job(project_json: str, backend: str, quality: str) -> Dict:
+    # Runs in a render worker process; imports stay warm across jobs
+    from app.renderer.video_renderer import render_video
+
+    started = time.perf_counter()
+    project = load_project(project_json)
+    render_video(project, project.output_video_path, quality=quality, backend=backend)  # type: ignore[arg-type]
+    return {"video": project.output_video_path, "render_sec": round(time.perf_counter() - started, 3)}
+
+
+class BatchRunner:
+    # Generation is network-bound and runs on a thread pool; rendering is
+    # CPU-bound and runs on a process pool. A job moves to the render pool as
+    # soon as its assets exist, so one project renders while others generate.
+    def __init__(self, results_path: str, generate_workers: int = 4, render_workers: Optional[int] = None, render_backend: str = "stream", render_quality: str = "final", cache: Optional[ResponseCache] = None):
+        self.results_path = results_path
+        self.render_backend = render_backend
+        self.render_quality = render_quality
+        self.cache = cache
+        # Shared clients and provider gates: PROVIDER_LIMITS hold across all generation threads
+        self.registry = ProviderRegistry(cache)
+        self.generate_pool = ThreadPoolExecutor(max_workers=generate_workers, thread_name_prefix="generate")
+        # Render workers come from a forkserver, never forked from this process:
+        # the pool starts its workers on the first submit, from a generation
+        # thread, while other threads may hold locks mid-request or mid-import
+        self.render_pool = ProcessPoolExecutor(max_workers=render_workers or os.cpu_count(), mp_context=_worker_context())
+        self._results_lock = threading.Lock()
+        self._pending: List[Future] = []
+        self._pending_lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+
+    def _emit(self, record: Dict) -> None:
+        with self._results_lock:
+            if record["status"] == "ok":
+                self.completed += 1
+            else:
+                self.failed += 1
+            with open(self.results_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+            print(f"[{record['job_id']}] {record['status']} in {record['total_sec']:.1f}s")
+
+    def _track(self, future: Future) -> None:
+        with self._pending_lock:
+            self._pending.append(future)
+
+    def _generate(self, spec: Dict, started: float) -> None:
+        record: Dict = {"job_id": spec["job_id"], "title": spec.get("title"), "status": "ok"}
+        try:
+            gen_started = time.perf_counter()
+            record["project_json"] = _generate_job(spec, self.cache, self.registry)
+            record["generate_sec"] = round(time.perf_counter() - gen_started, 3)
+        except Exception as e:
+            self._fail(record, e, started)
+            return
+        if not spec.get("render", True):
+            record["total_sec"] = round(time.perf_counter() - started, 3)
+            self._emit(record)
+            return
+        backend = spec.get("render_backend", self.render_backend)
+        quality = spec.get("render_quality", self.render_quality)
+        render_future = self.render_pool.submit(_render_job, record["project_json"], backend, quality)
+        render_future.add_done_callback(lambda f: self._rendered(f, record, started))
+        self._track(render_future)
+
+    def _rendered(self, future: Future, record: Dict, started: float) -> None:
+        try:
+            record.update(future.result())
+        except Exception as e:
+            self._fail(record, e, started)
+            return
+        record["total_sec"] = round(time.perf_counter() - started, 3)
+        self._emit(record)
+
+    def _fail(self, record: Dict, error: Exception, started: float) -> None:
+        record.update({
+            "status": "error",
+            "error": f"{type(error).__name__}: {error}",
+            "traceback": traceback.format_exc(),
+            "total_sec": round(time.perf_counter() - started, 3),
+        })
+        self._emit(record)
+
+    def submit(self, spec: Dict) -> None:
+        self._track(self.generate_pool.submit(self._generate, spec, time.perf_counter()))
+
+    def wait(self) -> None:
+        # Render futures are added from generation threads, so drain until stable
+        while True:
+            with self._pending_lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                break
+            for future in pending:
+                future.exception()
+
+    def close(self) -> None:
+        self.generate_pool.shutdown(wait=True)
+        self.render_pool.shutdown(wait=True)
+
+
+def main():
+    ap = argparse.ArgumentParser("story-video-batch")
+    ap.add_argument("specs", type=str, help="JSONL file, one project spec per line")
+    ap.add_argument("--results", type=str, default="batch_results.jsonl", help="Per-job results JSONL (appended)")
+    ap.add_argument("--generate-workers", type=int, default=4, help="Projects generating concurrently")
+    ap.add_argument("--render-workers", type=int, default=None, help="Render processes (default: CPU count)")
+    ap.add_argument("--render-backend", type=str, choices=["moviepy", "stream"], default="stream")
+    ap.add_argument("--render-quality", type=str, choices=["draft", "final"], default="final")
+    ap.add_argument("--no-provider-cache", action="store_true")
+    args = ap.parse_args()
+
+    cache = None if args.no_provider_cache else ResponseCache.from_config()
+    runner = BatchRunner(
+        args.results,
+        generate_workers=args.generate_workers,
+        render_workers=args.render_workers,
+        render_backend=args.render_backend,
+        render_quality=args.render_quality,
+        cache=cache,
+    )
+    started = time.perf_counter()
+    try:
+        for spec in read_specs(args.specs):
+            runner.submit(spec)
+        runner.wait()
+    finally:
+        runner.close()
+    print(f"Batch finished: {runner.completed} ok, {runner.failed} failed in {time.perf_counter() - started:.1f}s -> {args.results}")
+
+
+if __name__ == "__main__":
+    main()
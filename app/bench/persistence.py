@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from app.persistence import load_project, save_project
+from app.schema import ImageMotion, ProjectMeta, Scene, Transition, VideoProject, VoiceSpec
+
+# Load/save timings for large projects, in every project file format. No
+# assets are needed: the project is built in memory with realistic field
+# sizes (hashes, prompts, paragraphs, captions) and written to a temp dir.
+
+_PARAGRAPH = (
+    "The old clockmaker wound the tower clock at dawn while the town slept below, "
+    "counting each tick like a heartbeat and listening for the one that would come late."
+)
+
+
+def build_large_project(scenes: int, assets_dir: str) -> VideoProject:
+    meta = ProjectMeta(title="Persistence bench", slug="persistence-bench", style_prompt="oil painting, warm light", image_provider="placeholder", tts_provider="edge")
+    return VideoProject(
+        meta=meta,
+        scenes=[
+            Scene(
+                scene_id=idx + 1,
+                paragraph_text=f"{idx + 1}. {_PARAGRAPH}",
+                image_path=os.path.join(assets_dir, f"scene_{idx + 1:04d}.jpg"),
+                image_sha256=f"{idx:064x}",
+                image_prompt=f"Scene {idx + 1}: {_PARAGRAPH} Oil painting, warm light, wide shot.",
+                voiceover_path=os.path.join(assets_dir, f"scene_{idx + 1:04d}.mp3"),
+                voiceover_sha256=f"{idx * 7:064x}",
+                voiceover_duration_sec=7.5 + idx % 5,
+                voiceover_offset_sec=0.3,
+                voice=VoiceSpec(provider="edge", voice_name_or_id="en-US-JennyNeural", rate="-5%"),
+                duration_sec=8.4 + idx % 5,
+                motion=ImageMotion(pan_start=-0.2, pan_end=0.2, zoom_start=1.0, zoom_end=1.08),
+                transition_in=Transition(type="crossfade", duration_sec=0.6),
+                transition_out=Transition(type="crossfade", duration_sec=0.6),
+                captions=[_PARAGRAPH[:80], _PARAGRAPH[80:]],
+            )
+            for idx in range(scenes)
+        ],
+        assets_dir=assets_dir,
+        output_video_path=os.path.join(assets_dir, "..", "persistence-bench.mp4"),
+    )
+
+
+def _legacy_save(project: VideoProject, path: str) -> None:
+    # The previous save: serialise, parse and serialise again
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(json.loads(project.model_dump_json(indent=2)), f, indent=2)
+
+
+def _legacy_load(path: str) -> VideoProject:
+    with open(path, "r", encoding="utf-8") as f:
+        return VideoProject.model_validate(json.load(f))
+
+
+def _best(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(scenes: int, repeat: int, formats: List[str]) -> List[Dict[str, object]]:
+    rows: List[Dict[str, object]] = []
+    with tempfile.TemporaryDirectory(prefix="persist-") as tmp:
+        project = build_large_project(scenes, os.path.join(tmp, "assets"))
+        legacy = os.path.join(tmp, "legacy.json")
+        rows.append({
+            "format": "legacy json",
+            "save_ms": _best(lambda: _legacy_save(project, legacy), repeat) * 1000,
+            "load_ms": _best(lambda: _legacy_load(legacy), repeat) * 1000,
+            "lazy_ms": None,
+            "kb": os.path.getsize(legacy) / 1024,
+        })
+        for fmt in formats:
+            path = os.path.join(tmp, "project.msgpack" if fmt == "msgpack" else f"project.{fmt}.json")
+            try:
+                save_ms = _best(lambda: save_project(project, path, fmt=fmt), repeat) * 1000
+            except RuntimeError as exc:
+                print(f"skipping {fmt}: {exc}")
+                continue
+            # Lazy load plus one scene read, the shape of a render queued by the job server
+            rows.append({
+                "format": fmt,
+                "save_ms": save_ms,
+                "load_ms": _best(lambda: load_project(path), repeat) * 1000,
+                "lazy_ms": _best(lambda: load_project(path, lazy=True).scenes[0], repeat) * 1000,
+                "kb": os.path.getsize(path) / 1024,
+            })
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser("story-video-persistence-bench")
+    ap.add_argument("--scenes", type=int, default=1000)
+    ap.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the best is reported")
+    ap.add_argument("--formats", type=str, default="json,compact,msgpack")
+    args = ap.parse_args()
+
+    rows = run(args.scenes, args.repeat, [f.strip() for f in args.formats.split(",") if f.strip()])
+    print(f"{args.scenes} scenes, best of {args.repeat}")
+    print(f"  {'format':<12}{'save ms':>10}{'load ms':>10}{'lazy ms':>10}{'size KB':>10}")
+    for row in rows:
+        lazy = f"{row['lazy_ms']:>10.1f}" if row["lazy_ms"] is not None else f"{'-':>10}"
+        print(f"  {row['format']:<12}{row['save_ms']:>10.1f}{row['load_ms']:>10.1f}{lazy}{row['kb']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.bench.synthetic import BenchCase, build_synthetic_project
+
+CASES: Dict[str, BenchCase] = {
+    "small": BenchCase("small", scenes=4, width=640, height=360, fps=24),
+    "hd": BenchCase("hd", scenes=4, width=1280, height=720, fps=30),
+    "hd-cuts": BenchCase("hd-cuts", scenes=4, width=1280, height=720, fps=30, transition="none"),
+    "fhd": BenchCase("fhd", scenes=2, width=1920, height=1080, fps=30),
+    "many-scenes": BenchCase("many-scenes", scenes=24, width=640, height=360, fps=24, scene_sec=2.0, audio="silent"),
+}
+DEFAULT_CASES = ["small", "hd", "hd-cuts"]
+STAGES = ["ken_burns_sec", "composite_sec", "audio_sec", "encode_sec", "render_sec"]
+ENCODE_SAMPLE_FRAMES = 48
+
+
+class _NullWriter:
+    # Stands in for the ffmpeg pipe so compositing is timed without encoding
+    def __init__(self):
+        self.frames = 0
+
+    def send(self, data) -> None:
+        if data is not None:
+            self.frames += 1
+
+
+class _SamplingWriter(_NullWriter):
+    def __init__(self, keep: int):
+        super().__init__()
+        self.keep = keep
+        self.samples: List[bytes] = []
+
+    def send(self, data) -> None:
+        super().send(data)
+        if data is not None and len(self.samples) < self.keep and self.frames % 7 == 1:
+            self.samples.append(bytes(data))
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def run_case(case: BenchCase, workdir: str) -> Dict[str, object]:
+    # Runs inside a fresh worker process, so peak RSS belongs to this case alone
+    from app.audio.mixdown import build_audio_track
+    from app.renderer.ffmpeg_stream import FrameBlender, open_writer, scene_engine, write_span_frames
+    from app.renderer.prepared import prepare_spans
+    from app.renderer.timeline import build_timeline, total_frames
+    from app.renderer.video_renderer import render_video
+
+    root = os.path.join(workdir, case.name)
+    project = build_synthetic_project(case, root)
+    spans = build_timeline(project)
+    frames = total_frames(spans)
+    result: Dict[str, object] = {"case": case.describe(), "frames": frames, "video_sec": round(spans[-1].end, 3)}
+
+    # Render-ready arrays, built on the first run of a case and mapped after that
+    started = time.perf_counter()
+    prepare_spans(spans, project.assets_dir, project.height, "final")
+    result["prepare_sec"] = time.perf_counter() - started
+
+    # Ken Burns frame generation on its own
+    started = time.perf_counter()
+    for span in spans:
+        engine = scene_engine(span, project.width, project.height, "final")
+        for frame_idx in range(span.first_frame, span.first_frame + span.frame_count):
+            engine.make_frame(span.local_time(frame_idx, project.fps))
+    result["ken_burns_sec"] = time.perf_counter() - started
+
+    # Transition blending and frame serialisation, minus the Ken Burns share
+    writer = _SamplingWriter(ENCODE_SAMPLE_FRAMES)
+    blender = FrameBlender(project.width, project.height)
+    started = time.perf_counter()
+    kb_elapsed = 0.0
+    for span in spans:
+        engine = scene_engine(span, project.width, project.height, "final")
+        write_span_frames(writer, span, engine, blender, project.fps)
+        kb_elapsed += engine.elapsed
+    result["composite_sec"] = max(0.0, time.perf_counter() - started - kb_elapsed)
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        started = time.perf_counter()
+        build_audio_track(project, spans, os.path.join(tmp, "soundtrack.wav"))
+        result["audio_sec"] = time.perf_counter() - started
+
+        # Encoder alone, fed real frames from this project on a loop
+        samples = writer.samples or [np.zeros((project.height, project.width, 3), np.uint8).tobytes()]
+        started = time.perf_counter()
+        enc = open_writer(os.path.join(tmp, "encode.mp4"), project.width, project.height, project.fps)
+        try:
+            for i in range(frames):
+                enc.send(samples[i % len(samples)])
+        finally:
+            enc.close()
+        result["encode_sec"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    render_video(project, project.output_video_path, quality="final", backend="stream")
+    result["render_sec"] = time.perf_counter() - started
+    result["render_fps"] = frames / result["render_sec"] if result["render_sec"] else 0.0
+    result["peak_rss_mb"] = _peak_rss_mb()
+    for key, value in list(result.items()):
+        if isinstance(value, float):
+            result[key] = round(value, 4)
+    return result
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path: str) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_history(path: str, history: List[Dict]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp, path)
+
+
+def find_regressions(history: List[Dict], run: Dict, threshold: float, window: int = 5) -> List[str]:
+    # Each stage is compared with the median of the last `window` runs of the same
+    # case on the same machine; medians keep one noisy run from moving the bar.
+    flagged = []
+    for name, result in run["results"].items():
+        previous = [
+            h["results"][name] for h in history
+            if name in h["results"] and h.get("machine") == run["machine"] and h["results"][name].get("case") == result.get("case")
+        ][-window:]
+        if not previous:
+            continue
+        for metric in STAGES + ["peak_rss_mb"]:
+            values = [p[metric] for p in previous if metric in p]
+            if not values or metric not in result:
+                continue
+            baseline = statistics.median(values)
+            if baseline > 0 and result[metric] > baseline * (1 + threshold):
+                flagged.append(f"{name}.{metric}: {result[metric]:.3f} vs median {baseline:.3f} (+{(result[metric] / baseline - 1) * 100:.0f}%)")
+    return flagged
+
+
+def format_table(results: Dict[str, Dict]) -> str:
+    header = f"{'case':<14}{'frames':>8}{'kenburns':>10}{'composite':>11}{'audio':>8}{'encode':>9}{'render':>9}{'fps':>8}{'rss MB':>9}"
+    lines = [header, "-" * len(header)]
+    for name, r in results.items():
+        lines.append(
+            f"{name:<14}{r['frames']:>8}{r['ken_burns_sec']:>10.2f}{r['composite_sec']:>11.2f}{r['audio_sec']:>8.2f}"
+            f"{r['encode_sec']:>9.2f}{r['render_sec']:>9.2f}{r['render_fps']:>8.1f}{r['peak_rss_mb']:>9.0f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser("story-video-bench")
+    ap.add_argument("--cases", type=str, default=",".join(DEFAULT_CASES), help=f"Comma separated, from: {', '.join(CASES)}")
+    ap.add_argument("--workdir", type=str, default=os.path.join(tempfile.gettempdir(), "story-video-bench"), help="Synthetic assets are built here once and reused")
+    ap.add_argument("--history", type=str, default="bench/history.json", help="JSON history file, appended to on every run")
+    ap.add_argument("--threshold", type=float, default=0.25, help="Flag a stage slower than the recent median by this fraction")
+    ap.add_argument("--fail-on-regression", action="store_true", help="Exit non-zero when any stage regresses (for CI)")
+    ap.add_argument("--no-save", action="store_true", help="Compare against history without appending this run")
+    args = ap.parse_args()
+
+    names = [n.strip() for n in args.cases.split(",") if n.strip()]
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        raise SystemExit(f"Unknown bench case(s): {', '.join(unknown)}")
+
+    results: Dict[str, Dict] = {}
+    ctx = multiprocessing.get_context("spawn")
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            results[name] = pool.submit(run_case, CASES[name], args.workdir).result()
+        print(f"{name}: {results[name]['render_sec']:.2f}s render, {results[name]['peak_rss_mb']:.0f} MB peak")
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_rev": _git_rev(),
+        "machine": f"{platform.node()}/{platform.machine()}/{os.cpu_count()}cpu",
+        "python": platform.python_version(),
+        "results": results,
+    }
+    history = load_history(args.history)
+    regressions = find_regressions(history, run, args.threshold)
+    print(format_table(results))
+    if not args.no_save:
+        save_history(args.history, history + [run])
+    if regressions:
+        print("Regressions:")
+        for line in regressions:
+            print(f"  {line}")
+        if args.fail_on_regression:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
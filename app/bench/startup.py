@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# Import-time profile of the CLI entry points, via `python -X importtime` in a
+# fresh interpreter each run so nothing is already cached in sys.modules.
+
+DEFAULT_TARGETS = ["app.orchestrator", "app.batch"]
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_profile(module: str) -> Tuple[float, List[Tuple[str, int, int, int]]]:
+    # -> (wall seconds, [(module, self_us, cumulative_us, depth)])
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True, env={**os.environ, "PYTHONWARNINGS": "ignore"},
+    )
+    wall = time.perf_counter() - started
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return wall, rows
+
+
+def by_package(rows: List[Tuple[str, int, int, int]]) -> Dict[str, int]:
+    # Self time summed per top-level package (app.* kept at module level)
+    totals: Dict[str, int] = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        parts = name.split(".")
+        key = ".".join(parts[:2]) if parts[0] == "app" or parts[0] == "google" else parts[0]
+        totals[key] += self_us
+    return totals
+
+
+def cli_help_seconds(module: str, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-m", module, "--help"], capture_output=True, check=True)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser("story-video-startup-bench")
+    ap.add_argument("modules", nargs="*", default=DEFAULT_TARGETS)
+    ap.add_argument("--top", type=int, default=15, help="Packages to list per module")
+    args = ap.parse_args()
+
+    for module in args.modules:
+        wall, rows = import_profile(module)
+        cumulative = next((cum for name, _, cum, depth in rows if name == module and depth == 0), 0)
+        print(f"{module}: import {cumulative / 1000:.0f} ms, interpreter + import {wall * 1000:.0f} ms, `--help` {cli_help_seconds(module) * 1000:.0f} ms")
+        totals = sorted(by_package(rows).items(), key=lambda kv: -kv[1])[:args.top]
+        for name, self_us in totals:
+            print(f"  {name:<32}{self_us / 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
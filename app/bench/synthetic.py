@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import os
+import subprocess
+from dataclasses import dataclass, asdict
+from typing import Literal
+
+import imageio_ffmpeg
+
+from app.schema import ImageMotion, ProjectMeta, Scene, Transition, VideoProject, VoiceSpec
+from app.images.placeholder_client import PlaceholderImageClient
+from app.renderer.timeline import fit_scene_durations
+
+# Offline stand-ins for real projects: placeholder images and ffmpeg-made
+# audio, so a benchmark run never touches a provider.
+
+AudioKind = Literal["tone", "silent", "none"]
+
+_PARAGRAPH = "The old clockmaker wound the tower clock at dawn while the town slept below, counting each tick like a heartbeat."
+
+
+@dataclass(frozen=True)
+class BenchCase:
+    name: str
+    scenes: int = 4
+    width: int = 1280
+    height: int = 720
+    fps: int = 30
+    transition: Literal["crossfade", "fade", "none"] = "crossfade"
+    transition_sec: float = 0.6
+    scene_sec: float = 4.0
+    audio: AudioKind = "tone"
+    image_size: int = 1024
+
+    def describe(self) -> dict:
+        return asdict(self)
+
+
+def make_audio_mp3(path: str, seconds: float, kind: AudioKind = "tone", freq: int = 220) -> str:
+    if os.path.exists(path):
+        return path
+    source = f"sine=frequency={freq}:duration={seconds}" if kind == "tone" else f"anullsrc=r=24000:cl=mono:d={seconds}"
+    cmd = [
+        imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-v", "error", "-f", "lavfi", "-i", source,
+        "-t", str(seconds), "-ac", "1", "-ar", "24000", "-c:a", "libmp3lame", "-b:a", "48k", path,
+    ]
+    subprocess.run(cmd, check=True)
+    return path
+
+
+def build_synthetic_project(case: BenchCase, root: str) -> VideoProject:
+    # Assets are keyed by what shapes them, so repeat runs only build what's missing
+    assets_dir = os.path.join(root, "assets")
+    os.makedirs(assets_dir, exist_ok=True)
+    transition = Transition(type=case.transition, duration_sec=case.transition_sec)
+    prompts = [f"Scene {idx + 1}: {_PARAGRAPH}" for idx in range(case.scenes)]
+    image_paths = [os.path.join(assets_dir, f"scene_{idx + 1:02d}_{case.image_size}.jpg") for idx in range(case.scenes)]
+    missing = [i for i, path in enumerate(image_paths) if not os.path.exists(path)]
+    if missing:
+        rendered = PlaceholderImageClient().generate_many([prompts[i] for i in missing], width=case.image_size, height=case.image_size)
+        for i, img in zip(missing, rendered):
+            img.save(image_paths[i])
+    scenes = []
+    for idx, (prompt, image_path) in enumerate(zip(prompts, image_paths)):
+        voice_path = None
+        if case.audio != "none":
+            voice_path = make_audio_mp3(
+                os.path.join(assets_dir, f"scene_{idx + 1:02d}_{case.audio}_{case.scene_sec:g}s.mp3"),
+                case.scene_sec,
+                case.audio,
+                freq=220 + 40 * idx,
+            )
+        pan = -0.5 if idx % 2 else 0.5
+        scenes.append(Scene(
+            scene_id=idx + 1,
+            paragraph_text=prompt,
+            image_path=image_path,
+            voiceover_path=voice_path,
+            voice=VoiceSpec(provider="edge" if voice_path else "none"),
+            duration_sec=case.scene_sec,
+            motion=ImageMotion(pan_start=-pan, pan_end=pan, zoom_start=1.0, zoom_end=1.1),
+            transition_in=transition,
+            transition_out=transition,
+        ))
+    project = VideoProject(
+        meta=ProjectMeta(title=f"bench {case.name}", slug=case.name, image_provider="placeholder", tts_provider="edge" if case.audio != "none" else "none"),
+        scenes=scenes,
+        assets_dir=assets_dir,
+        output_video_path=os.path.join(root, f"{case.name}.mp4"),
+        fps=case.fps,
+        width=case.width,
+        height=case.height,
+    )
+    return fit_scene_durations(project, 0.0, 0.0)
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from app.tts.edge_tts_client import EdgeTTSClient, EdgeTTSJob
+
+# Edge TTS throughput without the network: a local stand-in for
+# edge_tts.Communicate waits out a first-byte latency, then streams an mp3
+# sized by the text length in chunks, the way the service does. The bench
+# times sequential synthesize_to_file calls against synthesize_many.
+
+_PARAGRAPH = (
+    "The old clockmaker wound the tower clock at dawn while the town slept below, "
+    "counting each tick like a heartbeat and listening for the one that would come late."
+)
+BYTES_PER_CHAR = 120  # 48 kbps mp3 at roughly 15 characters of speech a second
+
+
+class FakeCommunicate:
+    # Same (text, voice, **kwargs) -> await .save(path) shape as edge_tts.Communicate
+    latency_sec = 0.25
+    chunk_sec = 0.01
+    chunk_bytes = 4096
+
+    def __init__(self, text: str, voice: str, **kwargs: Any):
+        self.text = text
+        self.voice = voice
+        self.kwargs = kwargs
+
+    async def save(self, path: str) -> None:
+        await asyncio.sleep(self.latency_sec)
+        remaining = max(1, len(self.text) * BYTES_PER_CHAR)
+        with open(path, "wb") as f:
+            while remaining > 0:
+                await asyncio.sleep(self.chunk_sec)
+                n = min(self.chunk_bytes, remaining)
+                f.write(b"\xff" * n)
+                remaining -= n
+
+
+def fake_communicate(latency_sec: float, chunk_sec: float) -> type:
+    return type("FakeCommunicate", (FakeCommunicate,), {"latency_sec": latency_sec, "chunk_sec": chunk_sec})
+
+
+def _jobs(out_dir: str, count: int) -> List[EdgeTTSJob]:
+    return [EdgeTTSJob(text=f"{idx + 1}. {_PARAGRAPH}", output_path=os.path.join(out_dir, f"scene_{idx + 1:03d}.mp3")) for idx in range(count)]
+
+
+def run(scenes: int, latency_sec: float, chunk_sec: float, concurrency: List[int]) -> List[Dict[str, object]]:
+    communicate = fake_communicate(latency_sec, chunk_sec)
+    rows: List[Dict[str, object]] = []
+    with tempfile.TemporaryDirectory(prefix="tts-bench-") as tmp:
+        client = EdgeTTSClient(communicate=communicate)
+        try:
+            jobs = _jobs(os.path.join(tmp, "sequential"), scenes)
+            started = time.perf_counter()
+            for job in jobs:
+                client.synthesize_to_file(job.text, job.output_path)
+            rows.append({"mode": "sequential", "sec": time.perf_counter() - started})
+            for limit in concurrency:
+                jobs = _jobs(os.path.join(tmp, f"many_{limit}"), scenes)
+                started = time.perf_counter()
+                client.synthesize_many(jobs, concurrency=limit)
+                rows.append({"mode": f"many x{limit}", "sec": time.perf_counter() - started})
+        finally:
+            client.close()
+    sequential = rows[0]["sec"]
+    for row in rows:
+        row["speedup"] = sequential / row["sec"]  # type: ignore[operator]
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser("story-video-tts-bench")
+    ap.add_argument("--scenes", type=int, default=24)
+    ap.add_argument("--latency", type=float, default=FakeCommunicate.latency_sec, help="Seconds before the stand-in sends its first chunk")
+    ap.add_argument("--chunk-sec", type=float, default=FakeCommunicate.chunk_sec, help="Seconds between streamed chunks")
+    ap.add_argument("--concurrency", type=str, default="4,8")
+    args = ap.parse_args()
+
+    rows = run(args.scenes, args.latency, args.chunk_sec, [int(c) for c in args.concurrency.split(",") if c.strip()])
+    print(f"{args.scenes} scenes, {args.latency:g}s first-byte latency")
+    print(f"  {'mode':<12}{'sec':>8}{'speedup':>10}")
+    for row in rows:
+        print(f"  {row['mode']:<12}{row['sec']:>8.2f}{row['speedup']:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+from app.config import CONFIG
+from app import profiling
+
+
+def canonical_key(provider: str, model: str, params: Dict[str, Any]) -> str:
+    payload = json.dumps({"provider": provider, "model": model, "params": params}, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ResponseCache:
+    # Raw provider responses stored by content key, shared across projects.
+    # Writes go through temp file + rename so readers never see partial
+    # entries; eviction is serialised across processes with a lock file.
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    @classmethod
+    def from_config(cls) -> "ResponseCache":
+        return cls(os.path.expanduser(CONFIG.provider_cache_dir), CONFIG.provider_cache_max_mb * 1024 * 1024)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.bin")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            profiling.count("provider_cache.misses")
+            return None
+        try:
+            os.utime(path)  # mtime doubles as the LRU clock
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.hits += 1
+        profiling.count("provider_cache.hits")
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._added(len(data))
+
+    def _added(self, nbytes: int) -> None:
+        with self._lock:
+            if self._size is not None:
+                self._size += nbytes
+            over = self._size is None or self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def fetch(self, provider: str, model: str, params: Dict[str, Any], producer: Callable[[], bytes]) -> bytes:
+        key = canonical_key(provider, model, params)
+        data = self.get(key)
+        if data is None:
+            data = producer()
+            self.put(key, data)
+        return data
+
+    def copy_to(self, provider: str, model: str, params: Dict[str, Any], output_path: str) -> bool:
+        path = self._path(canonical_key(provider, model, params))
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        try:
+            shutil.copyfile(path, output_path)
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            profiling.count("provider_cache.misses")
+            return False
+        with self._lock:
+            self.hits += 1
+        profiling.count("provider_cache.hits")
+        return True
+
+    def store_from(self, provider: str, model: str, params: Dict[str, Any], src_path: str) -> None:
+        path = self._path(canonical_key(provider, model, params))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(src_path, tmp)
+        os.replace(tmp, path)
+        self._added(os.path.getsize(path))
+
+    def fetch_to_file(self, provider: str, model: str, params: Dict[str, Any], output_path: str, producer: Callable[[str], Any]) -> str:
+        # File-backed variant: hits and misses are copied on disk, never held in memory
+        if not self.copy_to(provider, model, params, output_path):
+            producer(output_path)
+            self.store_from(provider, model, params, output_path)
+        return output_path
+
+    @contextmanager
+    def _exclusive(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.root, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _entries(self):
+        for sub in os.scandir(self.root):
+            if sub.is_dir():
+                for entry in os.scandir(sub.path):
+                    if entry.name.endswith(".bin"):
+                        try:
+                            st = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        yield entry.path, st.st_size, st.st_mtime
+
+    def evict(self) -> int:
+        with self._exclusive():
+            entries = sorted(self._entries(), key=lambda e: e[2])
+            total = sum(e[1] for e in entries)
+            removed = 0
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+        with self._lock:
+            self._size = total
+        return removed
+
+    def stats(self) -> Dict[str, object]:
+        entries = list(self._entries())
+        return {
+            "path": self.root,
+            "entries": len(entries),
+            "size_bytes": sum(e[1] for e in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        return (
+            f"Provider cache {s['path']}: {s['entries']} responses, "
+            f"{s['size_bytes'] / 1e6:.1f} MB / {s['max_bytes'] / 1e6:.0f} MB, "
+            f"{s['hits']} hits, {s['misses']} misses"
+        )
@@ -23,18 +23,50 @@ class AppConfig:
 
     stability_api_key: Optional[str] = _env("STABILITY_API_KEY")
     stability_engine: str = _env("STABILITY_ENGINE", "stable-diffusion-xl-1024-v1-0") or "stable-diffusion-xl-1024-v1-0"
+    stability_base_url: str = _env("STABILITY_BASE_URL", "https://api.stability.ai") or "https://api.stability.ai"
 
     azure_speech_key: Optional[str] = _env("AZURE_SPEECH_KEY")
     azure_speech_region: Optional[str] = _env("AZURE_SPEECH_REGION")
+    azure_tts_endpoint: Optional[str] = _env("AZURE_TTS_ENDPOINT")
 
     elevenlabs_api_key: Optional[str] = _env("ELEVENLABS_API_KEY")
     elevenlabs_voice_id: Optional[str] = _env("ELEVENLABS_VOICE_ID")
+    elevenlabs_base_url: str = _env("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io/v1") or "https://api.elevenlabs.io/v1"
 
     default_voice_provider: str = _env("DEFAULT_VOICE_PROVIDER", "azure") or "azure"
     default_azure_voice: str = _env("DEFAULT_AZURE_VOICE", "en-US-JennyNeural") or "en-US-JennyNeural"
     default_voice_style: str = _env("DEFAULT_VOICE_STYLE", "narration-professional") or "narration-professional"
 
+    # project file: json (indented), compact (one-line json) or msgpack (project.msgpack, needs msgpack)
+    project_format: str = _env("PROJECT_FORMAT", "json") or "json"
+
+    # "sentence" voices each sentence separately so an edit only re-synthesizes what changed
+    tts_mode: str = _env("TTS_MODE", "paragraph") or "paragraph"
+    tts_sentence_gap_sec: float = float(_env("TTS_SENTENCE_GAP_SEC", "0.25") or "0.25")
+
     default_image_size: str = _env("DEFAULT_IMAGE_SIZE", "1024x1024") or "1024x1024"
+    # Scene images are decoded once into render-ready arrays, so a high save quality costs little
+    jpeg_quality: int = int(_env("JPEG_QUALITY", "95") or "95")
+
+    # e.g. "stability=4:2,azure=8" -> max in flight[:requests per second]
+    provider_limits: str = _env("PROVIDER_LIMITS", "") or ""
+
+    # Streaming generation: paragraphs per image-prompt request, and the bound on each stage queue
+    image_prompt_batch: int = int(_env("IMAGE_PROMPT_BATCH", "3") or "3")
+    pipeline_queue_size: int = int(_env("PIPELINE_QUEUE_SIZE", "8") or "8")
+
+    provider_cache_dir: str = _env("PROVIDER_CACHE_DIR", "~/.cache/story-video-builder/responses") or "~/.cache/story-video-builder/responses"
+    provider_cache_max_mb: int = int(_env("PROVIDER_CACHE_MAX_MB", "1024") or "1024")
+
+    # Narrated scenes last head pad + voiceover + tail pad
+    scene_head_pad_sec: float = float(_env("SCENE_HEAD_PAD_SEC", "0.3") or "0.3")
+    scene_tail_pad_sec: float = float(_env("SCENE_TAIL_PAD_SEC", "0.6") or "0.6")
+
+    # Background music level, and the extra gain applied while narration plays
+    music_volume: float = float(_env("MUSIC_VOLUME", "0.35") or "0.35")
+    music_duck_gain: float = float(_env("MUSIC_DUCK_GAIN", "0.3") or "0.3")
+
+    render_cache_max_mb: int = int(_env("RENDER_CACHE_MAX_MB", "2048") or "2048")
 
 
 CONFIG = AppConfig()
\ No newline at end of file
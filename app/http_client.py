@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, asdict
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app import profiling
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class HttpStats:
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    latency_sec: float = 0.0
+
+    def report(self) -> str:
+        avg = self.latency_sec / self.requests if self.requests else 0.0
+        return (
+            f"HTTP: {self.requests} requests, {self.retries} retries, {self.failures} failures, "
+            f"{self.bytes_sent / 1e6:.2f} MB sent, {self.bytes_received / 1e6:.2f} MB received, "
+            f"avg latency {avg * 1000:.0f} ms"
+        )
+
+
+def _retry_after_seconds(resp: requests.Response) -> Optional[float]:
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _body_size(kwargs: dict) -> int:
+    if kwargs.get("json") is not None:
+        return len(json.dumps(kwargs["json"]).encode("utf-8"))
+    data = kwargs.get("data")
+    if isinstance(data, (bytes, str)):
+        return len(data)
+    files = kwargs.get("files") or {}
+    return sum(len(f[1]) for f in files.values() if isinstance(f, tuple) and isinstance(f[1], bytes))
+
+
+class HttpClient:
+    # One pooled keep-alive session for every REST provider, with jittered
+    # exponential backoff on 429/5xx and connection errors.
+    def __init__(self, pool_size: int = 32, max_retries: int = 4, backoff_base: float = 0.5, backoff_max: float = 30.0, timeout: float = 120.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.stats = HttpStats()
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _count(self, **deltas) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self.stats, name, getattr(self.stats, name) + delta)
+        for name, delta in deltas.items():
+            profiling.count(f"http.{name}", delta)
+
+    def _backoff(self, attempt: int, resp: Optional[requests.Response]) -> float:
+        retry_after = _retry_after_seconds(resp) if resp is not None else None
+        if retry_after is not None:
+            return min(self.backoff_max, retry_after)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method: str, url: str, stream: bool = False, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        sent = _body_size(kwargs)
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            resp: Optional[requests.Response] = None
+            try:
+                with profiling.span(f"http.{method}", "http", url=url, attempt=attempt):
+                    resp = self.session.request(method, url, stream=stream, **kwargs)
+                error: Optional[Exception] = None
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            self._count(requests=1, bytes_sent=sent, latency_sec=time.perf_counter() - started)
+            retryable = error is not None or (resp is not None and resp.status_code in RETRY_STATUSES)
+            if not retryable or attempt >= self.max_retries:
+                if error is not None:
+                    self._count(failures=1)
+                    raise error
+                assert resp is not None
+                if resp.status_code >= 400:
+                    self._count(failures=1)
+                    resp.raise_for_status()
+                if not stream:
+                    self._count(bytes_received=len(resp.content))
+                return resp
+            delay = self._backoff(attempt, resp)
+            if resp is not None:
+                resp.close()
+            self._count(retries=1)
+            attempt += 1
+            time.sleep(delay)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def download(self, method: str, url: str, output_path: str, chunk_size: int = 64 * 1024, **kwargs) -> str:
+        # Stream the body to disk in chunks; the temp file is renamed into
+        # place only once the whole response has arrived.
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        tmp = f"{output_path}.{os.getpid()}.{threading.get_ident()}.part"
+        with self.request(method, url, stream=True, **kwargs) as resp:
+            try:
+                with open(tmp, "wb") as f:
+                    for chunk in resp.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        self._count(bytes_received=len(chunk))
+                os.replace(tmp, output_path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        return output_path
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return asdict(self.stats)
+
+
+_shared: Optional[HttpClient] = None
+_shared_lock = threading.Lock()
+
+
+def shared_http() -> HttpClient:
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HttpClient()
+        return _shared
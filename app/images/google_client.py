@@ -4,21 +4,36 @@ from io import BytesIO
 from typing import Optional
 from PIL import Image
 
-from google import genai
-from google.genai import types
-
 from app.config import CONFIG
+from app.cache import ResponseCache
 
 
 class GoogleImageClient:
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, cache: Optional[ResponseCache] = None):
         self.api_key = api_key or CONFIG.google_api_key
         if not self.api_key:
             raise RuntimeError("GOOGLE_API_KEY not configured")
         self.model = model or CONFIG.google_image_model
+        from google import genai
+
         self.client = genai.Client(api_key=self.api_key)
+        self.cache = cache
 
     def generate(self, prompt: str, width: int = 1024, height: int = 1024) -> Image.Image:
+        if self.cache is None:
+            img_bytes = self._generate_bytes(prompt)
+        else:
+            img_bytes = self.cache.fetch("google", self.model, {"prompt": prompt, "number_of_images": 1}, lambda: self._generate_bytes(prompt))
+        img = Image.open(BytesIO(img_bytes)).convert("RGB")
+        # Keep native pixels when only the scale differs; the renderer resamples
+        # once from the prepared image, and deep zooms use the extra detail.
+        if img.size[0] * height != img.size[1] * width:
+            img = img.resize((width, height), Image.LANCZOS)
+        return img
+
+    def _generate_bytes(self, prompt: str) -> bytes:
+        from google.genai import types
+
         resp = self.client.models.generate_images(
             model=self.model,
             prompt=prompt,
@@ -26,8 +41,4 @@ class GoogleImageClient:
         )
         if not resp.generated_images:
             raise RuntimeError("No images returned from Google image generation")
-        img_bytes = resp.generated_images[0].image.image_bytes
-        img = Image.open(BytesIO(img_bytes)).convert("RGB")
-        if img.size != (width, height):
-            img = img.resize((width, height), Image.LANCZOS)
-        return img
\ No newline at end of file
+        return resp.generated_images[0].image.image_bytes
\ No newline at end of file
@@ -1,8 +1,79 @@
 from __future__ import annotations
 
 from PIL import Image, ImageDraw, ImageFont
+import numpy as np
 import hashlib
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from textwrap import wrap
+from typing import List, Optional, Sequence, Tuple
+
+SPACING = 6
+PAD = 20
+TEXT_FILL = (20, 20, 20)
+
+# Fonts and rasterised captions are cached per process: loading the TTF and
+# rendering glyphs dominated the cost of a placeholder. A caption is drawn
+# once, with ImageDraw's public text API, into a coverage mask; each image is
+# a NumPy fill of the background and panel with that mask pasted in the text
+# colour, which is the same blend ImageDraw.text applies.
+
+
+@lru_cache(maxsize=None)
+def _font(size: int) -> ImageFont.ImageFont:
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size=size)
+    except Exception:
+        return ImageFont.load_default()
+
+
+def _measure_multiline(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.ImageFont, spacing: int) -> tuple[int, int]:
+    try:
+        bbox = draw.multiline_textbbox((0, 0), text, font=font, spacing=spacing, align="center")
+        return bbox[2] - bbox[0], bbox[3] - bbox[1]
+    except Exception:
+        lines = text.split("\n")
+        max_w = 0
+        total_h = 0
+        for idx, line in enumerate(lines):
+            try:
+                lb = font.getbbox(line or " ")
+                lw, lh = lb[2] - lb[0], lb[3] - lb[1]
+            except Exception:
+                lw = int(draw.textlength(line or " ", font=font)) if hasattr(draw, "textlength") else len(line) * max(8, font.size // 2)
+                lh = font.size
+            max_w = max(max_w, lw)
+            total_h += lh
+            if idx < len(lines) - 1:
+                total_h += spacing
+        return max_w, total_h
+
+
+_SCRATCH = ImageDraw.Draw(Image.new("L", (1, 1)))
+
+
+@lru_cache(maxsize=512)
+def _text_block(text_block: str, font_size: int) -> Tuple[int, int, Optional[Tuple[int, int, Image.Image]]]:
+    # -> (measured w, h, (left, top, mask) relative to the draw origin; None means draw the text directly)
+    font = _font(font_size)
+    try:
+        left, top, right, bottom = _SCRATCH.multiline_textbbox((0, 0), text_block, font=font, spacing=SPACING, align="center")
+    except Exception:
+        tw, th = _measure_multiline(_SCRATCH, text_block, font=font, spacing=SPACING)
+        return tw, th, None
+    tw, th = right - left, bottom - top  # what _measure_multiline returns when the bbox works
+    # Whole-pixel origin, so glyphs land on the same sub-pixel phase as a draw at (x, y)
+    left, top = math.floor(left), math.floor(top)
+    mask = Image.new("L", (max(1, math.ceil(right) - left), max(1, math.ceil(bottom) - top)), 0)
+    ImageDraw.Draw(mask).multiline_text((-left, -top), text_block, fill=255, font=font, align="center", spacing=SPACING)
+    return tw, th, (left, top, mask)
+
+
+def _caption(prompt: str) -> str:
+    text = " ".join(prompt.split()[:18]) + ("…" if len(prompt.split()) > 18 else "")
+    return "\n".join(wrap(text, width=28)[:6])
 
 
 class PlaceholderImageClient:
@@ -10,46 +81,40 @@ class PlaceholderImageClient:
         pass
 
     def _measure_multiline(self, draw: ImageDraw.ImageDraw, text: str, font: ImageFont.ImageFont, spacing: int) -> tuple[int, int]:
-        try:
-            bbox = draw.multiline_textbbox((0, 0), text, font=font, spacing=spacing, align="center")
-            return bbox[2] - bbox[0], bbox[3] - bbox[1]
-        except Exception:
-            lines = text.split("\n")
-            max_w = 0
-            total_h = 0
-            for idx, line in enumerate(lines):
-                try:
-                    lb = font.getbbox(line or " ")
-                    lw, lh = lb[2] - lb[0], lb[3] - lb[1]
-                except Exception:
-                    lw = int(draw.textlength(line or " ", font=font)) if hasattr(draw, "textlength") else len(line) * max(8, font.size // 2)
-                    lh = font.size
-                max_w = max(max_w, lw)
-                total_h += lh
-                if idx < len(lines) - 1:
-                    total_h += spacing
-            return max_w, total_h
+        return _measure_multiline(draw, text, font, spacing)
 
     def generate(self, prompt: str, width: int = 1024, height: int = 1024):
         seed = int(hashlib.md5(prompt.encode("utf-8")).hexdigest(), 16)
         bg_r = 160 + (seed % 80)
         bg_g = 160 + ((seed >> 8) % 80)
         bg_b = 160 + ((seed >> 16) % 80)
-        img = Image.new("RGB", (width, height), (bg_r, bg_g, bg_b))
-        draw = ImageDraw.Draw(img)
-        try:
-            font = ImageFont.truetype("DejaVuSans.ttf", size=max(18, width // 32))
-        except Exception:
-            font = ImageFont.load_default()
-        text = " ".join(prompt.split()[:18]) + ("…" if len(prompt.split()) > 18 else "")
-        wrapped = wrap(text, width=28)
-        text_block = "\n".join(wrapped[:6])
-        spacing = 6
-        tw, th = self._measure_multiline(draw, text_block, font=font, spacing=spacing)
+        font_size = max(18, width // 32)
+        text_block = _caption(prompt)
+        tw, th, layout = _text_block(text_block, font_size)
         x = max(10, (width - tw) // 2)
         y = max(10, (height - th) // 2)
-        # Background panel
-        pad = 20
-        draw.rectangle([(x - pad, y - pad), (x + tw + pad, y + th + pad)], fill=(255, 255, 255))
-        draw.multiline_text((x, y), text_block, fill=(20, 20, 20), font=font, align="center", spacing=spacing)
-        return img
\ No newline at end of file
+        pixels = np.empty((height, width, 3), dtype=np.uint8)
+        # One background row broadcast down the rows; a 3-wide last axis fills far slower
+        np.copyto(pixels.reshape(height, width * 3), np.tile(np.array((bg_r, bg_g, bg_b), dtype=np.uint8), width))
+        # Background panel; ImageDraw.rectangle truncates the corners and includes both
+        x0, y0, x1, y1 = (int(v) for v in (x - PAD, y - PAD, x + tw + PAD, y + th + PAD))
+        pixels[max(0, y0):max(0, y1 + 1), max(0, x0):max(0, x1 + 1)] = 255
+        img = Image.fromarray(pixels)
+        if layout is not None:
+            left, top, mask = layout
+            img.paste(TEXT_FILL, (int(x) + left, int(y) + top), mask)
+        else:
+            ImageDraw.Draw(img).multiline_text((x, y), text_block, fill=TEXT_FILL, font=_font(font_size), align="center", spacing=SPACING)
+        return img
+
+    def generate_many(self, prompts: Sequence[str], width: int = 1024, height: int = 1024, workers: Optional[int] = None) -> List[Image.Image]:
+        # Same images as calling generate() per prompt, spread over processes for big fixture sets
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(prompts) < 2 * workers:
+            return [self.generate(p, width, height) for p in prompts]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_generate, prompts, [width] * len(prompts), [height] * len(prompts), chunksize=max(1, len(prompts) // (workers * 4))))
+
+
+def _generate(prompt: str, width: int, height: int) -> Image.Image:
+    return PlaceholderImageClient().generate(prompt, width, height)
@@ -1,18 +1,33 @@
 from __future__ import annotations
 
-from typing import Dict, List
-import google.generativeai as genai
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
 
 from app.config import CONFIG
+from app.cache import ResponseCache, canonical_key
+from app.llm.json_stream import ArrayStringStream, is_clean_paragraph, normalize_outline, outline_errors
+from app import profiling
 
 
 class GeminiClient:
-    def __init__(self, api_key: str | None = None, model_name: str = "gemini-1.5-pro"):
+    def __init__(self, api_key: str | None = None, model_name: str = "gemini-1.5-pro", cache: ResponseCache | None = None):
         self.api_key = api_key or CONFIG.google_api_key
         if not self.api_key:
             raise RuntimeError("GOOGLE_API_KEY not configured")
+        import google.generativeai as genai  # ~1s to import; only paid when Gemini is used
+
         genai.configure(api_key=self.api_key)
+        self.model_name = model_name
         self.model = genai.GenerativeModel(model_name)
+        self.cache = cache
+
+    @profiling.traced("gemini.generate", "provider")
+    def _generate_text(self, prompt: str) -> str:
+        if self.cache is None:
+            return self.model.generate_content(prompt).text or ""
+        raw = self.cache.fetch("gemini", self.model_name, {"prompt": prompt}, lambda: (self.model.generate_content(prompt).text or "").encode("utf-8"))
+        return raw.decode("utf-8")
 
     def _extract_json(self, text: str) -> Dict | None:
         import json, re
@@ -37,14 +52,7 @@ class GeminiClient:
                 return None
         return None
 
-    def generate_story_outline(
-        self,
-        title: str,
-        num_paragraphs: int,
-        audience: str = "sleepy story",
-        style_prompt: str | None = None,
-        source_url: str | None = None,
-    ) -> Dict:
+    def _outline_prompt(self, title: str, num_paragraphs: int, audience: str, style_prompt: str | None, source_url: str | None) -> str:
         instr = (
             "You are an expert YouTube scriptwriter focused on retention. "
             "Write a calm sleepy story with gentle hooks, micro-tension, and curiosity loops. "
@@ -63,46 +71,74 @@ class GeminiClient:
             "  \"paragraphs\": string[],\n"
             "  \"retention_notes\": string[]\n"
             "}\n"
+            "Put \"paragraphs\" before \"retention_notes\". Each paragraph is plain prose, never JSON or markdown.\n"
             "Output: JSON only."
         )
-        prompt = instr + "\n\n" + user
-        resp = self.model.generate_content(prompt)
-        text = resp.text or ""
-        data = self._extract_json(text)
-        if data and isinstance(data, dict) and isinstance(data.get("paragraphs"), list):
-            # Normalize paragraph count
-            paragraphs: List[str] = [p.strip() for p in data.get("paragraphs", []) if isinstance(p, str) and p.strip()]
-            if len(paragraphs) < num_paragraphs:
-                # fallback: split text to get more
-                extra_src = "\n\n".join(paragraphs) or text
-                chunks = [c.strip() for c in extra_src.split("\n\n") if c.strip()]
-                for c in chunks:
-                    if len(paragraphs) >= num_paragraphs:
-                        break
-                    if c not in paragraphs:
-                        paragraphs.append(c)
-            data["paragraphs"] = paragraphs[:num_paragraphs]
-            if "outline" in data and isinstance(data["outline"], list):
-                data["outline"] = data["outline"][:num_paragraphs]
-            return data
-        # Fallback: build distinct paragraphs by splitting on blank lines
-        parts = [p.strip() for p in text.split("\n\n") if p.strip()]
-        if not parts:
-            parts = [text.strip()] * num_paragraphs
-        elif len(parts) < num_paragraphs:
-            # expand by sentence groups
-            sentences = [s.strip() for s in text.replace("\n", " ").split(".") if s.strip()]
-            while len(parts) < num_paragraphs and sentences:
-                parts.append(". ".join(sentences[:3]) + ".")
-                sentences = sentences[3:]
-            while len(parts) < num_paragraphs:
-                parts.append(parts[-1])
-        return {
-            "hook": parts[0][:180] if parts else title,
-            "outline": [f"Part {i+1}" for i in range(num_paragraphs)],
-            "paragraphs": parts[:num_paragraphs],
-            "retention_notes": [],
-        }
+        return instr + "\n\n" + user
+
+    def _repair_prompt(self, original: str, reply: str, errors: List[str], kept: List[str], num_paragraphs: int) -> str:
+        lines = [
+            original,
+            "",
+            "Your previous reply did not match the schema: " + "; ".join(errors) + ".",
+            "Previous reply:",
+            reply[:8000],
+            "",
+            f"Return the complete corrected JSON only, with exactly {num_paragraphs} plain prose paragraphs.",
+        ]
+        if kept:
+            lines.append(f"Keep these first {len(kept)} paragraphs exactly as they are and continue the story after them:")
+            lines.extend(json.dumps(p, ensure_ascii=False) for p in kept)
+        return "\n".join(lines)
+
+    def _json_params(self, prompt: str) -> Dict:
+        return {"prompt": prompt, "response_mime_type": "application/json"}
+
+    def _stream_json_text(self, prompt: str) -> Iterator[str]:
+        # JSON response mode, streamed; a cached reply is replayed as one chunk
+        if self.cache is not None:
+            cached = self.cache.get(canonical_key("gemini", self.model_name, self._json_params(prompt)))
+            if cached is not None:
+                yield cached.decode("utf-8")
+                return
+        with profiling.span("gemini.stream", "provider"):
+            response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"}, stream=True)
+            for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:  # chunk without text parts (e.g. finish metadata)
+                    continue
+                if text:
+                    profiling.count("gemini.stream_bytes", len(text))
+                    yield text
+
+    def _store_json_text(self, prompt: str, text: str) -> None:
+        if self.cache is not None:
+            self.cache.put(canonical_key("gemini", self.model_name, self._json_params(prompt)), text.encode("utf-8"))
+
+    def stream_story_outline(
+        self,
+        title: str,
+        num_paragraphs: int,
+        audience: str = "sleepy story",
+        style_prompt: str | None = None,
+        source_url: str | None = None,
+        max_repairs: int = 2,
+    ) -> "OutlineStream":
+        return OutlineStream(self, self._outline_prompt(title, num_paragraphs, audience, style_prompt, source_url), num_paragraphs, max_repairs)
+
+    def generate_story_outline(
+        self,
+        title: str,
+        num_paragraphs: int,
+        audience: str = "sleepy story",
+        style_prompt: str | None = None,
+        source_url: str | None = None,
+    ) -> Dict:
+        stream = self.stream_story_outline(title, num_paragraphs, audience=audience, style_prompt=style_prompt, source_url=source_url)
+        for _ in stream:
+            pass
+        return stream.outline
 
     def image_prompt_for_paragraph(self, paragraph: str, style_prompt: str | None) -> str:
         base = (
@@ -110,4 +146,133 @@ class GeminiClient:
             "No text in the image. Keep it calm and suitable for a sleepy story."
         )
         style = f" Style: {style_prompt}." if style_prompt else ""
-        return f"{base}{style} Paragraph: {paragraph}"
\ No newline at end of file
+        return f"{base}{style} Paragraph: {paragraph}"
+
+    def _valid_image_prompt(self, value) -> bool:
+        if not isinstance(value, str):
+            return False
+        value = value.strip()
+        return 20 <= len(value) <= 1200 and "```" not in value and not value.startswith(("{", "["))
+
+    def _image_prompt_request(self, paragraphs: List[str], style_prompt: str | None, context: List[str] | None) -> str:
+        style = style_prompt or "calm, minimalist"
+        lines = [
+            "You write prompts for an image model that illustrates a calm sleepy story, one image per paragraph.",
+            "Keep characters, setting, palette and art style consistent across every prompt.",
+            "Each prompt: one vivid sentence or two, concrete subjects, composition and lighting. No text in the image.",
+            f"Art style for all images: {style}.",
+            "Return ONLY valid JSON. No extra text. No markdown fences.",
+            'JSON schema: {"prompts": [{"index": int, "prompt": string}]}, one entry per paragraph below, same order.',
+        ]
+        if context:
+            lines.append("Full story, for continuity:")
+            lines.extend(f"- {c}" for c in context)
+        lines.append("Paragraphs to illustrate:")
+        lines.extend(f"{i}: {p}" for i, p in enumerate(paragraphs))
+        return "\n".join(lines)
+
+    def _parse_image_prompts(self, text: str, count: int) -> Dict[int, str]:
+        data = self._extract_json(text)
+        items = data.get("prompts") if isinstance(data, dict) else data
+        prompts: Dict[int, str] = {}
+        if not isinstance(items, list):
+            return prompts
+        for pos, item in enumerate(items):
+            if isinstance(item, dict):
+                idx, value = item.get("index", pos), item.get("prompt")
+            else:
+                idx, value = pos, item
+            if isinstance(idx, int) and 0 <= idx < count and idx not in prompts and self._valid_image_prompt(value):
+                prompts[idx] = value.strip()
+        return prompts
+
+    def _single_image_prompt(self, paragraph: str, style_prompt: str | None, context: List[str] | None) -> Optional[str]:
+        try:
+            return self._parse_image_prompts(self._generate_text(self._image_prompt_request([paragraph], style_prompt, context)), 1).get(0)
+        except Exception:
+            return None
+
+    def image_prompts_for_paragraphs(self, paragraphs: List[str], style_prompt: str | None, context: List[str] | None = None, retry_workers: int = 4) -> List[str]:
+        # One structured request for the whole story; only items that come back
+        # missing or malformed are retried one by one (concurrently), and any
+        # that still fail use the plain template.
+        if not paragraphs:
+            return []
+        try:
+            prompts = self._parse_image_prompts(self._generate_text(self._image_prompt_request(paragraphs, style_prompt, context)), len(paragraphs))
+        except Exception:
+            prompts = {}
+        missing = [i for i in range(len(paragraphs)) if i not in prompts]
+        if missing:
+            story = context or paragraphs
+            with ThreadPoolExecutor(max_workers=max(1, min(retry_workers, len(missing)))) as pool:
+                retried = pool.map(lambda i: self._single_image_prompt(paragraphs[i], style_prompt, story), missing)
+                for i, prompt in zip(missing, retried):
+                    if prompt:
+                        prompts[i] = prompt
+        return [prompts.get(i) or self.image_prompt_for_paragraph(p, style_prompt) for i, p in enumerate(paragraphs)]
+
+
+class OutlineStream:
+    # Iterating yields each clean paragraph as soon as its closing quote
+    # streams in, so scene work can start early. After iteration `outline`
+    # holds the validated outline. A reply that fails the schema is repaired
+    # at most `max_repairs` times; paragraphs already yielded are kept and
+    # the repair only contributes the ones after them.
+    def __init__(self, client: GeminiClient, prompt: str, num_paragraphs: int, max_repairs: int = 2):
+        self.client = client
+        self.prompt = prompt
+        self.num_paragraphs = num_paragraphs
+        self.max_repairs = max_repairs
+        self.paragraphs: List[str] = []
+        self.outline: Dict = {}
+        self.errors: List[str] = []
+        self.attempts = 0
+        self._clean_seen = 0
+
+    def _take(self, candidates: List[str]) -> Iterator[str]:
+        # Counts clean paragraphs in the current reply; only those past the ones
+        # already yielded (from an earlier attempt) are new.
+        for p in candidates:
+            if not is_clean_paragraph(p):
+                continue
+            self._clean_seen += 1
+            if self._clean_seen > len(self.paragraphs) and len(self.paragraphs) < self.num_paragraphs:
+                self.paragraphs.append(p.strip())
+                yield self.paragraphs[-1]
+
+    def __iter__(self) -> Iterator[str]:
+        prompt = self.prompt
+        data = None
+        validated = None
+        for attempt in range(self.max_repairs + 1):
+            self.attempts = attempt + 1
+            parser = ArrayStringStream("paragraphs")
+            self._clean_seen = 0
+            try:
+                for chunk in self.client._stream_json_text(prompt):
+                    yield from self._take(parser.feed(chunk))
+                data = parser.document()
+                errors = outline_errors(data, self.num_paragraphs)
+            except Exception as e:
+                data, errors = None, [f"request failed: {type(e).__name__}: {e}"]
+            if isinstance(data, dict) and isinstance(data.get("paragraphs"), list):
+                # Whatever the incremental pass missed (e.g. a reply that isn't streamed in order)
+                yield from self._take([p for p in data["paragraphs"] if is_clean_paragraph(p)][self._clean_seen:])
+            if not errors:
+                validated = parser.text
+                break
+            self.errors = errors
+            if len(self.paragraphs) >= self.num_paragraphs:
+                break  # only metadata is off; normalize_outline fills it in
+            prompt = self.client._repair_prompt(self.prompt, parser.text, errors, self.paragraphs, self.num_paragraphs)
+        if not self.paragraphs:
+            raise RuntimeError("Gemini outline failed validation: " + "; ".join(self.errors))
+        if len(self.paragraphs) < self.num_paragraphs:
+            print(f"Outline has {len(self.paragraphs)} of {self.num_paragraphs} paragraphs after {self.attempts} attempts: {'; '.join(self.errors)}")
+        self.outline = normalize_outline(data if isinstance(data, dict) else {}, self.paragraphs, self.num_paragraphs)
+        if validated is not None:
+            # Cached under the original request, so the next run of the same
+            # title replays it. After a repair that is the merged outline (the
+            # kept paragraphs plus the repair's), not the repair reply itself.
+            self.client._store_json_text(self.prompt, validated if self.attempts == 1 else json.dumps(self.outline, ensure_ascii=False))
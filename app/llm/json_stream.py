@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Incremental reader for model output shaped like {"paragraphs": ["...", ...], ...}.
+# Chunks are fed as they arrive and every string in the watched top-level
+# array is handed back the moment its closing quote is seen, long before the
+# document is complete. Anything before the first "{" (a ```json fence, a
+# stray sentence) is skipped.
+
+
+class ArrayStringStream:
+    def __init__(self, key: str = "paragraphs"):
+        self.key = key
+        self.text_parts: List[str] = []
+        self.started = False
+        self.done = False
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._raw: List[str] = []
+        self._expect_key = False
+        self._last_key: Optional[str] = None
+        self._watching = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self.text_parts)
+
+    def feed(self, chunk: str) -> List[str]:
+        self.text_parts.append(chunk)
+        found: List[str] = []
+        for ch in chunk:
+            if self.done:
+                break
+            if not self.started:
+                if ch != "{":
+                    continue
+                self.started = True
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    self._raw.append(ch)
+                elif ch == "\\":
+                    self._escape = True
+                    self._raw.append(ch)
+                elif ch == '"':
+                    self._in_string = False
+                    self._close_string(found)
+                else:
+                    self._raw.append(ch)
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._raw = []
+            elif ch in "{[":
+                if ch == "[" and len(self._stack) == 1 and self._last_key == self.key:
+                    self._watching = True
+                self._stack.append(ch)
+                self._expect_key = ch == "{"
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if len(self._stack) == 1:
+                    self._watching = False
+                if not self._stack:
+                    self.done = True
+            elif ch == ",":
+                self._expect_key = bool(self._stack) and self._stack[-1] == "{"
+            elif ch == ":":
+                self._expect_key = False
+        return found
+
+    def _close_string(self, found: List[str]) -> None:
+        raw = "".join(self._raw)
+        if self._expect_key and self._stack and self._stack[-1] == "{":
+            if len(self._stack) == 1:
+                self._last_key = _decode(raw)
+            return
+        if self._watching and len(self._stack) == 2 and self._stack[-1] == "[":
+            value = _decode(raw)
+            if value is not None:
+                found.append(value)
+
+    def document(self) -> Optional[Any]:
+        text = self.text
+        start = text.find("{")
+        end = text.rfind("}")
+        if start == -1 or end <= start:
+            return None
+        try:
+            return json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+
+
+def _decode(raw: str) -> Optional[str]:
+    try:
+        return json.loads(f'"{raw}"')
+    except json.JSONDecodeError:
+        return None
+
+
+def iter_array_strings(chunks: Iterable[str], key: str = "paragraphs") -> Iterator[str]:
+    stream = ArrayStringStream(key)
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+
+
+def is_clean_paragraph(value: Any, min_chars: int = 20, max_chars: int = 3000) -> bool:
+    # Rejects the failure mode where a whole fenced JSON reply ends up as one "paragraph"
+    if not isinstance(value, str):
+        return False
+    s = value.strip()
+    if not (min_chars <= len(s) <= max_chars):
+        return False
+    if s.startswith(("{", "[", "```")) or "```" in s:
+        return False
+    return '"paragraphs"' not in s and '"outline"' not in s
+
+
+def outline_errors(data: Any, num_paragraphs: int) -> List[str]:
+    if not isinstance(data, dict):
+        return ["response is not a JSON object"]
+    errors = []
+    if not isinstance(data.get("hook"), str):
+        errors.append("'hook' must be a string")
+    for key in ("outline", "retention_notes"):
+        if not isinstance(data.get(key, []), list):
+            errors.append(f"'{key}' must be an array of strings")
+    paragraphs = data.get("paragraphs")
+    if not isinstance(paragraphs, list):
+        errors.append("'paragraphs' must be an array of strings")
+        return errors
+    bad = [i for i, p in enumerate(paragraphs) if not is_clean_paragraph(p)]
+    if bad:
+        errors.append(f"paragraphs {bad} are not plain prose paragraphs")
+    if len(paragraphs) - len(bad) < num_paragraphs:
+        errors.append(f"expected {num_paragraphs} paragraphs, got {len(paragraphs) - len(bad)} usable")
+    return errors
+
+
+def normalize_outline(data: Dict[str, Any], paragraphs: List[str], num_paragraphs: int) -> Dict[str, Any]:
+    outline = data.get("outline") if isinstance(data.get("outline"), list) else []
+    notes = data.get("retention_notes") if isinstance(data.get("retention_notes"), list) else []
+    return {
+        "hook": data.get("hook") if isinstance(data.get("hook"), str) else (paragraphs[0][:180] if paragraphs else ""),
+        "outline": [o for o in outline if isinstance(o, str)][:num_paragraphs],
+        "paragraphs": paragraphs[:num_paragraphs],
+        "retention_notes": [n for n in notes if isinstance(n, str)],
+    }
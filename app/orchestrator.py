@@ -1,22 +1,23 @@
 from __future__ import annotations
 
 import argparse
-import json
 import os
-from typing import List, Optional
-
-from PIL import Image
+from typing import Any, Callable, Dict, List, Optional
 
 from app.config import CONFIG
-from app.schema import VideoProject, ProjectMeta, Scene, VoiceSpec, ImageMotion, slugify
-from app.llm.gemini_client import GeminiClient
-from app.images.stability_client import StabilityClient
-from app.images.placeholder_client import PlaceholderImageClient
-from app.images.google_client import GoogleImageClient
-from app.tts.azure_tts_client import AzureTTSClient
-from app.tts.elevenlabs_client import ElevenLabsClient
-from app.tts.edge_tts_client import EdgeTTSClient
-from app.renderer.video_renderer import render_video
+from app import profiling
+from app.schema import VideoProject, ProjectMeta, Scene, ImageMotion, slugify
+from app.providers import ProviderRegistry, Providers, build_voice_spec
+from app.pipeline import asset_complete, generate_assets, generate_streaming
+from app.persistence import load_project, project_file, save_project
+from app.cache import ResponseCache
+from app.renderer.timeline import fit_scene_durations
+from app.renderer.preview import PREVIEW_ENCODER, PREVIEW_FPS, PREVIEW_SCALE, preview_project
+from app.renderer.segment_cache import SegmentCache
+
+
+# (event name, details) -> None; the job server streams these to clients
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
 
 
 def ensure_dir(path: str) -> None:
@@ -28,195 +29,188 @@ def parse_size(s: str) -> tuple[int, int]:
     return int(w), int(h)
 
 
-def generate_project(title: str, num_paragraphs: int, style_prompt: Optional[str], reference_image: Optional[str], image_provider: str, voice_provider: str, azure_voice: Optional[str], elevenlabs_voice_id: Optional[str], width: int, height: int, out_dir: str, source_url: Optional[str]) -> VideoProject:
+def resolve_providers(image_provider: Optional[str], voice_provider: Optional[str]) -> tuple[str, str]:
+    # Determine providers if not explicitly set
+    img = image_provider or ("stability" if CONFIG.stability_api_key else ("google" if CONFIG.google_api_key else "placeholder"))
+    voice = voice_provider or ("azure" if CONFIG.azure_speech_key and CONFIG.azure_speech_region else "edge")
+    return img, voice
+
+
+def parse_regen_targets(which: str) -> List[int]:
+    # "scene:3-7,12" -> [3, 4, 5, 6, 7, 12]
+    kind, _, spec = which.partition(":")
+    if kind != "scene" or not spec.strip():
+        raise ValueError("Use --regen scene:<id>[-<id>][,<id>...]")
+    ids: List[int] = []
+    for item in spec.split(","):
+        first, _, last = item.strip().partition("-")
+        start, stop = int(first), int(last or first)
+        if stop < start:
+            raise ValueError(f"Empty scene range: {item.strip()}")
+        ids.extend(i for i in range(start, stop + 1) if i not in ids)
+    return ids
+
+
+def _providers(image_provider: str, voice_provider: str, cache: Optional[ResponseCache], registry: Optional[ProviderRegistry]) -> Providers:
+    if registry is not None:
+        return registry.get(image_provider, voice_provider)
+    return Providers(image_provider, voice_provider, cache=cache)
+
+
+def _gemini(cache: Optional[ResponseCache], registry: Optional[ProviderRegistry]):
+    if registry is not None:
+        return registry.gemini()
+    from app.llm.gemini_client import GeminiClient
+    return GeminiClient(cache=cache)
+
+
+def _emit(progress: Optional[ProgressCallback], event: str, **details) -> None:
+    if progress is not None:
+        progress(event, details)
+
+
+def generate_project(title: str, num_paragraphs: int, style_prompt: Optional[str], reference_image: Optional[str], image_provider: str, voice_provider: str, azure_voice: Optional[str], elevenlabs_voice_id: Optional[str], width: int, height: int, out_dir: str, source_url: Optional[str], cache: Optional[ResponseCache] = None, resume: bool = False, head_pad: Optional[float] = None, tail_pad: Optional[float] = None, registry: Optional[ProviderRegistry] = None, progress: Optional[ProgressCallback] = None, tts_mode: Optional[str] = None) -> VideoProject:
     ensure_dir(out_dir)
     assets_dir = os.path.join(out_dir, "assets")
     ensure_dir(assets_dir)
-
-    gemini = GeminiClient()
-    story = gemini.generate_story_outline(title=title, num_paragraphs=num_paragraphs, style_prompt=style_prompt, source_url=source_url)
-
-    meta = ProjectMeta(
-        title=title,
-        slug=slugify(title),
-        style_prompt=style_prompt,
-        reference_image=reference_image,
-        image_provider=image_provider,  # type: ignore
-        tts_provider=voice_provider,  # type: ignore
-    )
-
-    # Build scenes
-    scenes: List[Scene] = []
-    for idx, paragraph in enumerate(story.get("paragraphs", [])[:num_paragraphs]):
-        image_prompt = gemini.image_prompt_for_paragraph(paragraph, style_prompt)
-        voice_spec: Optional[VoiceSpec]
-        if voice_provider == "none":
-            voice_spec = VoiceSpec(provider="none")
-        elif voice_provider == "azure":
-            voice_spec = VoiceSpec(
-                provider="azure",
-                voice_name_or_id=(azure_voice or CONFIG.default_azure_voice),
-                style=(CONFIG.default_voice_style),
-            )
-        elif voice_provider == "elevenlabs":
-            voice_spec = VoiceSpec(
-                provider="elevenlabs",
-                voice_name_or_id=(elevenlabs_voice_id or CONFIG.elevenlabs_voice_id or ""),
+    project_json = project_file(out_dir)
+
+    project: Optional[VideoProject] = None
+    if resume and os.path.exists(project_json):
+        # Reuse the stored outline and scenes; only unfinished assets are generated
+        project = load_project(project_json)
+        if project.meta.story is None:
+            # Interrupted while the outline was still streaming; its scenes may not match a new reply
+            print(f"Outline in {project_json} never finished; starting over")
+            project = None
+        else:
+            print(f"Resuming project: {project_json}")
+
+    def on_asset(scene: Scene, kind: str) -> None:
+        save_project(project, project_json)
+        _emit(progress, kind, scene=scene.scene_id)
+
+    if project is not None:
+        # Image and voice jobs for every scene run concurrently, per-provider limits apply.
+        # Each finished asset is checkpointed so a crash mid-project loses nothing done.
+        providers = _providers(project.meta.image_provider, project.meta.tts_provider, cache, registry)
+        # The outline finished but some prompt batches may not have come back before the failure
+        unprompted = [s for s in project.scenes if s.image_prompt is None and not asset_complete(s.image_path, s.image_sha256)]
+        if unprompted:
+            gemini = _gemini(cache, registry)
+            with profiling.span("generate.image_prompts", "stage", paragraphs=len(unprompted)):
+                prompts = gemini.image_prompts_for_paragraphs([s.paragraph_text for s in unprompted], project.meta.style_prompt, context=[s.paragraph_text for s in project.scenes])
+            for scene, prompt in zip(unprompted, prompts):
+                scene.image_prompt = prompt
+        with profiling.span("generate.assets", "stage", scenes=len(project.scenes)):
+            generate_assets(
+                project,
+                providers,
+                reference_image=project.meta.reference_image,
+                on_asset=on_asset,
+                resume=resume,
             )
-        else:  # edge
-            voice_spec = VoiceSpec(
-                provider="edge",
-                voice_name_or_id=azure_voice or "en-US-JennyNeural",
+    else:
+        gemini = _gemini(cache, registry)
+        meta = ProjectMeta(
+            title=title,
+            slug=slugify(title),
+            style_prompt=style_prompt,
+            reference_image=reference_image,
+            image_provider=image_provider,  # type: ignore
+            tts_provider=voice_provider,  # type: ignore
+            tts_mode=tts_mode or CONFIG.tts_mode,  # type: ignore
+        )
+        project = VideoProject(
+            meta=meta,
+            scenes=[],
+            assets_dir=assets_dir,
+            width=width,
+            height=height,
+            output_video_path=os.path.join(out_dir, f"{meta.slug}.mp4"),
+        )
+        save_project(project, project_json)
+
+        # Scenes are created as paragraphs stream out of Gemini; voice starts at
+        # once, images once their prompt batch is back. meta.story is set and
+        # checkpointed as soon as the outline is complete, which is what
+        # --resume checks for; assets still in flight then resume normally.
+        voice_spec = build_voice_spec(voice_provider, azure_voice, elevenlabs_voice_id)
+        stream = gemini.stream_story_outline(title=title, num_paragraphs=num_paragraphs, style_prompt=style_prompt, source_url=source_url)
+        providers = _providers(image_provider, voice_provider, cache, registry)
+
+        def on_outline() -> None:
+            project.meta.story = stream.outline
+            save_project(project, project_json)
+            _emit(progress, "outline", paragraphs=len(project.scenes), attempts=stream.attempts)
+
+        with profiling.span("generate.stream", "stage"):
+            generate_streaming(
+                project,
+                providers,
+                stream,
+                lambda scene_id, paragraph: Scene(scene_id=scene_id, paragraph_text=paragraph, motion=ImageMotion(), voice=voice_spec.model_copy()),
+                image_prompts=lambda batch, story: gemini.image_prompts_for_paragraphs(batch, style_prompt, context=story),
+                reference_image=reference_image,
+                on_asset=on_asset,
+                on_outline=on_outline,
             )
-        duration = 6.0
-        scenes.append(Scene(
-            scene_id=idx + 1,
-            paragraph_text=paragraph,
-            image_prompt=image_prompt,
-            duration_sec=duration,
-            motion=ImageMotion(),
-            voice=voice_spec,
-        ))
-
-    project = VideoProject(
-        meta=meta,
-        scenes=scenes,
-        assets_dir=assets_dir,
-        width=width,
-        height=height,
-        output_video_path=os.path.join(out_dir, f"{meta.slug}.mp4"),
-    )
-
-    # Providers
-    placeholder = PlaceholderImageClient() if image_provider == "placeholder" else None
-    stability = StabilityClient() if image_provider == "stability" else None
-    google_img = GoogleImageClient() if image_provider == "google" else None
-    tts_azure = AzureTTSClient() if voice_provider == "azure" else None
-    tts_el = ElevenLabsClient() if voice_provider == "elevenlabs" else None
-    tts_edge = EdgeTTSClient() if voice_provider == "edge" else None
-
-    ref_img = reference_image
-    for scene in project.scenes:
-        # Image
-        if image_provider == "stability":
-            if ref_img:
-                img = stability.img2img(scene.image_prompt, ref_img, strength=0.35, width=project.width, height=project.height)
-            else:
-                img = stability.generate(scene.image_prompt, width=project.width, height=project.height)
-        elif image_provider == "google":
-            img = google_img.generate(scene.image_prompt or scene.paragraph_text, width=project.width, height=project.height)
-        else:
-            img = placeholder.generate(scene.image_prompt or scene.paragraph_text, width=project.width, height=project.height)
-        img_path = os.path.join(project.assets_dir, f"scene_{scene.scene_id:02d}.jpg")
-        img.save(img_path)
-        scene.image_path = img_path
-
-        # Voice
-        if voice_provider == "azure":
-            voice_out = os.path.join(project.assets_dir, f"scene_{scene.scene_id:02d}.mp3")
-            assert scene.voice
-            tts_azure.synthesize_to_file(text=scene.paragraph_text, output_path=voice_out, voice_name=scene.voice.voice_name_or_id, style=scene.voice.style)
-            scene.voiceover_path = voice_out
-        elif voice_provider == "elevenlabs":
-            voice_out = os.path.join(project.assets_dir, f"scene_{scene.scene_id:02d}.mp3")
-            assert scene.voice
-            tts_el.synthesize_to_file(text=scene.paragraph_text, output_path=voice_out, voice_id=scene.voice.voice_name_or_id)
-            scene.voiceover_path = voice_out
-        elif voice_provider == "edge":
-            voice_out = os.path.join(project.assets_dir, f"scene_{scene.scene_id:02d}.mp3")
-            assert scene.voice
-            tts_edge.synthesize_to_file(text=scene.paragraph_text, output_path=voice_out, voice=scene.voice.voice_name_or_id, rate=scene.voice.rate, pitch=scene.voice.pitch)
-            scene.voiceover_path = voice_out
-        else:
-            scene.voiceover_path = None
-
-    # Save JSON
-    project_json = os.path.join(out_dir, "project.json")
-    with open(project_json, "w", encoding="utf-8") as f:
-        json.dump(json.loads(project.model_dump_json(indent=2)), f, indent=2)
+    with profiling.span("generate.timing", "stage"):
+        fit_scene_durations(
+            project,
+            CONFIG.scene_head_pad_sec if head_pad is None else head_pad,
+            CONFIG.scene_tail_pad_sec if tail_pad is None else tail_pad,
+        )
+    save_project(project, project_json)
+    _emit(progress, "timing", duration_sec=round(sum(s.duration_sec or 0.0 for s in project.scenes), 3))
 
     print(f"Project created: {project_json}")
     return project
 
 
-def load_project(project_json_path: str) -> VideoProject:
-    with open(project_json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return VideoProject.model_validate(data)
-
-
-def save_project(project: VideoProject, path: str) -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(json.loads(project.model_dump_json(indent=2)), f, indent=2)
-
-
-def regenerate(project: VideoProject, which: str, what: List[str], style_prompt: Optional[str], reference_image: Optional[str]) -> VideoProject:
+def regenerate(project: VideoProject, which: str, what: List[str], style_prompt: Optional[str], reference_image: Optional[str], cache: Optional[ResponseCache] = None, head_pad: Optional[float] = None, tail_pad: Optional[float] = None, registry: Optional[ProviderRegistry] = None, progress: Optional[ProgressCallback] = None) -> VideoProject:
     ensure_dir(project.assets_dir)
     regenerate_image = "image" in what or "both" in what
     regenerate_voice = "voice" in what or "both" in what
 
-    gemini = GeminiClient()
-    # Image providers
-    img_provider = project.meta.image_provider
-    stability = StabilityClient() if img_provider == "stability" else None
-    placeholder = PlaceholderImageClient() if img_provider == "placeholder" else None
-    google_img = GoogleImageClient() if img_provider == "google" else None
+    providers = _providers(project.meta.image_provider, project.meta.tts_provider, cache, registry)
 
-    parts = which.split(":")
-    if parts[0] != "scene":
-        raise ValueError("Use --regen scene:<id>")
-    scene_id = int(parts[1])
-
-    target_scene = next(s for s in project.scenes if s.scene_id == scene_id)
+    by_id = {s.scene_id: s for s in project.scenes}
+    scene_ids = parse_regen_targets(which)
+    unknown = [i for i in scene_ids if i not in by_id]
+    if unknown:
+        raise ValueError(f"No such scene(s): {', '.join(map(str, unknown))}")
+    targets = [by_id[i] for i in scene_ids]
     if style_prompt is None:
         style_prompt = project.meta.style_prompt
 
     if regenerate_image:
-        target_scene.image_prompt = gemini.image_prompt_for_paragraph(target_scene.paragraph_text, style_prompt)
-        if img_provider == "stability":
-            if reference_image or project.meta.reference_image:
-                ref = reference_image or project.meta.reference_image
-                img = stability.img2img(target_scene.image_prompt, ref, strength=0.35, width=project.width, height=project.height)
-            else:
-                img = stability.generate(target_scene.image_prompt, width=project.width, height=project.height)
-        elif img_provider == "google":
-            img = google_img.generate(target_scene.image_prompt or target_scene.paragraph_text, width=project.width, height=project.height)
-        else:
-            img = placeholder.generate(target_scene.image_prompt or target_scene.paragraph_text, width=project.width, height=project.height)
-        img_path = os.path.join(project.assets_dir, f"scene_{target_scene.scene_id:02d}.jpg")
-        img.save(img_path)
-        target_scene.image_path = img_path
-
-    if regenerate_voice and project.meta.tts_provider != "none":
-        out = os.path.join(project.assets_dir, f"scene_{target_scene.scene_id:02d}.mp3")
-        if project.meta.tts_provider == "azure":
-            assert target_scene.voice
-            AzureTTSClient().synthesize_to_file(
-                text=target_scene.paragraph_text,
-                output_path=out,
-                voice_name=target_scene.voice.voice_name_or_id,
-                style=target_scene.voice.style,
-                rate=target_scene.voice.rate,
-                pitch=target_scene.voice.pitch,
-            )
-        elif project.meta.tts_provider == "elevenlabs":
-            assert target_scene.voice
-            ElevenLabsClient().synthesize_to_file(
-                text=target_scene.paragraph_text,
-                output_path=out,
-                voice_id=target_scene.voice.voice_name_or_id,
+        # One Gemini call covers every target; their assets then run concurrently under the provider limits
+        gemini = _gemini(cache, registry)
+        with profiling.span("regen.prompt", "stage", scenes=len(targets)):
+            prompts = gemini.image_prompts_for_paragraphs(
+                [s.paragraph_text for s in targets],
+                style_prompt,
+                context=[s.paragraph_text for s in project.scenes],
             )
-        elif project.meta.tts_provider == "edge":
-            assert target_scene.voice
-            EdgeTTSClient().synthesize_to_file(
-                text=target_scene.paragraph_text,
-                output_path=out,
-                voice=target_scene.voice.voice_name_or_id,
-                rate=target_scene.voice.rate,
-                pitch=target_scene.voice.pitch,
-            )
-        target_scene.voiceover_path = out
-
+        for scene, prompt in zip(targets, prompts):
+            scene.image_prompt = prompt
+    with profiling.span("regen.assets", "stage", scenes=len(targets)):
+        generate_assets(
+            project,
+            providers,
+            scenes=targets,
+            reference_image=reference_image or project.meta.reference_image,
+            images=regenerate_image,
+            voices=regenerate_voice and project.meta.tts_provider != "none",
+            on_asset=lambda scene, kind: _emit(progress, kind, scene=scene.scene_id),
+        )
+    if regenerate_voice:
+        fit_scene_durations(
+            project,
+            CONFIG.scene_head_pad_sec if head_pad is None else head_pad,
+            CONFIG.scene_tail_pad_sec if tail_pad is None else tail_pad,
+        )
     return project
 
 
@@ -229,6 +223,7 @@ def main():
     ap.add_argument("--output-dir", type=str, default=None)
     ap.add_argument("--image-size", type=str, default=CONFIG.default_image_size)
     ap.add_argument("--source-url", type=str, default=None)
+    ap.add_argument("--resume", action="store_true", help="Continue an interrupted generation in --output-dir, reusing its outline and finished assets")
 
     ap.add_argument("--image-provider", type=str, choices=["stability", "placeholder", "google"], default=None)
     ap.add_argument("--voice-provider", type=str, choices=["azure", "elevenlabs", "edge", "none"], default=None)
@@ -237,23 +232,45 @@ def main():
     ap.add_argument("--voice-style", type=str, default=CONFIG.default_voice_style)
     ap.add_argument("--voice-rate", type=str, default=None)
     ap.add_argument("--voice-pitch", type=str, default=None)
+    ap.add_argument("--tts-mode", type=str, choices=["paragraph", "sentence"], default=None, help=f"sentence voices each sentence separately and caches it, so edits only re-synthesize changed sentences (default {CONFIG.tts_mode})")
 
     ap.add_argument("--project-json", type=str, default=None, help="Load existing project JSON")
-    ap.add_argument("--regen", type=str, default=None, help="Regenerate target, e.g., scene:3")
+    ap.add_argument("--regen", type=str, default=None, help="Regenerate targets, e.g., scene:3 or scene:3-7,12")
     ap.add_argument("--regen-what", type=str, default="both", help="image,voice,both")
+    ap.add_argument("--head-pad", type=float, default=None, help=f"Seconds of silence before each voiceover (default {CONFIG.scene_head_pad_sec})")
+    ap.add_argument("--tail-pad", type=float, default=None, help=f"Seconds held after each voiceover (default {CONFIG.scene_tail_pad_sec})")
+    ap.add_argument("--retime", action="store_true", help="Recompute scene durations from the voiceovers of an existing project")
+    ap.add_argument("--no-provider-cache", action="store_true", help="Always call providers instead of reusing cached responses")
     ap.add_argument("--render", action="store_true")
+    ap.add_argument("--render-backend", type=str, choices=["moviepy", "stream", "parallel"], default=None, help="stream pipes raw frames straight to ffmpeg; parallel encodes scene segments across processes and caches them (default parallel, or moviepy with --no-render-cache)")
+    ap.add_argument("--render-workers", type=int, default=None, help="Worker processes for --render-backend parallel (default: CPU count)")
+    ap.add_argument("--no-render-cache", action="store_true", help="Re-encode every scene segment instead of reusing cached ones")
+    ap.add_argument("--cache-stats", action="store_true", help="Print provider and render cache statistics")
+    ap.add_argument("--profile", type=str, nargs="?", const="", default=None, help="Time every stage; writes a Chrome trace (default <output-dir>/profile.trace.json) and prints a summary")
+    ap.add_argument("--render-quality", type=str, choices=["draft", "final"], default="final", help="Ken Burns resampling: draft=bilinear, final=lanczos")
+    ap.add_argument("--captions", action="store_true", help="Burn captions into rendered videos and previews")
+    ap.add_argument("--caption-align", action="store_true", help="Time captions to word timestamps from faster-whisper (falls back to spreading them over the voiceover)")
+    ap.add_argument("--preview", action="store_true", help="Render a fast low-resolution preview (<slug>.preview.mp4) with the same timeline")
+    ap.add_argument("--preview-scale", type=float, default=PREVIEW_SCALE, help=f"Preview size as a fraction of the project size (default {PREVIEW_SCALE})")
+    ap.add_argument("--preview-fps", type=int, default=PREVIEW_FPS, help=f"Preview frame rate (default {PREVIEW_FPS})")
 
     args = ap.parse_args()
+    # Only the parallel backend renders per-scene segments the cache can hold
+    args.render_backend = args.render_backend or ("moviepy" if args.no_render_cache else "parallel")
+    if args.profile is not None:
+        profiling.enable()
 
-    # Determine providers if not explicitly set
-    img_provider = args.image_provider or ("stability" if CONFIG.stability_api_key else ("google" if CONFIG.google_api_key else "placeholder"))
-    voice_provider = args.voice_provider or ("azure" if CONFIG.azure_speech_key and CONFIG.azure_speech_region else "edge")
+    img_provider, voice_provider = resolve_providers(args.image_provider, args.voice_provider)
+
+    provider_cache = None if args.no_provider_cache else ResponseCache.from_config()
 
     if args.project_json:
         project = load_project(args.project_json)
         # Allow overriding TTS provider when working with an existing project
         if args.voice_provider:
             project.meta.tts_provider = args.voice_provider  # type: ignore
+        if args.tts_mode:
+            project.meta.tts_mode = args.tts_mode  # type: ignore
         out_dir = os.path.dirname(args.project_json)
     else:
         if not args.title:
@@ -273,27 +290,68 @@ def main():
             height=height,
             out_dir=out_dir,
             source_url=args.source_url,
+            cache=provider_cache,
+            resume=args.resume,
+            head_pad=args.head_pad,
+            tail_pad=args.tail_pad,
+            tts_mode=args.tts_mode,
         )
 
     # Apply regen if requested
     changed = False
     if args.regen:
         what = [w.strip() for w in args.regen_what.split(",")]
-        project = regenerate(project, which=args.regen, what=what, style_prompt=args.style_prompt, reference_image=args.reference_image)
+        project = regenerate(project, which=args.regen, what=what, style_prompt=args.style_prompt, reference_image=args.reference_image, cache=provider_cache, head_pad=args.head_pad, tail_pad=args.tail_pad)
+        changed = True
+
+    if args.project_json and (args.retime or args.head_pad is not None or args.tail_pad is not None):
+        fit_scene_durations(
+            project,
+            CONFIG.scene_head_pad_sec if args.head_pad is None else args.head_pad,
+            CONFIG.scene_tail_pad_sec if args.tail_pad is None else args.tail_pad,
+        )
         changed = True
 
     # Save if modified
-    project_json_path = os.path.join(out_dir, "project.json")
-    if changed or args.voice_provider:
+    project_json_path = args.project_json or project_file(out_dir)
+    if changed or args.voice_provider or args.tts_mode:
         # persist provider override too
         save_project(project, project_json_path)
         print(f"Project updated: {project_json_path}")
 
-    # Render if requested
+    # Scene segment cache lives next to the assets it was built from
+    render_cache = None
+    if args.cache_stats or (args.render_backend == "parallel" and not args.no_render_cache):
+        render_cache = SegmentCache.for_assets_dir(project.assets_dir, CONFIG.render_cache_max_mb)
+
+    # Render if requested; the renderer (and MoviePy, for that backend) loads only here
+    if args.render or args.preview:
+        from app.renderer.video_renderer import render_video
+        from app.renderer.captions import CaptionStyle
+
+        captions = CaptionStyle(word_align=args.caption_align) if args.captions or args.caption_align else None
+
     if args.render:
-        render_video(project, project.output_video_path)
+        render_video(project, project.output_video_path, quality=args.render_quality, backend=args.render_backend, workers=args.render_workers, cache=None if args.no_render_cache else render_cache, captions=captions)
         print(f"Video written: {project.output_video_path}")
 
+    if args.preview:
+        preview = preview_project(project, scale=args.preview_scale, fps=args.preview_fps)
+        render_video(preview, preview.output_video_path, quality="draft", backend=args.render_backend, workers=args.render_workers, cache=None if args.no_render_cache else render_cache, encoder=PREVIEW_ENCODER, captions=captions)
+        print(f"Preview written: {preview.output_video_path} ({preview.width}x{preview.height} @ {preview.fps} fps)")
+
+    if args.cache_stats:
+        if provider_cache:
+            print(provider_cache.report())
+        if render_cache:
+            print(render_cache.report())
+
+    profiler = profiling.disable()
+    if profiler:
+        trace_path = profiler.write_chrome_trace(args.profile or os.path.join(out_dir, "profile.trace.json"))
+        print(profiler.summary())
+        print(f"Trace written: {trace_path} (open in chrome://tracing or ui.perfetto.dev)")
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import MutableSequence
+from typing import Any, Dict, List, Optional, Union
+
+import pydantic_core
+
+from app.config import CONFIG
+from app import profiling
+from app.schema import Scene, VideoProject
+
+# project.json reads and writes. Saving serialises once, straight from the
+# model, to a temp file that is renamed over the old one. "compact" drops
+# the indentation and "msgpack" writes a binary file; both exist for batch
+# runs that checkpoint thousands of large projects. Loading detects the
+# format from the first byte. With lazy=True each scene is validated the
+# first time it is read, so a caller that touches a few scenes of a long
+# project doesn't pay for the rest; dumping or saving it validates them all.
+
+FORMATS = ("json", "compact", "msgpack")
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise RuntimeError("PROJECT_FORMAT=msgpack needs the msgpack package (pip install msgpack)") from None
+    return msgpack
+
+
+def project_file(out_dir: str, fmt: Optional[str] = None) -> str:
+    fmt = fmt or CONFIG.project_format
+    return os.path.join(out_dir, "project.msgpack" if fmt == "msgpack" else "project.json")
+
+
+class LazyScenes(MutableSequence):
+    # Holds the raw scene dicts of a lazily loaded project; an entry is
+    # validated into a Scene (and kept) the first time it is read.
+    def __init__(self, raw: List[Union[Dict[str, Any], Scene]]):
+        self._items = raw
+
+    def _scene(self, index: int) -> Scene:
+        item = self._items[index]
+        if not isinstance(item, Scene):
+            item = self._items[index] = Scene.model_validate(item)
+        return item
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._scene(i) for i in range(*index.indices(len(self._items)))]
+        return self._scene(index)
+
+    def __setitem__(self, index, value) -> None:
+        self._items[index] = value
+
+    def __delitem__(self, index) -> None:
+        del self._items[index]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def insert(self, index: int, value: Scene) -> None:
+        self._items.insert(index, value)
+
+    @property
+    def validated(self) -> int:
+        return sum(isinstance(item, Scene) for item in self._items)
+
+
+def _encode(project: VideoProject, fmt: str) -> bytes:
+    # One path for eager and lazy projects: a lazy one validates its
+    # remaining scenes here, so both give the same bytes
+    if fmt == "msgpack":
+        return _msgpack().packb(project.model_dump(mode="json"), use_bin_type=True)
+    return project.model_dump_json(indent=None if fmt == "compact" else 2).encode("utf-8")
+
+
+@profiling.traced("project.save", "io")
+def save_project(project: VideoProject, path: str, fmt: Optional[str] = None) -> None:
+    # fmt defaults to msgpack for a .msgpack path, else json or compact per PROJECT_FORMAT.
+    # Temp file + rename: a crash mid-write never leaves a truncated project file.
+    fmt = fmt or ("msgpack" if path.endswith(".msgpack") else "compact" if CONFIG.project_format == "compact" else "json")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown project format: {fmt}")
+    data = _encode(project, fmt)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+@profiling.traced("project.load", "io")
+def load_project(path: str, lazy: bool = False) -> VideoProject:
+    with open(path, "rb") as f:
+        raw = f.read()
+    # A JSON object starts with "{" (after any whitespace); a msgpack map never does
+    is_json = raw.lstrip()[:1] == b"{"
+    if not lazy:
+        if is_json:
+            return VideoProject.model_validate_json(raw)
+        return VideoProject.model_validate(_msgpack().unpackb(raw, raw=False))
+    # pydantic-core's parser builds the plain dicts faster than json.loads
+    data = pydantic_core.from_json(raw) if is_json else _msgpack().unpackb(raw, raw=False)
+    scenes = data.pop("scenes", [])
+    project = VideoProject.model_validate({**data, "scenes": []})
+    project.scenes = LazyScenes(scenes)  # type: ignore[assignment]
+    return project
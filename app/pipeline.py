@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app.config import CONFIG
+from app.cache import file_digest
+from app.audio.mp3_probe import MP3ProbeError, probe_mp3_duration
+from app.schema import Scene, VideoProject
+from app.providers import Providers
+from app import profiling
+
+
+@dataclass
+class ProviderLimit:
+    concurrency: int
+    rate_per_sec: Optional[float] = None
+
+
+DEFAULT_LIMITS: Dict[str, ProviderLimit] = {
+    "stability": ProviderLimit(4),
+    "google": ProviderLimit(2),
+    "placeholder": ProviderLimit(8),
+    "azure": ProviderLimit(8),
+    "elevenlabs": ProviderLimit(2),
+    "edge": ProviderLimit(4),
+}
+
+
+def parse_provider_limits(spec: Optional[str]) -> Dict[str, ProviderLimit]:
+    # "stability=4:2,azure=8" -> 4 in flight at 2 req/s for Stability, 8 for Azure
+    limits = dict(DEFAULT_LIMITS)
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        conc, _, rate = value.partition(":")
+        limits[name.strip()] = ProviderLimit(int(conc), float(rate) if rate else None)
+    return limits
+
+
+def scene_asset_path(project: VideoProject, scene: Scene, ext: str) -> str:
+    return os.path.join(project.assets_dir, f"scene_{scene.scene_id:02d}.{ext}")
+
+
+def asset_complete(path: Optional[str], sha256: Optional[str]) -> bool:
+    # An asset counts as done only if the file is there and matches its recorded hash
+    return bool(path and sha256 and os.path.exists(path) and file_digest(path) == sha256)
+
+
+AssetCallback = Callable[[Scene, str], None]
+SceneFactory = Callable[[int, str], Scene]
+# (paragraphs in this batch, story up to the end of the batch) -> one image prompt each
+PromptFn = Callable[[List[str], List[str]], List[str]]
+
+_DONE = None  # end-of-stream marker on the stage queues
+
+
+class _Stopped(Exception):
+    pass
+
+
+def _save_image(img, path: str, scene_id: int) -> None:
+    with profiling.span("image.save", "io", scene=scene_id):
+        img.save(path, quality=CONFIG.jpeg_quality)
+
+
+class ProviderGate:
+    # Caps in-flight calls and spaces request starts to honour a rate limit.
+    # Thread-safe and not tied to one event loop: the job server runs each
+    # job on its own loop, and all of them share one gate per provider.
+    def __init__(self, limit: ProviderLimit):
+        self._free = max(1, limit.concurrency)
+        self._waiters: deque = deque()  # (loop, future), first come first served
+        self._interval = 1.0 / limit.rate_per_sec if limit.rate_per_sec else 0.0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        waiter = None
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+            else:
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+        if waiter is not None:
+            try:
+                await waiter[1]
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                    # otherwise the slot is already on its way; _wake passes it on
+                raise
+        if self._interval:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start)
+                self._next_start = start + self._interval
+            if start > now:
+                await asyncio.sleep(start - now)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._release()
+
+    def _release(self) -> None:
+        with self._lock:
+            if not self._waiters:
+                self._free += 1
+                return
+            loop, future = self._waiters.popleft()
+        try:
+            loop.call_soon_threadsafe(self._wake, future)
+        except RuntimeError:  # that job's loop is already closed
+            self._release()
+
+    def _wake(self, future: asyncio.Future) -> None:
+        # Runs on the waiter's loop; a waiter cancelled meanwhile hands the slot on
+        if future.done():
+            self._release()
+        else:
+            future.set_result(None)
+
+
+class ProviderGates:
+    # One gate per provider, created on first use. Share an instance to share the limits.
+    def __init__(self, limits: Optional[Dict[str, ProviderLimit]] = None):
+        self.limits = limits or parse_provider_limits(CONFIG.provider_limits)
+        self._gates: Dict[str, ProviderGate] = {}
+        self._lock = threading.Lock()
+
+    def limit(self, provider: str) -> ProviderLimit:
+        return self.limits.get(provider, ProviderLimit(1))
+
+    def get(self, provider: str) -> ProviderGate:
+        with self._lock:
+            if provider not in self._gates:
+                self._gates[provider] = ProviderGate(self.limit(provider))
+            return self._gates[provider]
+
+
+class AssetPipeline:
+    def __init__(self, providers: Providers, limits: Optional[Dict[str, ProviderLimit]] = None, on_asset: Optional[AssetCallback] = None):
+        self.providers = providers
+        # Providers from a ProviderRegistry carry process-wide gates, so
+        # concurrent jobs share one set of limits instead of each getting its own
+        self.gates = providers.gates if providers.gates is not None and limits is None else ProviderGates(limits)
+        self.limits = self.gates.limits
+        self.on_asset = on_asset
+        self._started: Optional[float] = None
+
+    def _done(self, scene: Scene, kind: str) -> None:
+        # Runs on the event loop thread, so checkpoint writes never interleave
+        if self._started is not None and kind != "scene":
+            profiling.count("generate.first_asset_sec", time.perf_counter() - self._started)
+            self._started = None
+        if self.on_asset:
+            self.on_asset(scene, kind)
+
+    def _gate(self, provider: str) -> ProviderGate:
+        return self.gates.get(provider)
+
+    async def image_job(self, project: VideoProject, scene: Scene, reference_image: Optional[str] = None) -> str:
+        img_path = scene_asset_path(project, scene, "jpg")
+        async with self._gate(self.providers.image_provider):
+            img = await asyncio.to_thread(self.providers.generate_image, scene, project.width, project.height, reference_image)
+        await asyncio.to_thread(_save_image, img, img_path, scene.scene_id)
+        scene.image_path = img_path
+        scene.image_sha256 = await asyncio.to_thread(file_digest, img_path)
+        self._done(scene, "image")
+        return img_path
+
+    async def voice_job(self, project: VideoProject, scene: Scene) -> Optional[str]:
+        if self.providers.voice_provider == "none":
+            scene.voiceover_path = None
+            scene.voiceover_duration_sec = None
+            scene.sentence_offsets_sec = None
+            return None
+        voice_out = scene_asset_path(project, scene, "mp3")
+        if project.meta.tts_mode == "sentence":
+            scene.sentence_offsets_sec = await self._sentence_voice(project, scene, voice_out)
+        else:
+            async with self._gate(self.providers.voice_provider):
+                await self.providers.synthesize_voice_async(scene, voice_out)
+            scene.sentence_offsets_sec = None
+        scene.voiceover_path = voice_out
+        scene.voiceover_sha256 = await asyncio.to_thread(file_digest, voice_out)
+        try:
+            scene.voiceover_duration_sec = round(await asyncio.to_thread(probe_mp3_duration, voice_out), 6)
+        except MP3ProbeError:
+            scene.voiceover_duration_sec = None
+        self._done(scene, "voice")
+        return voice_out
+
+    async def _sentence_voice(self, project: VideoProject, scene: Scene, voice_out: str) -> List[float]:
+        # Only sentences without a cached clip go to the provider, all at once
+        # under its gate; the stitch then decodes every clip and encodes once.
+        # -> seconds where each sentence starts in voice_out
+        from app.audio.sentences import STITCH_SAMPLE_RATE, scene_sentences, sentence_path, stitch_sentences
+
+        sentences = scene_sentences(scene.paragraph_text)
+        paths = [sentence_path(project.assets_dir, self.providers.voice_provider, scene.voice, s) for s in sentences]
+        missing = {p: s for p, s in zip(paths, sentences) if not os.path.exists(p)}
+        profiling.count("tts.sentence_hits", len(paths) - len(missing))
+        profiling.count("tts.sentence_misses", len(missing))
+
+        async def synthesize(path: str, text: str) -> None:
+            # Per-scene temp name: two scenes may share a sentence and race to it
+            tmp = f"{path}.{scene.scene_id}.tmp.mp3"
+            async with self._gate(self.providers.voice_provider):
+                await self.providers.synthesize_voice_async(scene, tmp, text=text)
+            os.replace(tmp, path)
+
+        if missing:
+            os.makedirs(os.path.dirname(paths[0]), exist_ok=True)
+            await asyncio.gather(*(synthesize(p, s) for p, s in missing.items()))
+        with profiling.span("tts.stitch", "io", scene=scene.scene_id, sentences=len(paths)):
+            offsets = await asyncio.to_thread(stitch_sentences, paths, voice_out, CONFIG.tts_sentence_gap_sec)
+        return [round(offset / STITCH_SAMPLE_RATE, 4) for offset in offsets]
+
+    def _prune_sentences(self, project: VideoProject) -> None:
+        # Clips of edited sentences would otherwise pile up in assets/.sentences
+        if project.meta.tts_mode != "sentence" or self.providers.voice_provider == "none":
+            return
+        from app.audio.sentences import prune_sentences, scene_sentences, sentence_path
+
+        keep = [
+            sentence_path(project.assets_dir, self.providers.voice_provider, scene.voice, sentence)
+            for scene in project.scenes
+            for sentence in scene_sentences(scene.paragraph_text)
+        ]
+        profiling.count("tts.sentence_pruned", prune_sentences(project.assets_dir, keep))
+
+    async def run(self, project: VideoProject, scenes: Optional[List[Scene]] = None, reference_image: Optional[str] = None, images: bool = True, voices: bool = True, resume: bool = False) -> VideoProject:
+        jobs = []
+        for scene in scenes if scenes is not None else project.scenes:
+            if images and not (resume and asset_complete(scene.image_path, scene.image_sha256)):
+                jobs.append(self.image_job(project, scene, reference_image))
+            if voices and not (resume and (self.providers.voice_provider == "none" or asset_complete(scene.voiceover_path, scene.voiceover_sha256))):
+                jobs.append(self.voice_job(project, scene))
+        await asyncio.gather(*jobs)
+        if voices:
+            self._prune_sentences(project)
+        return project
+
+    async def run_stream(self, project: VideoProject, paragraphs: Iterable[str], new_scene: SceneFactory, image_prompts: Optional[PromptFn] = None, reference_image: Optional[str] = None, prompt_batch: int = 3, queue_size: int = 8, on_outline: Optional[Callable[[], None]] = None) -> VideoProject:
+        # Producer/consumer form of run() for a story that is still arriving:
+        #   paragraphs (blocking iterator, drained on a thread) -> Scene, appended to project
+        #     -> voice queue -> voice workers
+        #     -> prompt stage (batches of prompt_batch) -> image queue -> image workers
+        # on_outline runs on the loop once the paragraphs are exhausted (after
+        # every scene is admitted), while asset jobs may still be running.
+        # Queues are bounded, so a fast outline stream waits for the workers
+        # instead of piling up scenes. Worker counts follow the provider limits.
+        loop = asyncio.get_running_loop()
+        stop = threading.Event()
+        prompt_q: asyncio.Queue = asyncio.Queue(queue_size)
+        image_q: asyncio.Queue = asyncio.Queue(queue_size)
+        voice_q: asyncio.Queue = asyncio.Queue(queue_size)
+        self._started = time.perf_counter()
+
+        def put(queue: asyncio.Queue, item) -> None:
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while True:
+                if stop.is_set():
+                    future.cancel()
+                    raise _Stopped()
+                try:
+                    return future.result(0.2)
+                except FutureTimeout:
+                    continue
+
+        def admit(scene: Scene) -> None:
+            project.scenes.append(scene)
+            self._done(scene, "scene")
+
+        def produce() -> None:
+            try:
+                for idx, paragraph in enumerate(paragraphs):
+                    scene = new_scene(idx + 1, paragraph)
+                    loop.call_soon_threadsafe(admit, scene)
+                    put(voice_q, scene)
+                    put(prompt_q, scene)
+            except _Stopped:
+                return
+            else:
+                if on_outline is not None:
+                    loop.call_soon_threadsafe(on_outline)
+            finally:
+                if not stop.is_set():
+                    put(voice_q, _DONE)
+                    put(prompt_q, _DONE)
+
+        async def prompt_stage() -> None:
+            story: List[str] = []
+            finished = False
+            while not finished:
+                batch: List[Scene] = []
+                while len(batch) < max(1, prompt_batch):
+                    scene = await prompt_q.get()
+                    if scene is _DONE:
+                        finished = True
+                        break
+                    batch.append(scene)
+                if not batch:
+                    continue
+                story.extend(s.paragraph_text for s in batch)
+                if image_prompts is not None:
+                    with profiling.span("generate.image_prompts", "stage", paragraphs=len(batch)):
+                        prompts = await asyncio.to_thread(image_prompts, [s.paragraph_text for s in batch], list(story))
+                    for scene, prompt in zip(batch, prompts):
+                        scene.image_prompt = prompt
+                for scene in batch:
+                    await image_q.put(scene)
+            await image_q.put(_DONE)
+
+        async def worker(queue: asyncio.Queue, job) -> None:
+            while True:
+                scene = await queue.get()
+                if scene is _DONE:
+                    await queue.put(_DONE)  # let sibling workers see it too
+                    return
+                await job(scene)
+
+        image_workers = self.limits.get(self.providers.image_provider, ProviderLimit(1)).concurrency
+        voice_workers = self.limits.get(self.providers.voice_provider, ProviderLimit(1)).concurrency
+        tasks = [asyncio.ensure_future(asyncio.to_thread(produce)), asyncio.ensure_future(prompt_stage())]
+        tasks += [asyncio.ensure_future(worker(image_q, lambda s: self.image_job(project, s, reference_image))) for _ in range(max(1, image_workers))]
+        tasks += [asyncio.ensure_future(worker(voice_q, lambda s: self.voice_job(project, s))) for _ in range(max(1, voice_workers))]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            stop.set()
+            for task in tasks:
+                task.cancel()
+            raise
+        project.scenes.sort(key=lambda s: s.scene_id)
+        self._prune_sentences(project)
+        return project
+
+
+def generate_assets(project: VideoProject, providers: Providers, scenes: Optional[List[Scene]] = None, reference_image: Optional[str] = None, images: bool = True, voices: bool = True, limits: Optional[Dict[str, ProviderLimit]] = None, on_asset: Optional[AssetCallback] = None, resume: bool = False) -> VideoProject:
+    pipeline = AssetPipeline(providers, limits, on_asset=on_asset)
+    return asyncio.run(pipeline.run(project, scenes=scenes, reference_image=reference_image, images=images, voices=voices, resume=resume))
+
+
+def generate_streaming(project: VideoProject, providers: Providers, paragraphs: Iterable[str], new_scene: SceneFactory, image_prompts: Optional[PromptFn] = None, reference_image: Optional[str] = None, limits: Optional[Dict[str, ProviderLimit]] = None, on_asset: Optional[AssetCallback] = None, prompt_batch: Optional[int] = None, queue_size: Optional[int] = None, on_outline: Optional[Callable[[], None]] = None) -> VideoProject:
+    pipeline = AssetPipeline(providers, limits, on_asset=on_asset)
+    return asyncio.run(pipeline.run_stream(
+        project,
+        paragraphs,
+        new_scene,
+        image_prompts=image_prompts,
+        reference_image=reference_image,
+        prompt_batch=CONFIG.image_prompt_batch if prompt_batch is None else prompt_batch,
+        queue_size=CONFIG.pipeline_queue_size if queue_size is None else queue_size,
+        on_outline=on_outline,
+    ))
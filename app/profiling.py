@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional
+
+# Stage timing and counters. Disabled by default: span() then hands back one
+# shared no-op context manager and count() returns immediately, so the hooks
+# can stay in hot paths.
+
+_NOOP = nullcontext()
+_profiler: Optional["Profiler"] = None
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "cat", "args", "start")
+
+    def __init__(self, profiler: "Profiler", name: str, cat: str, args: Dict[str, Any]):
+        self.profiler = profiler
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.cat, self.start, time.perf_counter() - self.start, self.args)
+        return False
+
+
+class Profiler:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events: List[Dict[str, Any]] = []
+        self.counters: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def record(self, name: str, cat: str, start: float, duration: float, args: Optional[Dict[str, Any]] = None) -> None:
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": (start - self.origin) * 1e6,
+            "dur": duration * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    def count(self, name: str, delta: float) -> None:
+        with self._lock:
+            self.counters[name] += delta
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        with self._lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+        end = max((e["ts"] + e["dur"] for e in events), default=0.0)
+        events += [
+            {"name": name, "ph": "C", "ts": end, "pid": os.getpid(), "tid": 0, "args": {"value": value}}
+            for name, value in sorted(counters.items())
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str) -> str:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+        return path
+
+    def summary(self) -> str:
+        with self._lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+        stats: Dict[str, List[float]] = defaultdict(list)
+        for e in events:
+            stats[e["name"]].append(e["dur"] / 1e6)
+        header = f"{'stage':<32}{'calls':>7}{'total s':>10}{'mean ms':>10}{'max ms':>10}"
+        lines = [header, "-" * len(header)]
+        for name, durations in sorted(stats.items(), key=lambda kv: -sum(kv[1])):
+            total = sum(durations)
+            lines.append(f"{name:<32}{len(durations):>7}{total:>10.3f}{total / len(durations) * 1000:>10.1f}{max(durations) * 1000:>10.1f}")
+        if counters:
+            lines.append("")
+            lines.append(f"{'counter':<32}{'value':>17}")
+            for name, value in sorted(counters.items()):
+                lines.append(f"{name:<32}{value:>17,.0f}" if float(value).is_integer() else f"{name:<32}{value:>17,.3f}")
+        return "\n".join(lines)
+
+
+def enable() -> Profiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+    return _profiler
+
+
+def disable() -> Optional[Profiler]:
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def active() -> Optional[Profiler]:
+    return _profiler
+
+
+def span(name: str, cat: str = "app", **args):
+    profiler = _profiler
+    if profiler is None:
+        return _NOOP
+    return _Span(profiler, name, cat, args)
+
+
+def count(name: str, delta: float = 1) -> None:
+    profiler = _profiler
+    if profiler is not None:
+        profiler.count(name, delta)
+
+
+def traced(name: str, cat: str = "app") -> Callable:
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            if _profiler is None:
+                return fn(*a, **kw)
+            with _Span(_profiler, name, cat, {}):
+                return fn(*a, **kw)
+        return wrapper
+    return decorate
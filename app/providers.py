@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Optional
+
+from app.config import CONFIG
+from app.cache import ResponseCache
+from app import profiling
+from app.schema import Scene, VoiceSpec
+
+if TYPE_CHECKING:
+    from PIL import Image
+    from app.pipeline import ProviderGates
+
+
+def build_voice_spec(voice_provider: str, azure_voice: Optional[str], elevenlabs_voice_id: Optional[str]) -> VoiceSpec:
+    if voice_provider == "none":
+        return VoiceSpec(provider="none")
+    if voice_provider == "azure":
+        return VoiceSpec(
+            provider="azure",
+            voice_name_or_id=(azure_voice or CONFIG.default_azure_voice),
+            style=(CONFIG.default_voice_style),
+        )
+    if voice_provider == "elevenlabs":
+        return VoiceSpec(
+            provider="elevenlabs",
+            voice_name_or_id=(elevenlabs_voice_id or CONFIG.elevenlabs_voice_id or ""),
+        )
+    # edge
+    return VoiceSpec(
+        provider="edge",
+        voice_name_or_id=azure_voice or "en-US-JennyNeural",
+    )
+
+
+class Providers:
+    # One client per provider, created on first use and shared by every scene
+    def __init__(self, image_provider: str, voice_provider: str, cache: Optional[ResponseCache] = None, gates: Optional[ProviderGates] = None):
+        self.image_provider = image_provider
+        self.voice_provider = voice_provider
+        self.cache = cache
+        self.gates = gates  # None: each pipeline run applies the limits on its own
+        self._clients: dict = {}
+        self._lock = threading.Lock()
+
+    def _client(self, name: str):
+        with self._lock:
+            return self._get_or_create(name)
+
+    def _get_or_create(self, name: str):
+        # Client modules are imported here, not at module load: the SDKs behind
+        # them (google.genai, edge_tts, ...) cost seconds and most runs use one or two.
+        if name not in self._clients:
+            factory = getattr(self, f"_new_{name}")
+            self._clients[name] = factory()
+        return self._clients[name]
+
+    def _new_stability(self):
+        from app.images.stability_client import StabilityClient
+        return StabilityClient(cache=self.cache)
+
+    def _new_placeholder(self):
+        from app.images.placeholder_client import PlaceholderImageClient
+        return PlaceholderImageClient()
+
+    def _new_google(self):
+        from app.images.google_client import GoogleImageClient
+        return GoogleImageClient(cache=self.cache)
+
+    def _new_azure(self):
+        from app.tts.azure_tts_client import AzureTTSClient
+        return AzureTTSClient(cache=self.cache)
+
+    def _new_elevenlabs(self):
+        from app.tts.elevenlabs_client import ElevenLabsClient
+        return ElevenLabsClient(cache=self.cache)
+
+    def _new_edge(self):
+        from app.tts.edge_tts_client import EdgeTTSClient
+        return EdgeTTSClient(cache=self.cache)
+
+    def generate_image(self, scene: Scene, width: int, height: int, reference_image: Optional[str] = None) -> Image.Image:
+        with profiling.span(f"image.{self.image_provider}", "provider", scene=scene.scene_id):
+            return self._generate_image(scene, width, height, reference_image)
+
+    def _generate_image(self, scene: Scene, width: int, height: int, reference_image: Optional[str] = None) -> Image.Image:
+        prompt = scene.image_prompt or scene.paragraph_text
+        if self.image_provider == "stability":
+            stability = self._client("stability")
+            if reference_image:
+                return stability.img2img(prompt, reference_image, strength=0.35, width=width, height=height)
+            return stability.generate(prompt, width=width, height=height)
+        return self._client(self.image_provider).generate(prompt, width=width, height=height)
+
+    def synthesize_voice(self, scene: Scene, output_path: str, text: Optional[str] = None) -> Optional[str]:
+        # text defaults to the whole paragraph; sentence mode passes one sentence at a time
+        if self.voice_provider == "none":
+            return None
+        with profiling.span(f"tts.{self.voice_provider}", "provider", scene=scene.scene_id):
+            return self._synthesize_voice(scene, output_path, text)
+
+    def _synthesize_voice(self, scene: Scene, output_path: str, text: Optional[str] = None) -> Optional[str]:
+        voice = scene.voice
+        assert voice
+        text = scene.paragraph_text if text is None else text
+        if self.voice_provider == "azure":
+            return self._client("azure").synthesize_to_file(
+                text=text,
+                output_path=output_path,
+                voice_name=voice.voice_name_or_id,
+                style=voice.style,
+                rate=voice.rate,
+                pitch=voice.pitch,
+            )
+        if self.voice_provider == "elevenlabs":
+            return self._client("elevenlabs").synthesize_to_file(
+                text=text,
+                output_path=output_path,
+                voice_id=voice.voice_name_or_id,
+            )
+        return self._client("edge").synthesize_to_file(
+            text=text,
+            output_path=output_path,
+            voice=voice.voice_name_or_id,
+            rate=voice.rate,
+            pitch=voice.pitch,
+        )
+
+    async def synthesize_voice_async(self, scene: Scene, output_path: str, text: Optional[str] = None) -> Optional[str]:
+        # Edge TTS is natively async and runs on the caller's loop; the REST
+        # providers are blocking and go to a worker thread.
+        if self.voice_provider != "edge":
+            return await asyncio.to_thread(self.synthesize_voice, scene, output_path, text)
+        voice = scene.voice
+        assert voice
+        with profiling.span("tts.edge", "provider", scene=scene.scene_id):
+            return await self._client("edge").synthesize_async(
+                text=scene.paragraph_text if text is None else text,
+                output_path=output_path,
+                voice=voice.voice_name_or_id,
+                rate=voice.rate,
+                pitch=voice.pitch,
+            )
+
+
+class ProviderRegistry:
+    # Long-lived processes (the job server, batch runs) keep one Providers per
+    # provider pair and one Gemini client, so SDK setup and HTTP pools outlive
+    # a job, and one set of provider gates, so concurrent jobs share the limits.
+    def __init__(self, cache: Optional[ResponseCache] = None):
+        from app.pipeline import ProviderGates
+
+        self.cache = cache
+        self.gates = ProviderGates()
+        self._providers: dict = {}
+        self._gemini = None
+        self._lock = threading.Lock()
+
+    def get(self, image_provider: str, voice_provider: str) -> Providers:
+        with self._lock:
+            key = (image_provider, voice_provider)
+            if key not in self._providers:
+                self._providers[key] = Providers(image_provider, voice_provider, cache=self.cache, gates=self.gates)
+            return self._providers[key]
+
+    def gemini(self):
+        with self._lock:
+            if self._gemini is None:
+                from app.llm.gemini_client import GeminiClient
+                self._gemini = GeminiClient(cache=self.cache)
+            return self._gemini
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from app.audio.alignment import ALIGN_DIRNAME
+from app.schema import VideoProject
+from app.renderer.timeline import SceneSpan
+
+# Burned-in captions. Each caption line is rasterised once into an RGBA
+# sprite (cached by text, font and size) and blended onto the frame with
+# NumPy, only over the sprite's rectangle and only on frames where its cue
+# is showing. Cues are timed against the voiceover: spread by length by
+# default, or pinned to word timestamps when alignment is requested.
+
+
+@dataclass(frozen=True)
+class CaptionStyle:
+    font: str = "DejaVuSans-Bold.ttf"
+    size_ratio: float = 0.055  # text height as a fraction of the frame's shorter side
+    max_width: float = 0.9  # line width as a fraction of the frame width, measured in the font
+    max_lines: int = 2  # per cue
+    bottom_margin: float = 0.07  # fraction of the frame height
+    line_gap: float = 0.25  # fraction of the font size
+    word_align: bool = False  # faster-whisper word timestamps instead of spreading by length
+    align_model: str = "base"
+
+    def describe(self) -> dict:
+        return asdict(self)
+
+
+@dataclass(frozen=True)
+class CaptionCue:
+    text: str  # lines separated by "\n"
+    start: float  # scene-local seconds
+    end: float
+
+
+_SENTENCE_END = re.compile(r"[.!?…][\"')\]]*$")
+
+
+def caption_size(width: int, height: int, style: CaptionStyle) -> int:
+    return max(10, int(round(min(width, height) * style.size_ratio)))
+
+
+def _stroke(size: int) -> int:
+    return max(1, size // 12)
+
+
+def line_fitter(width: int, height: int, style: CaptionStyle) -> Callable[[str], bool]:
+    # -> whether a line, outline included, fits in style.max_width of the frame
+    size = caption_size(width, height, style)
+    face = _font(style.font, size)
+    limit = width * style.max_width - 2 * _stroke(size)
+    return lambda line: face.getlength(line) <= limit
+
+
+def _split_word(word: str, fits: Callable[[str], bool]) -> List[str]:
+    # A single word wider than the frame is broken between characters rather than clipped
+    pieces, current = [], ""
+    for char in word:
+        if current and not fits(current + char):
+            pieces.append(current)
+            current = ""
+        current += char
+    return pieces + [current]
+
+
+def split_caption_lines(text: str, fits: Callable[[str], bool]) -> List[str]:
+    # Greedy word wrap by measured width; a sentence end always closes the line
+    lines: List[str] = []
+    current: List[str] = []
+    for word in text.split():
+        if current and not fits(" ".join(current + [word])):
+            lines.append(" ".join(current))
+            current = []
+        if not current and not fits(word):
+            *full, word = _split_word(word, fits)
+            lines.extend(full)
+        current.append(word)
+        if _SENTENCE_END.search(word):
+            lines.append(" ".join(current))
+            current = []
+    if current:
+        lines.append(" ".join(current))
+    return lines
+
+
+def _blocks(lines: List[str], max_lines: int) -> List[str]:
+    return ["\n".join(lines[i:i + max_lines]) for i in range(0, len(lines), max_lines)]
+
+
+def caption_blocks(span: SceneSpan, style: CaptionStyle, fits: Callable[[str], bool]) -> List[str]:
+    # Scene.captions wins when set (one or more cues per entry, if an entry
+    # needs more than max_lines); otherwise the paragraph is split
+    scene = span.scene
+    if scene.captions:
+        return [block for c in scene.captions if c and c.strip() for block in _blocks(split_caption_lines(c, fits), style.max_lines)]
+    return _blocks(split_caption_lines(scene.paragraph_text, fits), style.max_lines)
+
+
+def _spread(blocks: Sequence[str], start: float, end: float) -> List[CaptionCue]:
+    # Screen time proportional to character count
+    weights = [max(1, len(b.replace("\n", " "))) for b in blocks]
+    total = float(sum(weights))
+    cues, t = [], start
+    for block, weight in zip(blocks, weights):
+        length = (end - start) * weight / total
+        cues.append(CaptionCue(block, round(t, 4), round(t + length, 4)))
+        t += length
+    return cues
+
+
+def _aligned(blocks: Sequence[str], words: Sequence[Tuple[str, float, float]], offset: float) -> List[CaptionCue]:
+    # Block k spans the recognised words at the same relative position as its
+    # own words; tolerant of whisper merging or splitting a few words.
+    counts = [len(b.split()) for b in blocks]
+    total = sum(counts)
+    cues, seen = [], 0
+    for block, count in zip(blocks, counts):
+        first = min(len(words) - 1, int(seen * len(words) / total))
+        last = max(first, min(len(words) - 1, int((seen + count) * len(words) / total) - 1))
+        cues.append(CaptionCue(block, round(offset + words[first][1], 4), round(offset + words[last][2], 4)))
+        seen += count
+    # Hold each cue until the next one starts so captions don't flicker between words
+    return [
+        CaptionCue(c.text, c.start, max(c.end, cues[i + 1].start) if i + 1 < len(cues) else c.end)
+        for i, c in enumerate(cues)
+    ]
+
+
+def _sentence_cues(span: SceneSpan, style: CaptionStyle, fits: Callable[[str], bool], start: float, end: float) -> Optional[List[CaptionCue]]:
+    # A sentence-mode voiceover records where each sentence starts, so each
+    # sentence's blocks share its own stretch of audio (pause included)
+    from app.audio.sentences import scene_sentences
+
+    scene = span.scene
+    sentences = scene_sentences(scene.paragraph_text)
+    offsets = scene.sentence_offsets_sec
+    if scene.captions or not offsets or len(offsets) != len(sentences):
+        return None
+    bounds = [min(end, start + offset) for offset in offsets] + [end]
+    cues: List[CaptionCue] = []
+    for idx, sentence in enumerate(sentences):
+        blocks = _blocks(split_caption_lines(sentence, fits), style.max_lines)
+        if blocks:
+            cues += _spread(blocks, bounds[idx], max(bounds[idx], bounds[idx + 1]))
+    return cues
+
+
+def scene_cues(span: SceneSpan, style: CaptionStyle, fits: Callable[[str], bool], align_dir: Optional[str] = None) -> List[CaptionCue]:
+    blocks = caption_blocks(span, style, fits)
+    if not blocks:
+        return []
+    scene = span.scene
+    duration = span.duration
+    voice = scene.voiceover_duration_sec if scene.voiceover_path else None
+    if style.word_align and voice and align_dir:
+        from app.audio.alignment import word_timings
+
+        words = word_timings(scene.voiceover_path, align_dir, style.align_model)
+        if words:
+            return _aligned(blocks, words, scene.voiceover_offset_sec)
+    if voice:
+        start = scene.voiceover_offset_sec
+        end = min(duration, start + voice)
+        cues = _sentence_cues(span, style, fits, start, end)
+        return cues if cues is not None else _spread(blocks, start, end)
+    return _spread(blocks, 0.0, duration)
+
+
+def align_dir(project: VideoProject) -> str:
+    return os.path.join(project.assets_dir, ALIGN_DIRNAME)
+
+
+def caption_spans(spans: Sequence[SceneSpan], style: CaptionStyle, project: VideoProject) -> None:
+    # Fills span.cues in the parent process; render workers only rasterise and blend.
+    # Lines are wrapped for this project's frame size, so they never need clipping.
+    fits = line_fitter(project.width, project.height, style)
+    for span in spans:
+        span.cues = scene_cues(span, style, fits, align_dir(project))
+
+
+@lru_cache(maxsize=8)
+def _font(name: str, size: int) -> ImageFont.ImageFont:
+    for candidate in (name, "DejaVuSans.ttf"):
+        try:
+            return ImageFont.truetype(candidate, size=size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+@lru_cache(maxsize=256)
+def line_sprite(text: str, font: str, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    # -> (premultiplied RGB, alpha) as uint32 so the blend can't overflow; white text, dark outline
+    face = _font(font, size)
+    stroke = _stroke(size)
+    left, top, right, bottom = ImageDraw.Draw(Image.new("L", (1, 1))).textbbox((0, 0), text, font=face, stroke_width=stroke)
+    sprite = Image.new("RGBA", (max(1, int(right - left)), max(1, int(bottom - top))), (0, 0, 0, 0))
+    ImageDraw.Draw(sprite).text((-left, -top), text, font=face, fill=(255, 255, 255, 255), stroke_width=stroke, stroke_fill=(0, 0, 0, 230))
+    rgba = np.asarray(sprite).astype(np.uint32)
+    alpha = rgba[..., 3:4]
+    return rgba[..., :3] * alpha, alpha
+
+
+class CaptionRenderer:
+    def __init__(self, cues: Sequence[CaptionCue], width: int, height: int, style: CaptionStyle):
+        self.cues = list(cues)
+        self.width = width
+        self.height = height
+        self.style = style
+        self.size = caption_size(width, height, style)
+        self._index = 0
+
+    def cue_at(self, t: float) -> Optional[CaptionCue]:
+        # Frames arrive in order, so the search only ever moves forward
+        cues = self.cues
+        i = self._index
+        if i > 0 and t < cues[i - 1].end:
+            i = 0
+        while i < len(cues) and t >= cues[i].end:
+            i += 1
+        self._index = i
+        if i < len(cues) and cues[i].start <= t < cues[i].end:
+            return cues[i]
+        return None
+
+    def draw(self, frame: np.ndarray, cue: CaptionCue) -> np.ndarray:
+        # Blends in place over each line's rectangle; lines stack up from the bottom margin
+        gap = int(self.size * self.style.line_gap)
+        y = self.height - int(self.height * self.style.bottom_margin)
+        for text in reversed(cue.text.split("\n")):
+            premul, alpha = line_sprite(text, self.style.font, self.size)
+            h, w = alpha.shape[:2]
+            y -= h
+            x = (self.width - w) // 2
+            # Lines are wrapped to fit the width; clipping only guards the frame edges
+            sx0, sy0 = max(0, -x), max(0, -y)
+            x0, y0 = max(0, x), max(0, y)
+            x1, y1 = min(self.width, x + w), min(self.height, y + h)
+            if x1 > x0 and y1 > y0:
+                region = frame[y0:y1, x0:x1]
+                a = alpha[sy0:sy0 + (y1 - y0), sx0:sx0 + (x1 - x0)]
+                p = premul[sy0:sy0 + (y1 - y0), sx0:sx0 + (x1 - x0)]
+                region[...] = (p + region * (255 - a) + 127) // 255
+            y -= gap
+        return frame
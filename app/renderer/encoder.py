@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class EncoderSettings:
+    preset: str = "medium"
+    audio_codec: str = "aac"
+    audio_bitrate: Optional[str] = None
+    sample_rate: int = 44100
+    channels: int = 2
+
+
+FINAL_ENCODER = EncoderSettings()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from typing import Optional
+
+import numpy as np
+import imageio_ffmpeg
+
+from app import profiling
+from app.schema import VideoProject
+from app.renderer.ken_burns import KenBurnsEngine, Quality
+from app.renderer.timeline import SceneSpan, build_timeline
+from app.renderer.prepared import prepare_spans
+from app.renderer.captions import CaptionRenderer, CaptionStyle, caption_spans
+from app.renderer.encoder import FINAL_ENCODER, EncoderSettings
+from app.audio.mixdown import build_audio_track
+
+
+class FrameBlender:
+    # Output buffers are allocated once per render and reused for every
+    # frame: `frame` holds the current Ken Burns image (plus any caption) and
+    # is what goes down the pipe; transition frames are faded into `out`.
+    def __init__(self, width: int, height: int):
+        self.frame = np.empty((height, width, 3), dtype=np.uint8)
+        self.scratch = np.empty((height, width, 3), dtype=np.float32)
+        self.out = np.empty((height, width, 3), dtype=np.uint8)
+
+    def load(self, img) -> np.ndarray:
+        # Pillow only hands its pixels out as a fresh bytes copy; it is
+        # dropped right after landing in the reused frame buffer
+        np.copyto(self.frame, np.frombuffer(img.tobytes(), dtype=np.uint8).reshape(self.frame.shape))
+        return self.frame
+
+    def fade(self, frame: np.ndarray, alpha: float) -> np.ndarray:
+        np.multiply(frame, alpha, out=self.scratch)
+        np.copyto(self.out, self.scratch, casting="unsafe")
+        return self.out
+
+
+def scene_engine(span: SceneSpan, width: int, height: int, quality: Quality) -> KenBurnsEngine:
+    motion = span.scene.motion
+    factory = KenBurnsEngine.from_prepared if span.prepared else KenBurnsEngine.from_path
+    return factory(
+        span.prepared or span.scene.image_path,
+        span.duration,
+        width,
+        height,
+        pan_start=motion.pan_start or 0.0,
+        pan_end=motion.pan_end or 0.0,
+        zoom_start=motion.zoom_start or 1.0,
+        zoom_end=motion.zoom_end or 1.05,
+        quality=quality,
+    )
+
+
+def span_captions(span: SceneSpan, width: int, height: int, style: Optional[CaptionStyle]) -> Optional[CaptionRenderer]:
+    if style is None or not span.cues:
+        return None
+    return CaptionRenderer(span.cues, width, height, style)
+
+
+def write_span_frames(writer, span: SceneSpan, engine: KenBurnsEngine, blender: FrameBlender, fps: float, captions: Optional[CaptionRenderer] = None) -> None:
+    with profiling.span("render.scene", "render", scene=span.scene.scene_id, frames=span.frame_count):
+        _write_span_frames(writer, span, engine, blender, fps, captions)
+    profiling.count("render.frames", span.frame_count)
+    profiling.count("render.ken_burns_sec", engine.elapsed)
+
+
+def _write_span_frames(writer, span: SceneSpan, engine: KenBurnsEngine, blender: FrameBlender, fps: float, captions: Optional[CaptionRenderer] = None) -> None:
+    last_img, last_cue = None, None
+    for frame_idx in range(span.first_frame, span.first_frame + span.frame_count):
+        t = span.local_time(frame_idx, fps)
+        img = engine.render_image(t)
+        cue = captions.cue_at(t) if captions is not None else None
+        if img is not last_img or cue is not last_cue:
+            # Reused boxes and held captions resend the buffer as it is
+            last_img, last_cue = img, cue
+            frame = blender.load(img)
+            if cue is not None:
+                captions.draw(frame, cue)
+        writer.send(blender.fade(blender.frame, span.alpha_at(t)) if span.in_transition(t) else blender.frame)
+
+
+def open_writer(output_path: str, width: int, height: int, fps: float, audio_path: Optional[str] = None, encoder: EncoderSettings = FINAL_ENCODER, threads: Optional[int] = None):
+    output_params = ["-preset", encoder.preset]
+    if audio_path and encoder.audio_bitrate:
+        output_params += ["-b:a", encoder.audio_bitrate]
+    if threads:
+        output_params += ["-threads", str(threads)]
+    writer = imageio_ffmpeg.write_frames(
+        output_path,
+        (width, height),
+        fps=fps,
+        codec="libx264",
+        quality=None,
+        macro_block_size=2,
+        ffmpeg_log_level="error",
+        output_params=output_params,
+        audio_path=audio_path,
+        audio_codec=encoder.audio_codec if audio_path else None,
+    )
+    writer.send(None)
+    return writer
+
+
+def render_video_stream(project: VideoProject, output_path: str, quality: Quality = "final", encoder: EncoderSettings = FINAL_ENCODER, captions: Optional[CaptionStyle] = None) -> str:
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    spans = build_timeline(project)
+    prepare_spans(spans, project.assets_dir, project.height, quality)
+    if captions is not None:
+        caption_spans(spans, captions, project)
+    blender = FrameBlender(project.width, project.height)
+
+    with tempfile.TemporaryDirectory(prefix="render-") as tmp:
+        audio_path = build_audio_track(project, spans, os.path.join(tmp, "soundtrack.wav"), encoder.sample_rate, encoder.channels)
+        writer = open_writer(output_path, project.width, project.height, project.fps, audio_path=audio_path, encoder=encoder)
+        try:
+            for span in spans:
+                engine = scene_engine(span, project.width, project.height, quality)
+                write_span_frames(writer, span, engine, blender, project.fps, span_captions(span, project.width, project.height, captions))
+                print(f"Scene {span.scene.scene_id:02d} Ken Burns: {engine.report()}")
+        finally:
+            writer.close()
+    return output_path
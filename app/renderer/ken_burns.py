@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import time
+from typing import Literal, Tuple
+
+import numpy as np
+from PIL import Image
+
+Quality = Literal["draft", "final"]
+
+RESAMPLE = {
+    "draft": Image.BILINEAR,
+    "final": Image.LANCZOS,
+}
+
+
+def load_base_image(image_path: str, height: int, draft: bool = False) -> Image.Image:
+    # Same pre-scale MoviePy applied via ImageClip(...).resize(height=height)
+    img = Image.open(image_path)
+    w, h = img.size
+    if draft:
+        # JPEG only: let libjpeg decode at 1/2, 1/4 or 1/8 scale, never below the target size
+        img.draft("RGB", (int(w * height / h), int(height)))
+    img = img.convert("RGB")
+    new_size = (int(w * height / h), int(height))
+    if new_size != img.size:
+        img = img.resize(new_size, Image.LANCZOS)
+    return img
+
+
+class KenBurnsEngine:
+    # `scale` is how much larger `image` is than the project-height base the
+    # motion is defined on (prepared images carry extra rows for deep zooms).
+    # Crop windows are still computed on that base, then mapped onto the image.
+    def __init__(self, image: Image.Image, duration: float, width: int, height: int, pan_start: float, pan_end: float, zoom_start: float, zoom_end: float, quality: Quality = "final", scale: float = 1.0):
+        if quality not in RESAMPLE:
+            raise ValueError(f"Unknown Ken Burns quality: {quality}")
+        self.base = image
+        self.scale = scale
+        self.size = image.size if scale == 1.0 else (int(round(image.size[0] / scale)), int(round(image.size[1] / scale)))
+        self.duration = duration
+        self.width = width
+        self.height = height
+        self.zoom_start = zoom_start
+        self.zoom_end = zoom_end
+        self.quality = quality
+        self.resample = RESAMPLE[quality]
+        W, H = self.size
+        self.start_x = (W - width) * (pan_start + 1) / 2 if W > width else 0
+        self.end_x = (W - width) * (pan_end + 1) / 2 if W > width else 0
+        self.frames = 0
+        self.reused = 0
+        self.elapsed = 0.0
+        self._last_box: Tuple[int, int, int, int] | None = None
+        self._last_img: Image.Image | None = None
+
+    @classmethod
+    def from_path(cls, image_path: str, duration: float, width: int, height: int, pan_start: float, pan_end: float, zoom_start: float, zoom_end: float, quality: Quality = "final") -> "KenBurnsEngine":
+        return cls(load_base_image(image_path, height, draft=quality == "draft"), duration, width, height, pan_start, pan_end, zoom_start, zoom_end, quality=quality)
+
+    @classmethod
+    def from_prepared(cls, path: str, duration: float, width: int, height: int, pan_start: float, pan_end: float, zoom_start: float, zoom_end: float, quality: Quality = "final") -> "KenBurnsEngine":
+        from app.renderer.prepared import open_prepared
+
+        image, scale = open_prepared(path, height)
+        return cls(image, duration, width, height, pan_start, pan_end, zoom_start, zoom_end, quality=quality, scale=scale)
+
+    def box_at(self, t: float) -> Tuple[int, int, int, int]:
+        # Integer crop window, identical to the original per-frame slice
+        alpha = t / self.duration if self.duration > 0 else 1.0
+        zoom = self.zoom_start + (self.zoom_end - self.zoom_start) * alpha
+        x = int(self.start_x + (self.end_x - self.start_x) * alpha)
+        W, H = self.size
+        crop_w = max(1, int(W / max(zoom, 1e-3)))
+        crop_h = max(1, int(H / max(zoom, 1e-3)))
+        x0 = max(0, min(W - crop_w, x))
+        y0 = max(0, (H - crop_h) // 2)
+        return x0, y0, min(W, x0 + crop_w), min(H, y0 + crop_h)
+
+    def render_image(self, t: float) -> Image.Image:
+        # Single resample pass straight from the decoded source; no crop copy.
+        # Slow zooms keep the same integer box for several frames, so reuse it.
+        started = time.perf_counter()
+        box = self.box_at(t)
+        if box == self._last_box and self._last_img is not None:
+            img = self._last_img
+            self.reused += 1
+        else:
+            src = box if self.scale == 1.0 else tuple(v * self.scale for v in box)
+            img = self.base.resize((self.width, self.height), self.resample, box=src)
+            if img.mode != "RGB":
+                img = img.convert("RGB")  # prepared sources are mapped as RGBX
+            self._last_box, self._last_img = box, img
+        self.elapsed += time.perf_counter() - started
+        self.frames += 1
+        return img
+
+    def make_frame(self, t: float) -> np.ndarray:
+        return np.asarray(self.render_image(t))
+
+    def reset_stats(self) -> None:
+        self.frames = 0
+        self.reused = 0
+        self.elapsed = 0.0
+
+    @property
+    def fps(self) -> float:
+        return self.frames / self.elapsed if self.elapsed > 0 else 0.0
+
+    def report(self) -> str:
+        return f"{self.frames} frames in {self.elapsed:.2f}s ({self.fps:.1f} fps, {self.reused} reused, {self.quality})"
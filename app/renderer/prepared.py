@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import contextlib
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app import profiling
+from app.cache import file_digest
+from app.renderer.ken_burns import Quality, load_base_image
+from app.renderer.timeline import SceneSpan
+
+# Render-ready scene images. Each JPEG is decoded and scaled once to the
+# height its deepest zoom needs (never past its native height) and stored as
+# an RGBX .npy next to the assets. Renders, previews and parallel workers
+# then memory-map the same file instead of decoding the JPEG per render, so
+# they share page-cache pages. The padding byte matters: Pillow only wraps a
+# buffer without copying it for 4-byte pixel modes. Files are keyed by the image's
+# content hash, so a regenerated image never picks up a stale array; after
+# each render, arrays for images no scene uses any more are deleted.
+
+PREPARED_VERSION = 2
+PREPARED_DIRNAME = ".prepared"
+
+
+def scene_max_zoom(span: SceneSpan) -> float:
+    motion = span.scene.motion
+    return max(1.0, motion.zoom_start or 1.0, motion.zoom_end or 1.05)
+
+
+def prepared_height(native_height: int, height: int, max_zoom: float) -> int:
+    # Enough rows that the tightest crop still maps source pixels 1:1 onto the frame
+    return max(height, min(native_height, math.ceil(height * max_zoom)))
+
+
+def prepared_path(assets_dir: str, digest: str, height: int, max_zoom: float, draft: bool) -> str:
+    name = f"{digest[:32]}_h{height}_z{max_zoom:g}{'_draft' if draft else ''}_v{PREPARED_VERSION}.npy"
+    return os.path.join(assets_dir, PREPARED_DIRNAME, name)
+
+
+def prepare_image(image_path: str, assets_dir: str, height: int, max_zoom: float, draft: bool = False) -> str:
+    path = prepared_path(assets_dir, file_digest(image_path), height, max_zoom, draft)
+    if os.path.exists(path):
+        profiling.count("prepare.hits")
+        return path
+    profiling.count("prepare.misses")
+    with Image.open(image_path) as probe:
+        native_height = probe.size[1]
+    img = load_base_image(image_path, prepared_height(native_height, height, max_zoom), draft=draft)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, np.asarray(img.convert("RGBX")))
+    os.replace(tmp, path)
+    return path
+
+
+def open_prepared(path: str, height: int) -> Tuple[Image.Image, float]:
+    # -> (image, scale over the project-height base); pages come straight from the map
+    pixels = np.load(path, mmap_mode="r")
+    h, w = pixels.shape[:2]
+    img = Image.frombuffer("RGBX", (w, h), pixels, "raw", "RGBX", 0, 1)
+    if not img.readonly:
+        # Pillow copied the buffer instead of wrapping it; every render would hold its own decode
+        raise RuntimeError(f"Prepared image {path} was copied, not memory-mapped")
+    return img, h / height
+
+
+def prepare_spans(spans: Iterable[SceneSpan], assets_dir: str, height: int, quality: Quality, workers: Optional[int] = None) -> None:
+    # Fills span.prepared in place; Pillow releases the GIL while decoding, so threads suffice
+    todo = [s for s in spans if s.scene.image_path and os.path.exists(s.scene.image_path)]
+    if not todo:
+        return
+    draft = quality == "draft"
+    with profiling.span("render.prepare", "render", scenes=len(todo)):
+        with ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1)) as pool:
+            paths = pool.map(lambda s: prepare_image(s.scene.image_path, assets_dir, height, scene_max_zoom(s), draft), todo)
+            for span, path in zip(todo, paths):
+                span.prepared = path
+
+
+def prune_prepared(assets_dir: str, image_paths: Iterable[Optional[str]]) -> int:
+    # Deletes arrays of images no longer in the project (regenerated or
+    # removed scenes) and arrays left by an older PREPARED_VERSION
+    root = os.path.join(assets_dir, PREPARED_DIRNAME)
+    if not os.path.isdir(root):
+        return 0
+    live = {file_digest(path)[:32] for path in image_paths if path and os.path.exists(path)}
+    suffix = f"_v{PREPARED_VERSION}.npy"
+    removed = 0
+    for entry in os.scandir(root):
+        if not entry.name.endswith(".npy") or (entry.name[:32] in live and entry.name.endswith(suffix)):
+            continue
+        with contextlib.suppress(FileNotFoundError):  # another render pruned it first
+            os.remove(entry.path)
+            removed += 1
+    profiling.count("prepare.pruned", removed)
+    return removed
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+from app.schema import VideoProject
+from app.renderer.encoder import EncoderSettings
+
+PREVIEW_SCALE = 0.25
+PREVIEW_FPS = 12
+# AAC at 44.1 kHz stereo costs more than the whole low-res video encode, so
+# previews carry a mono 22 kHz MP3 track instead.
+PREVIEW_ENCODER = EncoderSettings(preset="ultrafast", audio_codec="libmp3lame", audio_bitrate="48k", sample_rate=22050, channels=1)
+
+
+def _even(value: float) -> int:
+    # libx264 with yuv420p needs even frame dimensions
+    return max(2, int(round(value / 2)) * 2)
+
+
+def preview_project(project: VideoProject, scale: float = PREVIEW_SCALE, fps: Optional[int] = None) -> VideoProject:
+    # Same scenes, durations and transitions, so the timeline is identical;
+    # only the output raster and frame rate shrink.
+    preview = project.model_copy(update={
+        "width": _even(project.width * scale),
+        "height": _even(project.height * scale),
+        "fps": min(project.fps, fps or PREVIEW_FPS),
+    })
+    preview.output_video_path = preview_output_path(project.output_video_path or os.path.join(project.assets_dir, "..", f"{project.meta.slug}.mp4"))
+    return preview
+
+
+def preview_output_path(output_path: str) -> str:
+    root, ext = os.path.splitext(output_path)
+    return f"{root}.preview{ext or '.mp4'}"
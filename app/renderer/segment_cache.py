@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, Iterable, List, Optional
+
+from app import profiling
+from app.renderer.timeline import SceneSpan
+
+CACHE_VERSION = 2
+CACHE_DIRNAME = ".render_cache"
+
+
+def _hash_file(h, path: Optional[str]) -> None:
+    if not path or not os.path.exists(path):
+        h.update(b"\0")
+        return
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+
+
+def segment_key(span: SceneSpan, width: int, height: int, fps: float, quality: str, preset: str = "medium", captions: Optional[dict] = None) -> str:
+    scene = span.scene
+    h = hashlib.sha256()
+    _hash_file(h, scene.image_path)
+    _hash_file(h, scene.voiceover_path)
+    params = {
+        "v": CACHE_VERSION,
+        "motion": scene.motion.model_dump(),
+        "transition_in": scene.transition_in.model_dump(),
+        "transition_out": scene.transition_out.model_dump(),
+        "duration": span.duration,
+        "frame_count": span.frame_count,
+        # Sub-frame offset of the first sample; shifts when earlier scenes change length
+        "phase": round(span.first_frame / fps - span.start, 9),
+        "fps": fps,
+        "size": [width, height],
+        "quality": quality,
+        "preset": preset,
+    }
+    if captions is not None:
+        # Style plus the resolved cues, so edited text or new alignment re-renders
+        params["captions"] = captions
+        params["cues"] = [[c.text, c.start, c.end] for c in span.cues or []]
+    h.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+class SegmentCache:
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.root, exist_ok=True)
+
+    @classmethod
+    def for_assets_dir(cls, assets_dir: str, max_mb: int) -> "SegmentCache":
+        return cls(os.path.join(assets_dir, CACHE_DIRNAME), max_mb * 1024 * 1024)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.mp4")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.path_for(key)
+        if os.path.exists(path):
+            os.utime(path)  # mtime doubles as the LRU clock
+            self.hits += 1
+            profiling.count("render_cache.hits")
+            return path
+        self.misses += 1
+        profiling.count("render_cache.misses")
+        return None
+
+    def put(self, key: str, src_path: str) -> str:
+        dst = self.path_for(key)
+        tmp = f"{dst}.{os.getpid()}.tmp"
+        shutil.move(src_path, tmp)
+        os.replace(tmp, dst)
+        return dst
+
+    def _entries(self) -> List[os.DirEntry]:
+        return [e for e in os.scandir(self.root) if e.is_file() and e.name.endswith(".mp4")]
+
+    def evict(self, keep: Iterable[str] = ()) -> int:
+        protected = {f"{k}.mp4" for k in keep}
+        entries = sorted(self._entries(), key=lambda e: e.stat().st_mtime)
+        total = sum(e.stat().st_size for e in entries)
+        removed = 0
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry.name in protected:
+                continue
+            total -= entry.stat().st_size
+            os.remove(entry.path)
+            removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, object]:
+        entries = self._entries()
+        return {
+            "path": self.root,
+            "entries": len(entries),
+            "size_bytes": sum(e.stat().st_size for e in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        return (
+            f"Render cache {s['path']}: {s['entries']} segments, "
+            f"{s['size_bytes'] / 1e6:.1f} MB / {s['max_bytes'] / 1e6:.0f} MB, "
+            f"{s['hits']} hits, {s['misses']} misses"
+        )
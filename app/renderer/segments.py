@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import imageio_ffmpeg
+
+from app import profiling
+from app.schema import VideoProject
+from app.renderer.ken_burns import Quality
+from app.renderer.timeline import SceneSpan, build_timeline
+from app.renderer.prepared import prepare_spans
+from app.renderer.segment_cache import SegmentCache, segment_key
+from app.renderer.encoder import FINAL_ENCODER, EncoderSettings
+from app.renderer.captions import CaptionStyle, caption_spans
+from app.renderer.ffmpeg_stream import FrameBlender, open_writer, scene_engine, span_captions, write_span_frames
+from app.audio.mixdown import build_audio_track
+
+
+def _worker_context():
+    # The caller may have live threads (HTTP pool, Edge TTS loop, provider
+    # gates); a forked worker could inherit one of their locks held forever
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def render_segment(span: SceneSpan, width: int, height: int, fps: float, quality: Quality, out_path: str, threads: Optional[int] = None, encoder: EncoderSettings = FINAL_ENCODER, captions: Optional[CaptionStyle] = None) -> Tuple[str, str]:
+    # Each scene carries its own fade tails (fades go through black), so a
+    # segment never needs pixels from its neighbours and can render alone.
+    engine = scene_engine(span, width, height, quality)
+    writer = open_writer(out_path, width, height, fps, encoder=encoder, threads=threads)
+    try:
+        write_span_frames(writer, span, engine, FrameBlender(width, height), fps, span_captions(span, width, height, captions))
+    finally:
+        writer.close()
+    return out_path, engine.report()
+
+
+def concat_segments(segment_paths: List[str], output_path: str, audio_path: Optional[str] = None, encoder: EncoderSettings = FINAL_ENCODER) -> str:
+    # Concat demuxer with stream copy: video is never re-encoded. Narration is
+    # muxed as one continuous track so AAC priming gaps can't pile up per scene.
+    list_path = output_path + ".segments.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    cmd = [imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path]
+    if audio_path:
+        cmd += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0", "-c:a", encoder.audio_codec]
+        if encoder.audio_bitrate:
+            cmd += ["-b:a", encoder.audio_bitrate]
+    cmd += ["-c:v", "copy", "-movflags", "+faststart", output_path]
+    try:
+        subprocess.run(cmd, check=True)
+    finally:
+        os.remove(list_path)
+    return output_path
+
+
+def render_video_parallel(project: VideoProject, output_path: str, quality: Quality = "final", workers: Optional[int] = None, cache: Optional[SegmentCache] = None, encoder: EncoderSettings = FINAL_ENCODER, captions: Optional[CaptionStyle] = None) -> str:
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    spans = [s for s in build_timeline(project) if s.frame_count > 0]
+    workers = workers or os.cpu_count() or 1
+    # Split encoder threads across workers so x264 doesn't oversubscribe cores
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    if captions is not None:
+        # Cues are resolved here so workers never load the alignment model
+        caption_spans(spans, captions, project)
+    style = captions.describe() if captions is not None else None
+    keys = [segment_key(span, project.width, project.height, project.fps, quality, encoder.preset, style) for span in spans] if cache else [None] * len(spans)
+
+    with tempfile.TemporaryDirectory(prefix="render-") as tmp:
+        segment_paths: List[Optional[str]] = [cache.get(key) if cache else None for key in keys]
+        # Workers map the prepared arrays rather than each decoding its JPEG
+        prepare_spans([s for s, path in zip(spans, segment_paths) if path is None], project.assets_dir, project.height, quality)
+        jobs = {
+            idx: (span, project.width, project.height, project.fps, quality, os.path.join(tmp, f"segment_{span.index:03d}.mp4"), threads, encoder, captions)
+            for idx, span in enumerate(spans)
+            if segment_paths[idx] is None
+        }
+        # A single worker renders in this process, which also makes the
+        # backend usable from inside a job server's render worker
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=_worker_context()) if workers > 1 and jobs else None
+        try:
+            futures = {idx: pool.submit(render_segment, *job) for idx, job in jobs.items()} if pool else {}
+            audio_path = build_audio_track(project, spans, os.path.join(tmp, "soundtrack.wav"), encoder.sample_rate, encoder.channels)
+            for idx, span in enumerate(spans):
+                if idx not in jobs:
+                    print(f"Scene {span.scene.scene_id:02d}: cached segment")
+                    continue
+                if pool:
+                    with profiling.span("render.segment_wait", "render", scene=span.scene.scene_id):
+                        path, report = futures[idx].result()
+                else:
+                    path, report = render_segment(*jobs[idx])
+                profiling.count("render.frames", span.frame_count)
+                print(f"Scene {span.scene.scene_id:02d} Ken Burns: {report}")
+                segment_paths[idx] = cache.put(keys[idx], path) if cache else path
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+        with profiling.span("render.concat", "render"):
+            concat_segments([p for p in segment_paths if p], output_path, audio_path=audio_path, encoder=encoder)
+    if cache:
+        cache.evict(keep=[k for k in keys if k])
+    return output_path
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import math
+import os
+from dataclasses import dataclass
+from typing import List, Optional
+
+from app.audio.mp3_probe import MP3ProbeError, probe_mp3_duration
+from app.schema import Scene, Transition, VideoProject
+
+DEFAULT_SCENE_DURATION = 6.0
+
+
+def scene_duration(scene: Scene) -> float:
+    return scene.duration_sec or DEFAULT_SCENE_DURATION
+
+
+def voiceover_duration(scene: Scene) -> Optional[float]:
+    # Probed once from the frame headers, then served from project.json
+    if not scene.voiceover_path or not os.path.exists(scene.voiceover_path):
+        return None
+    if scene.voiceover_duration_sec is None:
+        try:
+            scene.voiceover_duration_sec = round(probe_mp3_duration(scene.voiceover_path), 6)
+        except MP3ProbeError:
+            return None
+    return scene.voiceover_duration_sec
+
+
+def fit_scene_durations(project: VideoProject, head_pad: float, tail_pad: float) -> VideoProject:
+    # Each narrated scene lasts exactly as long as its voiceover plus padding;
+    # scenes without narration keep their duration (or the default).
+    for scene in project.scenes:
+        voice = voiceover_duration(scene)
+        if voice is None:
+            scene.voiceover_offset_sec = 0.0
+            scene.duration_sec = scene.duration_sec or DEFAULT_SCENE_DURATION
+            continue
+        scene.voiceover_offset_sec = head_pad
+        scene.duration_sec = round(head_pad + voice + tail_pad, 6)
+    return project
+
+
+def _fade_length(transition: Transition) -> float:
+    return transition.duration_sec if transition.type != "none" else 0.0
+
+
+@dataclass
+class SceneSpan:
+    index: int
+    scene: Scene
+    start: float
+    duration: float
+    first_frame: int
+    frame_count: int
+    fade_in: float
+    fade_out: float
+    prepared: Optional[str] = None  # render-ready .npy of the scene image, see renderer.prepared
+    cues: Optional[list] = None  # timed captions (renderer.captions.CaptionCue), None when captions are off
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+    def local_time(self, frame: int, fps: float) -> float:
+        return frame / fps - self.start
+
+    def alpha_at(self, t: float) -> float:
+        # Same mask MoviePy builds from crossfadein/crossfadeout over a black
+        # compose canvas: linear ramps at both ends, multiplied when they overlap.
+        alpha = 1.0
+        if self.fade_in > 0 and t < self.fade_in:
+            alpha *= t / self.fade_in
+        if self.fade_out > 0 and (self.duration - t) < self.fade_out:
+            alpha *= (self.duration - t) / self.fade_out
+        return alpha
+
+    def in_transition(self, t: float) -> bool:
+        return t < self.fade_in or (self.duration - t) < self.fade_out
+
+
+def build_timeline(project: VideoProject, fps: float | None = None) -> List[SceneSpan]:
+    # Scenes play back to back; frame k belongs to the scene covering k / fps,
+    # matching how MoviePy samples a concatenated clip.
+    fps = fps or project.fps
+    spans: List[SceneSpan] = []
+    start = 0.0
+    for idx, scene in enumerate(project.scenes):
+        duration = scene_duration(scene)
+        end = start + duration
+        first = math.ceil(start * fps - 1e-9)
+        last = math.ceil(end * fps - 1e-9)
+        spans.append(SceneSpan(
+            index=idx,
+            scene=scene,
+            start=start,
+            duration=duration,
+            first_frame=first,
+            frame_count=max(0, last - first),
+            fade_in=_fade_length(scene.transition_in),
+            fade_out=_fade_length(scene.transition_out),
+        ))
+        start = end
+    return spans
+
+
+def total_frames(spans: List[SceneSpan]) -> int:
+    return sum(s.frame_count for s in spans)
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
 import os
-from typing import List
-from moviepy.editor import ImageClip, AudioFileClip, concatenate_videoclips, CompositeAudioClip
+import tempfile
+from typing import Optional
 import numpy as np
 from PIL import Image
 
@@ -10,39 +10,66 @@ from PIL import Image
 if not hasattr(Image, "ANTIALIAS"):
     Image.ANTIALIAS = Image.LANCZOS  # type: ignore[attr-defined]
 
-from app.schema import VideoProject, Scene
+from app import profiling
+from app.schema import VideoProject
+from app.renderer.ken_burns import KenBurnsEngine, Quality
+from app.renderer.timeline import build_timeline
+from app.renderer.captions import CaptionRenderer, CaptionStyle, caption_spans
+from app.renderer.prepared import prepare_spans, prune_prepared
+from app.renderer.segment_cache import SegmentCache
+from app.audio.mixdown import build_audio_track
+from app.renderer.encoder import FINAL_ENCODER, EncoderSettings
 
 
-def _ken_burns_clip(image_path: str, duration: float, width: int, height: int, pan_start: float, pan_end: float, zoom_start: float, zoom_end: float):
-    base_clip = ImageClip(image_path).resize(height=height)
-    w, h = base_clip.size
-    start_x = (w - width) * (pan_start + 1) / 2 if w > width else 0
-    end_x = (w - width) * (pan_end + 1) / 2 if w > width else 0
+def _ken_burns_clip(image_path: str, duration: float, width: int, height: int, pan_start: float, pan_end: float, zoom_start: float, zoom_end: float, quality: Quality = "final", prepared: Optional[str] = None, captions: Optional[CaptionRenderer] = None):
+    from moviepy.editor import VideoClip
 
-    def make_frame(t):
-        alpha = t / duration if duration > 0 else 1.0
-        zoom = zoom_start + (zoom_end - zoom_start) * alpha
-        x = int(start_x + (end_x - start_x) * alpha)
-        frame = base_clip.get_frame(min(t, duration - 1e-3))
-        H, W = frame.shape[0], frame.shape[1]
-        crop_w = max(1, int(W / max(zoom, 1e-3)))
-        crop_h = max(1, int(H / max(zoom, 1e-3)))
-        x0 = max(0, min(W - crop_w, x))
-        y0 = max(0, (H - crop_h) // 2)
-        cropped = frame[y0:y0+crop_h, x0:x0+crop_w]
-        img = Image.fromarray(cropped).resize((width, height), Image.LANCZOS)
-        return np.array(img)
-
-    animated = base_clip.set_duration(duration).set_make_frame(make_frame)
+    if prepared:
+        engine = KenBurnsEngine.from_prepared(prepared, duration, width, height, pan_start, pan_end, zoom_start, zoom_end, quality=quality)
+    else:
+        engine = KenBurnsEngine.from_path(image_path, duration, width, height, pan_start, pan_end, zoom_start, zoom_end, quality=quality)
+    make_frame = engine.make_frame
+    if captions is not None:
+        def make_frame(t: float) -> np.ndarray:
+            cue = captions.cue_at(t)
+            img = engine.render_image(t)
+            return np.asarray(img) if cue is None else captions.draw(np.array(img), cue)
+    animated = VideoClip(make_frame, duration=duration)
+    engine.reset_stats()  # VideoClip probes frame 0 for its size
+    animated.engine = engine
     return animated
 
 
-def render_video(project: VideoProject, output_path: str) -> str:
+def render_video(project: VideoProject, output_path: str, quality: Quality = "final", backend: str = "moviepy", workers: Optional[int] = None, cache: Optional[SegmentCache] = None, encoder: EncoderSettings = FINAL_ENCODER, captions: Optional[CaptionStyle] = None) -> str:
+    with profiling.span("render", "render", backend=backend, quality=quality, size=f"{project.width}x{project.height}", fps=project.fps):
+        output_path = _render_video(project, output_path, quality, backend, workers, cache, encoder, captions)
+        prune_prepared(project.assets_dir, [scene.image_path for scene in project.scenes])
+        return output_path
+
+
+def _render_video(project: VideoProject, output_path: str, quality: Quality, backend: str, workers: Optional[int], cache: Optional[SegmentCache], encoder: EncoderSettings, captions: Optional[CaptionStyle] = None) -> str:
+    if backend == "stream":
+        from app.renderer.ffmpeg_stream import render_video_stream
+        return render_video_stream(project, output_path, quality=quality, encoder=encoder, captions=captions)
+    if backend == "parallel":
+        from app.renderer.segments import render_video_parallel
+        return render_video_parallel(project, output_path, quality=quality, workers=workers, cache=cache, encoder=encoder, captions=captions)
+    if backend != "moviepy":
+        raise ValueError(f"Unknown render backend: {backend}")
+    # moviepy.editor is slow to import (imageio plugins, ffmpeg discovery); only this backend needs it
+    from moviepy.editor import AudioFileClip, concatenate_videoclips
+
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     visual_clips = []
+    engines = []
+    spans = build_timeline(project)
+    prepare_spans(spans, project.assets_dir, project.height, quality)
+    if captions is not None:
+        caption_spans(spans, captions, project)
 
-    for scene in project.scenes:
-        duration = scene.duration_sec or 6.0
+    for span in spans:
+        scene = span.scene
+        duration = span.duration
         motion = scene.motion
         img_clip = _ken_burns_clip(
             scene.image_path,
@@ -53,14 +80,32 @@ def render_video(project: VideoProject, output_path: str) -> str:
             pan_end=motion.pan_end or 0.0,
             zoom_start=motion.zoom_start or 1.0,
             zoom_end=motion.zoom_end or 1.05,
+            quality=quality,
+            prepared=span.prepared,
+            captions=CaptionRenderer(span.cues, project.width, project.height, captions) if captions is not None and span.cues else None,
         )
-        if scene.voiceover_path:
-            audio = AudioFileClip(scene.voiceover_path)
-            img_clip = img_clip.set_audio(audio.set_duration(duration))
+        engines.append((scene.scene_id, img_clip.engine))
         visual_clips.append(
-            img_clip.crossfadein(scene.transition_in.duration_sec).crossfadeout(scene.transition_out.duration_sec)
+            img_clip.crossfadein(span.fade_in).crossfadeout(span.fade_out)
         )
 
     final = concatenate_videoclips(visual_clips, method="compose")
-    final.write_videofile(output_path, fps=project.fps, audio_codec="aac")
+    # Narration, effects and music are mixed once up front; MoviePy only reads the finished PCM
+    with tempfile.TemporaryDirectory(prefix="render-") as tmp:
+        audio_path = build_audio_track(project, spans, os.path.join(tmp, "soundtrack.wav"), encoder.sample_rate, encoder.channels)
+        if audio_path:
+            final = final.set_audio(AudioFileClip(audio_path, fps=encoder.sample_rate))
+        with profiling.span("render.moviepy_write", "render"):
+            final.write_videofile(
+                output_path,
+                fps=project.fps,
+                preset=encoder.preset,
+                audio_codec=encoder.audio_codec,
+                audio_bitrate=encoder.audio_bitrate,
+                audio_fps=encoder.sample_rate,
+            )
+    for scene_id, engine in engines:
+        profiling.count("render.frames", engine.frames)
+        profiling.count("render.ken_burns_sec", engine.elapsed)
+        print(f"Scene {scene_id:02d} Ken Burns: {engine.report()}")
     return output_path
\ No newline at end of file
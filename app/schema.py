@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from typing import List, Optional, Literal, Dict
-from pydantic import BaseModel, Field
+from typing import Any, List, Optional, Literal, Dict
+from pydantic import BaseModel, Field, field_serializer
 
 
 class ImageMotion(BaseModel):
@@ -30,8 +30,13 @@ class Scene(BaseModel):
     scene_id: int
     paragraph_text: str
     image_path: Optional[str] = None
+    image_sha256: Optional[str] = None
     image_prompt: Optional[str] = None
     voiceover_path: Optional[str] = None
+    voiceover_sha256: Optional[str] = None
+    voiceover_duration_sec: Optional[float] = None  # probed from the mp3 headers, cleared when the voice changes
+    voiceover_offset_sec: float = 0.0  # head padding before the narration starts
+    sentence_offsets_sec: Optional[List[float]] = None  # where each sentence starts in a sentence-mode voiceover
     voice: Optional[VoiceSpec] = None
     duration_sec: Optional[float] = None
     motion: ImageMotion = ImageMotion()
@@ -47,6 +52,8 @@ class ProjectMeta(BaseModel):
     reference_image: Optional[str] = None
     image_provider: Literal["stability", "placeholder", "google"] = "stability"
     tts_provider: Literal["azure", "elevenlabs", "edge", "none"] = "azure"
+    tts_mode: Literal["paragraph", "sentence"] = "paragraph"  # sentence: voiced per sentence, cached and stitched
+    story: Optional[Dict[str, Any]] = None  # raw outline, kept so --resume skips Gemini
 
 
 class VideoProject(BaseModel):
@@ -60,6 +67,12 @@ class VideoProject(BaseModel):
     bg_music_path: Optional[str] = None
     sfx: Optional[Dict[str, str]] = None
 
+    @field_serializer("scenes", mode="wrap")
+    def _scenes(self, scenes, handler):
+        # A lazily loaded project holds a sequence that validates scenes on
+        # access (persistence.LazyScenes); materialise it so dumps match an eager load
+        return handler(scenes if isinstance(scenes, list) else list(scenes))
+
 
 def slugify(text: str) -> str:
     return "".join(c.lower() if c.isalnum() else "-" for c in text).strip("-")
\ No newline at end of file
@@ -0,0 +1,426 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from app.config import CONFIG
+from app.cache import ResponseCache
+from app.providers import ProviderRegistry
+from app.schema import VideoProject, slugify
+from app.orchestrator import generate_project, parse_size, regenerate, resolve_providers
+from app.persistence import load_project, project_file, save_project
+
+# Long-running local job server. One process keeps the imports, provider
+# clients (with their HTTP pools), the Gemini client and a pool of render
+# processes warm, so a request costs a queue insert instead of an
+# interpreter start.
+#
+#   POST /jobs                 {"kind": "regen"|"preview"|"generate"|"render", ...} -> {"job_id": ...}
+#   GET  /jobs                 every known job's status
+#   GET  /jobs/<id>            one job's status and result
+#   GET  /jobs/<id>/events     NDJSON progress, streamed until the job finishes
+#   GET  /health
+#
+# Jobs run by priority, then submission order: a scene regen never waits
+# behind a queue of full renders.
+
+PRIORITY = {"regen": 0, "preview": 1, "generate": 2, "render": 3}
+MAX_FINISHED_JOBS = 500
+
+
+class Job:
+    def __init__(self, job_id: str, kind: str, spec: Dict[str, Any]):
+        self.job_id = job_id
+        self.kind = kind
+        self.spec = spec
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.events: List[Dict[str, Any]] = []
+        self._cond = threading.Condition()
+        self.emit("queued", priority=PRIORITY[kind])
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("ok", "error")
+
+    def emit(self, event: str, **details) -> None:
+        with self._cond:
+            self.events.append({"seq": len(self.events), "t": round(time.time() - self.created, 3), "event": event, **details})
+            self._cond.notify_all()
+
+    def progress(self, event: str, details: Dict[str, Any]) -> None:
+        # Matches orchestrator.ProgressCallback
+        self.emit(event, **details)
+
+    def finish(self, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        with self._cond:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished = time.time()
+        self.emit(status, **({"error": error} if error else result or {}))
+
+    def wait_events(self, after: int, timeout: float) -> List[Dict[str, Any]]:
+        # Events past index `after`, blocking up to `timeout` when there are none yet
+        with self._cond:
+            if len(self.events) <= after and not self.done:
+                self._cond.wait(timeout)
+            return self.events[after:]
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "queued_sec": round((self.started or time.time()) - self.created, 3),
+            "run_sec": round((self.finished or time.time()) - self.started, 3) if self.started else None,
+            "events": len(self.events),
+        }
+
+
+def _warm_render_worker() -> int:
+    # Pays the renderer imports and ffmpeg discovery once per worker process
+    import imageio_ffmpeg
+    from app.renderer import video_renderer  # noqa: F401
+
+    imageio_ffmpeg.get_ffmpeg_exe()
+    return os.getpid()
+
+
+def _render_in_worker(project: VideoProject, output_path: str, quality: str, backend: str, preview: Optional[Dict[str, Any]], captions=None) -> Dict[str, Any]:
+    from app.renderer.video_renderer import render_video
+    from app.renderer.preview import PREVIEW_ENCODER, preview_project
+    from app.renderer.segment_cache import SegmentCache
+
+    started = time.perf_counter()
+    # Parallel renders reuse the project's scene segments and encode the rest
+    # in this worker: the server already runs one render per process
+    cache = SegmentCache.for_assets_dir(project.assets_dir, CONFIG.render_cache_max_mb) if backend == "parallel" else None
+    if preview is not None:
+        project = preview_project(project, scale=preview["scale"], fps=preview["fps"])
+        render_video(project, project.output_video_path, quality="draft", backend=backend, workers=1, cache=cache, encoder=PREVIEW_ENCODER, captions=captions)  # type: ignore[arg-type]
+        output_path = project.output_video_path
+    else:
+        render_video(project, output_path, quality=quality, backend=backend, workers=1, cache=cache, captions=captions)  # type: ignore[arg-type]
+    return {"video": output_path, "render_sec": round(time.perf_counter() - started, 3)}
+
+
+class JobServer:
+    def __init__(self, job_workers: int = 2, render_workers: Optional[int] = None, cache: Optional[ResponseCache] = None, render_backend: str = "parallel"):
+        self.registry = ProviderRegistry(cache)
+        self.cache = cache
+        self.render_backend = render_backend
+        self.render_workers = render_workers or os.cpu_count() or 1
+        self._pool_lock = threading.Lock()
+        self.render_pool = self._new_render_pool()
+        self.jobs: Dict[str, Job] = {}
+        self._jobs_lock = threading.Lock()
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._project_locks: Dict[str, threading.Lock] = {}
+        # Renders wait in their own priority queue and go to the pool only when
+        # a worker is free, so a preview still overtakes queued full renders.
+        self._render_queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._render_slots = threading.Semaphore(self.render_workers)
+        self._threads = [threading.Thread(target=self._work, name=f"job-{i}", daemon=True) for i in range(max(1, job_workers))]
+        self._threads.append(threading.Thread(target=self._dispatch_renders, name="render-dispatch", daemon=True))
+        for t in self._threads:
+            t.start()
+
+    def _new_render_pool(self) -> ProcessPoolExecutor:
+        # Workers come from a forkserver rather than a fork of this process,
+        # whose job threads may hold locks (HTTP pools, imports) at that moment
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        pool = ProcessPoolExecutor(max_workers=self.render_workers, mp_context=context)
+        for _ in range(self.render_workers):
+            pool.submit(_warm_render_worker)
+        return pool
+
+    def _replace_render_pool(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        # A worker died (OOM, a crash in ffmpeg or Pillow) and took the pool
+        # with it; later renders get a fresh, re-warmed pool
+        with self._pool_lock:
+            if self.render_pool is broken:
+                print("Render worker died; restarting the render pool")
+                broken.shutdown(wait=False, cancel_futures=True)
+                self.render_pool = self._new_render_pool()
+            return self.render_pool
+
+    # -- queue -------------------------------------------------------------
+
+    def submit(self, spec: Dict[str, Any]) -> Job:
+        kind = spec.get("kind")
+        if kind not in PRIORITY:
+            raise ValueError(f"'kind' must be one of {', '.join(PRIORITY)}")
+        if kind != "generate" and not spec.get("project_json"):
+            raise ValueError(f"{kind} jobs need 'project_json'")
+        if kind == "generate" and not spec.get("title"):
+            raise ValueError("generate jobs need 'title'")
+        seq = next(self._seq)
+        job = Job(spec.get("job_id") or f"{kind}-{seq}", kind, spec)
+        with self._jobs_lock:
+            if job.job_id in self.jobs and not self.jobs[job.job_id].done:
+                raise ValueError(f"job {job.job_id} is already queued or running")
+            self.jobs[job.job_id] = job
+            self._prune()
+        self._queue.put((PRIORITY[kind], seq, job))
+        return job
+
+    def _prune(self) -> None:
+        finished = sorted((j for j in self.jobs.values() if j.done), key=lambda j: j.finished or 0.0)
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job.job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._jobs_lock:
+            return self.jobs.get(job_id)
+
+    def _project_lock(self, path: str) -> threading.Lock:
+        # Reads and writes of one project.json are serialised; different projects run side by side
+        with self._jobs_lock:
+            return self._project_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+    def _work(self) -> None:
+        while True:
+            _, _, job = self._queue.get()
+            job.started = time.time()
+            job.status = "running"
+            job.emit("started")
+            try:
+                result = getattr(self, f"_run_{job.kind}")(job)
+            except Exception as e:
+                traceback.print_exc()
+                job.finish("error", error=f"{type(e).__name__}: {e}")
+            else:
+                if result is not None:  # None: handed to the render queue, which finishes it
+                    job.finish("ok", result)
+
+    def _dispatch_renders(self) -> None:
+        while True:
+            self._render_slots.acquire()
+            _, _, job, args, base = self._render_queue.get()
+            job.emit("render", backend=args[3], scenes=len(args[0].scenes), preview=args[4] is not None)
+            pool = self.render_pool
+            try:
+                future = pool.submit(_render_in_worker, *args)
+            except BrokenProcessPool:
+                pool = self._replace_render_pool(pool)
+                future = pool.submit(_render_in_worker, *args)
+            future.add_done_callback(lambda f, job=job, base=base, pool=pool: self._rendered(f, job, base, pool))
+
+    def _rendered(self, future, job: Job, base: Dict[str, Any], pool: ProcessPoolExecutor) -> None:
+        self._render_slots.release()
+        try:
+            result = future.result()
+        except BrokenProcessPool as e:
+            self._replace_render_pool(pool)
+            job.finish("error", error=f"render worker died: {e}")
+        except Exception as e:
+            job.finish("error", error=f"{type(e).__name__}: {e}")
+        else:
+            job.finish("ok", {**base, **result})
+
+    # -- job kinds -----------------------------------------------------------
+
+    def _run_generate(self, job: Job) -> Dict[str, Any]:
+        spec = job.spec
+        img_provider, voice_provider = resolve_providers(spec.get("image_provider"), spec.get("voice_provider"))
+        width, height = parse_size(spec.get("image_size") or CONFIG.default_image_size)
+        out_dir = spec.get("output_dir") or os.path.join("./outputs", slugify(spec["title"]))
+        project_json = project_file(out_dir)
+        with self._project_lock(project_json):
+            project = generate_project(
+                title=spec["title"],
+                num_paragraphs=int(spec.get("num_paragraphs", 6)),
+                style_prompt=spec.get("style_prompt"),
+                reference_image=spec.get("reference_image"),
+                image_provider=img_provider,
+                voice_provider=voice_provider,
+                azure_voice=spec.get("azure_voice") or CONFIG.default_azure_voice,
+                elevenlabs_voice_id=spec.get("elevenlabs_voice_id"),
+                width=width,
+                height=height,
+                out_dir=out_dir,
+                source_url=spec.get("source_url"),
+                cache=self.cache,
+                resume=bool(spec.get("resume", False)),
+                head_pad=spec.get("head_pad"),
+                tail_pad=spec.get("tail_pad"),
+                tts_mode=spec.get("tts_mode"),
+                registry=self.registry,
+                progress=job.progress,
+            )
+        result: Dict[str, Any] = {"project_json": project_json, "scenes": len(project.scenes)}
+        if spec.get("render"):
+            return self._queue_render(job, project, result, preview=None)
+        return result
+
+    def _run_regen(self, job: Job) -> Dict[str, Any]:
+        spec = job.spec
+        what = [w.strip() for w in str(spec.get("what", "both")).split(",")]
+        with self._project_lock(spec["project_json"]):
+            project = load_project(spec["project_json"])
+            if spec.get("tts_mode"):
+                project.meta.tts_mode = spec["tts_mode"]
+            regenerate(
+                project,
+                which=spec["target"],
+                what=what,
+                style_prompt=spec.get("style_prompt"),
+                reference_image=spec.get("reference_image"),
+                cache=self.cache,
+                head_pad=spec.get("head_pad"),
+                tail_pad=spec.get("tail_pad"),
+                registry=self.registry,
+                progress=job.progress,
+            )
+            save_project(project, spec["project_json"])
+        return {"project_json": spec["project_json"], "target": spec["target"]}
+
+    def _run_render(self, job: Job) -> None:
+        with self._project_lock(job.spec["project_json"]):
+            # Scenes are validated in the render worker as it reaches them
+            project = load_project(job.spec["project_json"], lazy=True)
+        return self._queue_render(job, project, {"project_json": job.spec["project_json"]}, preview=None)
+
+    def _run_preview(self, job: Job) -> None:
+        from app.renderer.preview import PREVIEW_FPS, PREVIEW_SCALE
+
+        with self._project_lock(job.spec["project_json"]):
+            # Scenes are validated in the render worker as it reaches them
+            project = load_project(job.spec["project_json"], lazy=True)
+        preview = {"scale": float(job.spec.get("scale", PREVIEW_SCALE)), "fps": int(job.spec.get("fps", PREVIEW_FPS))}
+        return self._queue_render(job, project, {"project_json": job.spec["project_json"]}, preview=preview)
+
+    def _queue_render(self, job: Job, project: VideoProject, base: Dict[str, Any], preview: Optional[Dict[str, Any]]) -> None:
+        # The project is loaded now and shipped to a warm worker, so a regen
+        # saved afterwards can't change a render that is already waiting.
+        backend = job.spec.get("render_backend", self.render_backend)
+        quality = job.spec.get("render_quality", "final")
+        captions = None
+        if job.spec.get("captions"):
+            from app.renderer.captions import CaptionStyle
+
+            captions = CaptionStyle(word_align=bool(job.spec.get("caption_align")))
+        job.emit("render_queued")
+        self._render_queue.put((PRIORITY[job.kind], next(self._seq), job, (project, project.output_video_path, quality, backend, preview, captions), base))
+        return None
+
+    def close(self) -> None:
+        self.render_pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "story-video-server/1"
+    protocol_version = "HTTP/1.1"
+    jobs: JobServer  # set on the subclass built by serve()
+
+    def log_message(self, fmt: str, *args) -> None:
+        pass
+
+    def _json(self, status: int, body: Any) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if parts == ["health"]:
+            return self._json(200, {"ok": True, "queued": self.jobs._queue.qsize()})
+        if parts == ["jobs"]:
+            with self.jobs._jobs_lock:
+                listed = [j.describe() for j in self.jobs.jobs.values()]
+            return self._json(200, listed)
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return self._json(404, {"error": f"no job {parts[1]}"})
+            if len(parts) == 2:
+                return self._json(200, job.describe())
+            if parts[2] == "events":
+                return self._stream_events(job)
+        self._json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/jobs":
+            return self._json(404, {"error": "not found"})
+        try:
+            spec = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            job = self.jobs.submit(spec)
+        except (ValueError, json.JSONDecodeError) as e:
+            return self._json(400, {"error": str(e)})
+        self._json(202, {"job_id": job.job_id, "status": job.status})
+
+    def _stream_events(self, job: Job) -> None:
+        # Chunked NDJSON: one event per line as it happens, closed when the job ends
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        sent = 0
+        try:
+            while True:
+                events = job.wait_events(sent, timeout=15.0)
+                lines = "".join(json.dumps(e) + "\n" for e in events) or "\n"  # blank line as keep-alive
+                data = lines.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+                sent += len(events)
+                if job.done and sent >= len(job.events):
+                    break
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def serve(host: str, port: int, jobs: JobServer) -> ThreadingHTTPServer:
+    handler = type("Handler", (_Handler,), {"jobs": jobs})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    ap = argparse.ArgumentParser("story-video-server")
+    ap.add_argument("--host", type=str, default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--job-workers", type=int, default=2, help="Jobs running at once (generation and regen are mostly network-bound)")
+    ap.add_argument("--render-workers", type=int, default=None, help="Warm render processes (default: CPU count)")
+    ap.add_argument("--render-backend", type=str, choices=["moviepy", "stream", "parallel"], default="parallel", help="parallel keeps encoded scene segments in assets/.render_cache/ so a render after a regen re-encodes only the changed scenes")
+    ap.add_argument("--no-provider-cache", action="store_true")
+    args = ap.parse_args()
+
+    cache = None if args.no_provider_cache else ResponseCache.from_config()
+    jobs = JobServer(job_workers=args.job_workers, render_workers=args.render_workers, cache=cache, render_backend=args.render_backend)
+    httpd = serve(args.host, args.port, jobs)
+    print(f"Job server listening on http://{args.host}:{args.port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        jobs.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,23 @@ from __future__ import annotations
 import os
 import uuid
 from typing import Optional
-import requests
 
 from app.config import CONFIG
+from app.cache import ResponseCache
+from app.http_client import HttpClient, shared_http
 
 
 class AzureTTSClient:
-    def __init__(self, key: Optional[str] = None, region: Optional[str] = None):
+    OUTPUT_FORMAT = "audio-24khz-96kbitrate-mono-mp3"
+
+    def __init__(self, key: Optional[str] = None, region: Optional[str] = None, endpoint: Optional[str] = None, cache: Optional[ResponseCache] = None, http: Optional[HttpClient] = None):
         self.key = key or CONFIG.azure_speech_key
         self.region = region or CONFIG.azure_speech_region
         if not self.key or not self.region:
             raise RuntimeError("Azure Speech not configured")
-        self.endpoint = f"https://{self.region}.tts.speech.microsoft.com/cognitiveservices/v1"
+        self.endpoint = endpoint or CONFIG.azure_tts_endpoint or f"https://{self.region}.tts.speech.microsoft.com/cognitiveservices/v1"
+        self.cache = cache
+        self.http = http or shared_http()
 
     def synthesize_to_file(
         self,
@@ -28,7 +33,7 @@ class AzureTTSClient:
         headers = {
             "Ocp-Apim-Subscription-Key": self.key,
             "Content-Type": "application/ssml+xml",
-            "X-Microsoft-OutputFormat": "audio-24khz-96kbitrate-mono-mp3",
+            "X-Microsoft-OutputFormat": self.OUTPUT_FORMAT,
             "User-Agent": "story-video-builder",
         }
         prosody_attrs = []
@@ -52,9 +57,11 @@ class AzureTTSClient:
   </voice>
 </speak>
 """.strip()
-        resp = requests.post(self.endpoint, headers=headers, data=ssml.encode("utf-8"), timeout=120)
-        resp.raise_for_status()
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, "wb") as f:
-            f.write(resp.content)
-        return output_path
\ No newline at end of file
+        body = ssml.encode("utf-8")
+
+        def download(path: str) -> str:
+            return self.http.download("POST", self.endpoint, path, headers=headers, data=body)
+
+        if self.cache is None:
+            return download(output_path)
+        return self.cache.fetch_to_file("azure", self.OUTPUT_FORMAT, {"ssml": ssml}, output_path, download)
\ No newline at end of file
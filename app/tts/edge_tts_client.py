@@ -2,14 +2,36 @@ from __future__ import annotations
 
 import asyncio
 import os
-from typing import Optional, Dict, Any
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
 import edge_tts
 
+from app.cache import ResponseCache
+
+
+@dataclass
+class EdgeTTSJob:
+    text: str
+    output_path: str
+    voice: Optional[str] = None
+    rate: Optional[str] = None
+    pitch: Optional[str] = None
+
 
 class EdgeTTSClient:
-    def __init__(self, default_voice: str = "en-US-JennyNeural"):
+    # `communicate` defaults to edge_tts.Communicate; benchmarks pass a local
+    # stand-in with the same (text, voice, **kwargs) -> .save() shape
+    # (app.bench.tts.FakeCommunicate).
+    def __init__(self, default_voice: str = "en-US-JennyNeural", cache: Optional[ResponseCache] = None, concurrency: int = 4, communicate: Optional[Callable[..., Any]] = None):
         self.default_voice = default_voice
+        self.cache = cache
+        self.concurrency = concurrency
+        self.communicate = communicate or edge_tts.Communicate
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
 
     async def _synthesize_async(self, text: str, output_path: str, voice: Optional[str] = None, rate: Optional[str] = None, pitch: Optional[str] = None) -> str:
         kwargs: Dict[str, Any] = {}
@@ -17,11 +39,71 @@ class EdgeTTSClient:
             kwargs["rate"] = rate
         if isinstance(pitch, str) and pitch.strip():
             kwargs["pitch"] = pitch
-        communicate = edge_tts.Communicate(text, voice or self.default_voice, **kwargs)
+        communicate = self.communicate(text, voice or self.default_voice, **kwargs)
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         await communicate.save(output_path)
         return output_path
 
+    async def synthesize_async(self, text: str, output_path: str, voice: Optional[str] = None, rate: Optional[str] = None, pitch: Optional[str] = None) -> str:
+        if self.cache is None:
+            return await self._synthesize_async(text, output_path, voice=voice, rate=rate, pitch=pitch)
+        model = voice or self.default_voice
+        params = {"text": text, "rate": rate, "pitch": pitch}
+        if await asyncio.to_thread(self.cache.copy_to, "edge", model, params, output_path):
+            return output_path
+        await self._synthesize_async(text, output_path, voice=voice, rate=rate, pitch=pitch)
+        await asyncio.to_thread(self.cache.store_from, "edge", model, params, output_path)
+        return output_path
+
+    async def synthesize_many_async(self, jobs: Iterable[EdgeTTSJob], concurrency: Optional[int] = None) -> List[str]:
+        sem = asyncio.Semaphore(max(1, concurrency or self.concurrency))
+
+        async def run(job: EdgeTTSJob) -> str:
+            async with sem:
+                return await self.synthesize_async(job.text, job.output_path, voice=job.voice, rate=job.rate, pitch=job.pitch)
+
+        return list(await asyncio.gather(*(run(job) for job in jobs)))
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        # One long-lived loop per client instead of asyncio.run per scene
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="edge-tts-loop", daemon=True)
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
     def synthesize_to_file(self, text: str, output_path: str, voice: Optional[str] = None, rate: Optional[str] = None, pitch: Optional[str] = None) -> str:
-        asyncio.run(self._synthesize_async(text, output_path, voice=voice, rate=rate, pitch=pitch))
-        return output_path
\ No newline at end of file
+        return self._run(self.synthesize_async(text, output_path, voice=voice, rate=rate, pitch=pitch))
+
+    def synthesize_many(self, jobs: Iterable[EdgeTTSJob], concurrency: Optional[int] = None) -> List[str]:
+        return self._run(self.synthesize_many_async(list(jobs), concurrency=concurrency))
+
+    def close(self) -> None:
+        # Stops the loop thread, then tidies up on this thread the way
+        # asyncio.run does: cancel leftover tasks, finish async generators
+        # and the default executor, close the loop.
+        with self._loop_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is threading.current_thread():
+            return  # called from a job on the loop; run_forever returns once it yields
+        if thread is not None:
+            thread.join()
+        try:
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            loop.close()
@@ -1,19 +1,21 @@
 from __future__ import annotations
 
-import os
 from typing import Optional
-import requests
 
 from app.config import CONFIG
+from app.cache import ResponseCache
+from app.http_client import HttpClient, shared_http
 
 
 class ElevenLabsClient:
-    def __init__(self, api_key: Optional[str] = None, default_voice_id: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, default_voice_id: Optional[str] = None, base_url: Optional[str] = None, cache: Optional[ResponseCache] = None, http: Optional[HttpClient] = None):
         self.api_key = api_key or CONFIG.elevenlabs_api_key
         self.voice_id = default_voice_id or CONFIG.elevenlabs_voice_id
         if not self.api_key:
             raise RuntimeError("ELEVENLABS_API_KEY not configured")
-        self.base_url = "https://api.elevenlabs.io/v1"
+        self.base_url = (base_url or CONFIG.elevenlabs_base_url).rstrip("/")
+        self.cache = cache
+        self.http = http or shared_http()
 
     def synthesize_to_file(self, text: str, output_path: str, voice_id: Optional[str] = None, stability: float = 0.5, similarity_boost: float = 0.75, style: Optional[float] = None) -> str:
         vid = voice_id or self.voice_id
@@ -34,9 +36,10 @@ class ElevenLabsClient:
         }
         if style is not None:
             payload["voice_settings"]["style"] = style
-        resp = requests.post(url, headers=headers, json=payload, timeout=120)
-        resp.raise_for_status()
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, "wb") as f:
-            f.write(resp.content)
-        return output_path
\ No newline at end of file
+
+        def download(path: str) -> str:
+            return self.http.download("POST", url, path, headers=headers, json=payload)
+
+        if self.cache is None:
+            return download(output_path)
+        return self.cache.fetch_to_file("elevenlabs", vid, payload, output_path, download)
\ No newline at end of file
@@ -0,0 +1,44 @@
+import json
+
+from app.llm.json_stream import ArrayStringStream, iter_array_strings
+
+PARAGRAPHS = [
+    'She said "wait" and the door\\frame creaked.',
+    "Line one\nline two\ttabbed",
+    "Café au lait, “curly” quotes and an emoji \U0001F570",
+    "ends with a backslash \\",
+    "",
+]
+DOCUMENT = "```json\n" + json.dumps(
+    {"title": "A \"quoted\" [title]", "paragraphs": PARAGRAPHS, "notes": ["not", "these"]},
+    ensure_ascii=True,
+) + "\n```"
+
+
+def test_every_split_point():
+    # Two chunks, cut at every character: escapes (\", \\, \n, \uXXXX and
+    # surrogate pairs) get split between chunks somewhere along the way
+    for cut in range(len(DOCUMENT) + 1):
+        stream = ArrayStringStream()
+        found = stream.feed(DOCUMENT[:cut]) + stream.feed(DOCUMENT[cut:])
+        assert found == PARAGRAPHS, cut
+        assert stream.document()["paragraphs"] == PARAGRAPHS
+
+
+def test_one_character_at_a_time():
+    assert list(iter_array_strings(iter(DOCUMENT))) == PARAGRAPHS
+
+
+def test_strings_arrive_as_soon_as_they_close():
+    stream = ArrayStringStream()
+    head = DOCUMENT[:DOCUMENT.index("line two")]
+    assert stream.feed(head) == PARAGRAPHS[:1]
+    assert not stream.done
+    assert stream.feed(DOCUMENT[len(head):]) == PARAGRAPHS[1:]
+    assert stream.done
+
+
+def test_other_keys_and_nested_arrays():
+    doc = json.dumps({"paragraphs_note": ["x"], "meta": {"paragraphs": ["nested"]}, "scenes": ["a", "b"]})
+    assert list(iter_array_strings([doc], key="scenes")) == ["a", "b"]
+    assert list(iter_array_strings([doc])) == []
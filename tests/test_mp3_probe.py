@@ -0,0 +1,63 @@
+import subprocess
+
+import imageio_ffmpeg
+import pytest
+
+from app.audio.mp3_probe import MP3ProbeError, _find_first_frame, _skip_id3v2, probe_mp3_duration
+
+# 3 s at 24 kHz mono is 125 MPEG-2 frames of 576 samples; LAME's encoder
+# delay and padding add two more
+SECONDS = 3.0
+EXPECTED = 127 * 576 / 24000
+
+
+def _encode(path, *args):
+    cmd = [
+        imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-v", "error", "-f", "lavfi", "-i", f"sine=frequency=220:duration={SECONDS}",
+        "-ac", "1", "-ar", "24000", "-c:a", "libmp3lame", *args, str(path),
+    ]
+    subprocess.run(cmd, check=True)
+    return str(path)
+
+
+def _first_frame(path):
+    with open(path, "rb") as f:
+        return _find_first_frame(f, _skip_id3v2(f))
+
+
+@pytest.mark.parametrize("args", [["-b:a", "48k"], ["-q:a", "5"]], ids=["info", "xing"])
+def test_vbr_header_duration(tmp_path, args):
+    path = _encode(tmp_path / "a.mp3", *args)
+    offset, (length, *_) = _first_frame(path)
+    with open(path, "rb") as f:
+        f.seek(offset)
+        assert f.read(length)[4 + 9:4 + 9 + 4] in (b"Xing", b"Info")
+    assert probe_mp3_duration(path) == pytest.approx(EXPECTED)
+
+
+@pytest.mark.parametrize("args", [["-b:a", "48k"], ["-q:a", "5"]], ids=["cbr", "vbr"])
+def test_frame_walk_duration(tmp_path, args):
+    path = _encode(tmp_path / "a.mp3", *args, "-write_xing", "0")
+    assert probe_mp3_duration(path) == pytest.approx(EXPECTED)
+
+
+def test_vbri_header_duration(tmp_path):
+    path = _encode(tmp_path / "a.mp3", "-b:a", "48k", "-write_xing", "0")
+    offset, (length, *_) = _first_frame(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    # A Fraunhofer-style leading frame: a silent frame carrying the VBRI
+    # header 32 bytes after the frame header, counting only the audio frames
+    vbri = b"VBRI" + (1).to_bytes(2, "big") + bytes(4) + (len(data) - offset).to_bytes(4, "big") + (127).to_bytes(4, "big")
+    frame = data[offset:offset + 4] + bytes(32) + vbri + bytes(length - 36 - len(vbri))
+    path = tmp_path / "vbri.mp3"
+    path.write_bytes(data[:offset] + frame + data[offset:])
+    # Walking the frames would count the VBRI frame as audio
+    assert probe_mp3_duration(str(path)) == pytest.approx(EXPECTED)
+
+
+def test_not_an_mp3(tmp_path):
+    path = tmp_path / "noise.mp3"
+    path.write_bytes(b"ID3" + bytes(7) + b"not audio at all" * 64)
+    with pytest.raises(MP3ProbeError):
+        probe_mp3_duration(str(path))
@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+from app.bench.persistence import build_large_project
+from app.persistence import LazyScenes, load_project, save_project
+
+
+@pytest.mark.parametrize("fmt", ["json", "compact"])
+def test_lazy_and_eager_saves_match(tmp_path, fmt):
+    src = tmp_path / "project.json"
+    save_project(build_large_project(12, str(tmp_path / "assets")), str(src), fmt=fmt)
+
+    eager, lazy = tmp_path / "eager.json", tmp_path / "lazy.json"
+    save_project(load_project(str(src)), str(eager), fmt=fmt)
+    project = load_project(str(src), lazy=True)
+    project.scenes[3]  # a mix of validated and raw scenes
+    save_project(project, str(lazy), fmt=fmt)
+
+    assert lazy.read_bytes() == eager.read_bytes() == src.read_bytes()
+
+
+def test_lazy_project_dumps_like_an_eager_one(tmp_path):
+    src = tmp_path / "project.json"
+    save_project(build_large_project(5, str(tmp_path / "assets")), str(src), fmt="json")
+
+    project = load_project(str(src), lazy=True)
+    assert isinstance(project.scenes, LazyScenes)
+    assert project.scenes.validated == 0
+    eager = load_project(str(src))
+    assert project.model_dump() == eager.model_dump()
+    assert json.loads(project.model_dump_json()) == json.loads(eager.model_dump_json())
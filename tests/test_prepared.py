@@ -0,0 +1,20 @@
+import numpy as np
+from PIL import Image
+
+from app.renderer.prepared import open_prepared, prepare_image
+
+
+def test_prepared_image_is_backed_by_the_mapping(tmp_path):
+    src = tmp_path / "scene.png"
+    Image.new("RGB", (64, 36), (10, 20, 30)).save(src)
+    path = prepare_image(str(src), str(tmp_path), 36, 1.0)
+
+    img, scale = open_prepared(path, 36)
+    assert scale == 1.0
+    assert img.getpixel((0, 0))[:3] == (10, 20, 30)
+
+    # A write through another mapping of the same file shows up in the image
+    pixels = np.load(path, mmap_mode="r+")
+    pixels[0, 0, :3] = (200, 100, 50)
+    pixels.flush()
+    assert img.getpixel((0, 0))[:3] == (200, 100, 50)
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.pipeline import ProviderGate, ProviderGates, ProviderLimit, parse_provider_limits
+
+
+class _Peak:
+    def __init__(self):
+        self.now = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    async def hold(self, gate, sec=0.01):
+        async with gate:
+            with self.lock:
+                self.now += 1
+                self.peak = max(self.peak, self.now)
+            await asyncio.sleep(sec)
+            with self.lock:
+                self.now -= 1
+
+
+def test_concurrency_limit_on_one_loop():
+    gate, peak = ProviderGate(ProviderLimit(3)), _Peak()
+
+    async def main():
+        await asyncio.gather(*(peak.hold(gate) for _ in range(20)))
+
+    asyncio.run(main())
+    assert peak.peak == 3
+
+
+def test_concurrency_limit_across_loops():
+    # The job server runs each job on its own loop in its own thread
+    gate, peak = ProviderGate(ProviderLimit(2)), _Peak()
+
+    async def job():
+        await asyncio.gather(*(peak.hold(gate) for _ in range(6)))
+
+    threads = [threading.Thread(target=asyncio.run, args=(job(),)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    assert not any(t.is_alive() for t in threads)
+    assert peak.peak == 2
+
+
+def test_cancelled_waiter_gives_its_slot_back():
+    gate, peak = ProviderGate(ProviderLimit(1)), _Peak()
+
+    async def main():
+        holder = asyncio.create_task(peak.hold(gate, 0.05))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(peak.hold(gate))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await holder
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.wait_for(peak.hold(gate), timeout=1)
+
+    asyncio.run(main())
+    assert peak.now == 0
+
+
+def test_rate_limit_spaces_starts():
+    gate = ProviderGate(ProviderLimit(4, rate_per_sec=20))
+    starts = []
+
+    async def call():
+        async with gate:
+            starts.append(time.monotonic())
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(5)))
+
+    asyncio.run(main())
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    assert min(gaps) >= 0.05 - 0.005
+
+
+def test_gates_are_shared_per_provider():
+    gates = ProviderGates(parse_provider_limits("stability=2:0.5"))
+    assert gates.get("stability") is gates.get("stability")
+    assert gates.limits["stability"] == ProviderLimit(2, 0.5)